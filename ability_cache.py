@@ -0,0 +1,169 @@
+"""Memoization of pure MCP abilities (config.yaml `caching` section).
+
+An ability is cached when the stage that declares it is ``mode:
+deterministic``, it is not in NEVER_CACHE or the config's ``never`` list,
+and (if the config gives an ``abilities`` allowlist) it is on that list.
+Results are keyed by a hash of (server, ability, canonical JSON payload)
+and stored pickled: the pickle length is what counts against
+``max_bytes``, and every hit unpickles a fresh copy that callers may mutate.
+Error results are never stored. Eviction is LRU, bounded by entry count
+and bytes; entries expire ``ttl_seconds`` after they were stored, and all
+of them are dropped when config.yaml changes.
+"""
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+from collections import OrderedDict
+from functools import wraps
+import hashlib
+import json
+import pickle
+import threading
+import time
+
+from metrics import is_error_result
+from workflow_spec import WorkflowSpec, get_workflow_spec, on_reload
+
+# Abilities with side effects, or that read live external state, are never
+# cached whatever their stage's mode says
+NEVER_CACHE = frozenset({
+    "update_ticket", "close_ticket", "execute_api_calls", "trigger_notifications", "extract_answer",
+})
+CACHEABLE_SERVERS = ("COMMON", "ATLAS")
+
+class AbilityCache:
+    """Thread-safe LRU + TTL cache of ability results with hit/miss stats."""
+
+    def __init__(self, enabled: bool = True, max_entries: int = 10000,
+                 max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 300.0):
+        self._entries: "OrderedDict[bytes, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._spec_hash: Optional[str] = None
+        self._cacheable: FrozenSet[Tuple[str, str]] = frozenset()
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.reset_stats()
+
+    def configure(self, spec: WorkflowSpec):
+        """Apply the spec's `caching` settings and work out which abilities qualify."""
+        settings = spec.config.get("caching") or {}
+        never = NEVER_CACHE | set(settings.get("never") or ())
+        allow = settings.get("abilities")
+        cacheable = frozenset(
+            (server, ability)
+            for ability, server in spec.ability_servers.items()
+            if server in CACHEABLE_SERVERS
+            and spec.stage_modes.get(spec.ability_stages[ability]) == "deterministic"
+            and ability not in never
+            and (allow is None or ability in allow)
+        )
+        with self._lock:
+            self.enabled = settings.get("enabled", True)
+            self.max_entries = settings.get("max_entries", self.max_entries)
+            self.max_bytes = settings.get("max_bytes", self.max_bytes)
+            self.ttl_seconds = settings.get("ttl_seconds", self.ttl_seconds)
+            self._cacheable = cacheable
+            if spec.content_hash != self._spec_hash:
+                # KB, gazetteer or lexicon settings may have changed results
+                self._entries.clear()
+                self._bytes = 0
+            self._spec_hash = spec.content_hash
+            self._evict()
+
+    def cacheable(self, server: str, ability: str) -> bool:
+        if self._spec_hash is None:
+            self.configure(get_workflow_spec())
+        return self.enabled and (server, ability) in self._cacheable
+
+    @staticmethod
+    def key(server: str, ability: str, payload: Dict[str, Any]) -> Optional[bytes]:
+        try:
+            canonical = json.dumps([server, ability, payload], sort_keys=True, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return None  # payload has no canonical JSON form: don't cache
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, key: bytes) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires, blob = entry
+            if expires <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return True, pickle.loads(blob)
+
+    def put(self, key: bytes, value: Any):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, blob)
+            self._bytes += len(blob)
+            self._evict()
+
+    def _drop(self, key: bytes):
+        _, blob = self._entries.pop(key)
+        self._bytes -= len(blob)
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, blob) = self._entries.popitem(last=False)
+            self._bytes -= len(blob)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+ability_cache = AbilityCache()
+# Configured on first use, then again whenever config.yaml is reloaded
+on_reload(ability_cache.configure)
+
+def cached_execute(server: str) -> Callable:
+    """Decorator for an MCP server's execute(ability, payload)."""
+    def decorate(execute: Callable) -> Callable:
+        @wraps(execute)
+        def wrapper(self, ability: str, payload: Dict[str, Any]):
+            if not ability_cache.cacheable(server, ability):
+                return execute(self, ability, payload)
+            key = ability_cache.key(server, ability, payload)
+            if key is None:
+                return execute(self, ability, payload)
+            hit, result = ability_cache.get(key)
+            if hit:
+                return result
+            result = execute(self, ability, payload)
+            if not is_error_result(result):
+                ability_cache.put(key, result)
+            return result
+        return wrapper
+    return decorate
@@ -1,24 +1,36 @@
 
-from typing import Dict, Any, Literal, Optional, List
+from typing import Dict, Any, Literal, Optional, List, Iterable, Iterator, Tuple, Annotated
 from pydantic import BaseModel, Field
-from enum import Enum
-import yaml
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+import contextvars
+import operator
+import time
 import json
+import uuid
+from langchain_core.runnables import RunnableLambda
+from langgraph.config import get_config, get_stream_writer
 from langgraph.graph import StateGraph, END
-from pydantic import ValidationError
+from langgraph.errors import GraphInterrupt
+from langgraph.types import Command, interrupt
 
 # Import MCP clients
 from mcp_clients import common_client, atlas_client, state_client
+from workflow_spec import WorkflowSpec, get_workflow_spec
+from events import langie, ability_log, stage_log, result_log, notice_log, error_log, event_sink, ticket_context, DEBUG
+from metrics import metrics_registry
+from outbox import Outbox, load_outbox
+from checkpointer import SqliteCheckpointer, load_checkpointer
+from profiler import current_profile, load_profiler
+from state_codec import encode_state, decode_state
+from state_schema import Priority, SupportStateTyped, StateView, latest_stage, in_stage_order, validate_state_fields
+
+# KB results batch runs fetch ahead of time, by query (see run_batch)
+kb_prefetch: contextvars.ContextVar[Optional[Dict[str, List[Dict[str, Any]]]]] = contextvars.ContextVar("kb_prefetch", default=None)
 
 # ----------------------------
 # State schema (Pydantic)
 # ----------------------------
-class Priority(str, Enum):
-    LOW = "low"
-    MEDIUM = "medium"
-    HIGH = "high"
-    CRITICAL = "critical"
-
 class SupportState(BaseModel):
     # Input fields
     customer_name: str = Field(..., description="Name of the customer")
@@ -39,11 +51,12 @@ class SupportState(BaseModel):
     escalation_required: Optional[bool] = False
     response_draft: Optional[str] = None
     final_payload: Optional[Dict[str, Any]] = Field(default_factory=dict)
-    clarification_requests: Optional[List[str]] = Field(default_factory=list)
+    clarification_requests: Annotated[List[str], operator.add] = Field(default_factory=list)
 
-    # Control fields
-    current_stage: str = "INIT"
-    completed_stages: List[str] = Field(default_factory=list)
+    # Control fields (reducers let parallel branches update them in the same
+    # step, and keep both in config stage order whichever branch wrote last)
+    current_stage: Annotated[str, latest_stage] = "INIT"
+    completed_stages: Annotated[List[str], in_stage_order] = Field(default_factory=list)
     needs_clarification: bool = False
     is_complete: bool = False
 
@@ -53,26 +66,37 @@ class SupportState(BaseModel):
 
     def validate_state(self):
         """Validate state integrity."""
-        if not self.ticket_id.startswith("TKT-"):
-            raise ValidationError(f"Invalid ticket_id format: {self.ticket_id}")
-        if self.current_stage not in ["INIT"] + [stage["name"] for stage in yaml.safe_load(open("config.yaml"))["stages"]]:
-            raise ValidationError(f"Invalid current_stage: {self.current_stage}")
-
-# ----------------------------
-# Langie helper prints & logging
-# ----------------------------
-def langie(msg: str):
-    print(f"🤖 Langie: {msg}")
-
-def ability_log(ability: str, server: str, payload: Dict[str, Any]):
-    print(f"  ▶ Executing ability: {ability} via {server} MCP with payload keys: {list(payload.keys())}")
+        validate_state_fields(self.ticket_id, self.current_stage)
+
+class BatchResult(BaseModel):
+    # One entry per input ticket, in input order; None where the ticket failed
+    results: List[Optional[SupportState]] = Field(default_factory=list)
+    # Input index -> error message for tickets that failed
+    errors: Dict[int, str] = Field(default_factory=dict)
+    # Input indexes of tickets parked in WAIT until the customer answers
+    parked: List[int] = Field(default_factory=list)
+    elapsed_seconds: float = 0.0
+    tickets_per_second: float = 0.0
+
+    @property
+    def succeeded(self) -> int:
+        return len(self.results) - len(self.errors) - len(self.parked)
 
 # ----------------------------
 # Agent Implementation
 # ----------------------------
 class LangGraphCustomerSupportAgent:
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", state_mode: Literal["pydantic", "typed"] = "pydantic"):
+        # "typed" runs the graph over the SupportStateTyped dict, skipping the
+        # pydantic re-validation LangGraph does before every node; input is
+        # still validated once on entry and the result once on exit
+        if state_mode not in ("pydantic", "typed"):
+            raise ValueError(f"Unknown state mode: {state_mode}")
+        self.state_mode = state_mode
+        self.config_path = config_path
+        self.spec: Optional[WorkflowSpec] = None
         self.config = self.load_config(config_path) if config_path else self.default_config()
+        self.profiler = load_profiler(self.config.get("profiling"))
         self.graph = self.build_graph()
 
     def default_config(self) -> Dict[str, Any]:
@@ -84,110 +108,183 @@ class LangGraphCustomerSupportAgent:
 
     def load_config(self, config_path: str) -> Dict[str, Any]:
         try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
-            # Validate config schema
-            required_fields = ["version", "name", "description", "input_schema", "stages"]
-            if not all(field in config for field in required_fields):
-                raise ValueError(f"Config missing required fields: {required_fields}")
-            return config
+            # Parsed and validated once per process, shared by all agents
+            self.spec = get_workflow_spec(config_path)
+            return self.spec.config
         except Exception as e:
-            print(f"❌ Error loading config: {e}")
+            error_log("❌ Error loading config: %s", e)
             return self.default_config()
 
     def build_graph(self) -> StateGraph:
-        workflow = StateGraph(SupportState)
-
-        workflow.add_node("intake", self.intake_stage)
-        workflow.add_node("understand", self.understand_stage)
-        workflow.add_node("prepare", self.prepare_stage)
-        workflow.add_node("ask", self.ask_stage)
-        workflow.add_node("wait", self.wait_stage)
-        workflow.add_node("retrieve", self.retrieve_stage)
-        workflow.add_node("decide", self.decide_stage)
-        workflow.add_node("update", self.update_stage)
-        workflow.add_node("create", self.create_stage)
-        workflow.add_node("do", self.do_stage)
-        workflow.add_node("complete", self.complete_stage)
-
-        workflow.set_entry_point("intake")
-        workflow.add_edge("intake", "understand")
-        workflow.add_edge("understand", "prepare")
-        workflow.add_edge("prepare", "ask")
-        workflow.add_edge("ask", "wait")
-        workflow.add_edge("wait", "retrieve")
-        workflow.add_edge("retrieve", "decide")
-
-        workflow.add_conditional_edges(
-            "decide",
-            self.should_escalate,
-            {
-                "escalate": "update",
-                "continue": "create"
-            }
-        )
-
-        workflow.add_edge("update", "create")
-        workflow.add_edge("create", "do")
-        workflow.add_edge("do", "complete")
-        workflow.add_edge("complete", END)
-
-        return workflow.compile()
-
-    def should_escalate(self, state: SupportState) -> Literal["escalate", "continue"]:
-        if state.escalation_required:
-            return "escalate"
-        return "continue"
+        """Compile the StateGraph from the `stages` section of the config.
+
+        Stage parents come from the spec's read/write dependency analysis
+        (see workflow_spec.stage_dependencies), so independent stages run as
+        parallel branches and multi-parent stages join on all parents.
+        """
+        if self.spec is None:
+            raise ValueError("Config has no stages; cannot build workflow graph")
+        stages = self.spec.stages
+
+        workflow = StateGraph(SupportStateTyped if self.state_mode == "typed" else SupportState)
+        for stage in stages:
+            workflow.add_node(stage["name"].lower(), self.stage_node(stage))
+
+        deps = self.spec.dependencies
+        entry = stages[0]["name"]
+        workflow.set_entry_point(entry.lower())
+        has_successor = set()
+        for stage in stages[1:]:
+            parents = deps[stage["name"]]
+            has_successor.update(parents)
+            if len(parents) == 1:
+                workflow.add_edge(parents[0].lower(), stage["name"].lower())
+            else:
+                workflow.add_edge([p.lower() for p in parents], stage["name"].lower())
+        for stage in stages:
+            if stage["name"] not in has_successor:
+                workflow.add_edge(stage["name"].lower(), END)
+
+        return workflow.compile(checkpointer=self.checkpointer())
+
+    def stage_node(self, stage: Dict[str, Any]) -> RunnableLambda:
+        """Wrap a configured stage as a graph node.
+
+        The node runs `<name>_stage` under graph.invoke and `a<name>_stage`
+        under graph.ainvoke (falling back to the sync stage in a worker
+        thread). Stages return only the fields they changed; the node keeps
+        the fields the stage declares in `writes` plus the control fields,
+        so parallel branches never write the same key. In "typed" state mode
+        the node hands stages a StateView over the plain dict state. Each
+        node reports itself on the graph's custom stream (see stream()), and
+        is profiled as a section when the ticket is (see profiler.py).
+        """
+        name = stage["name"]
+        keep = set(stage.get("writes", [])) | {"current_stage", "completed_stages"}
+        when = stage.get("when")
+        run_stage = getattr(self, f"{name.lower()}_stage", None)
+        if run_stage is None:
+            raise ValueError(f"No stage implementation for {name}")
+        arun_stage = getattr(self, f"a{name.lower()}_stage", None)
+        typed = self.state_mode == "typed"
+
+        def prepare(state: Any) -> Optional[Any]:
+            if typed:
+                state = StateView(state)
+            if when and not getattr(state, when):
+                langie("⏭️ Skipping %s (%s is not set)", name, when)
+                get_stream_writer()({"event": "stage", "stage": name, "status": "skipped", "elapsed_ms": 0.0, "update": {}})
+                return None
+            return state
+
+        def delta(update: Dict[str, Any], start: float) -> Dict[str, Any]:
+            elapsed = time.perf_counter() - start
+            # Stages swallow their own exceptions and return {} on failure
+            failed = "completed_stages" not in update
+            metrics_registry.observe("stage", (name,), elapsed, failed)
+            event_sink.emit("stage_end", "", level=DEBUG, stage=name, elapsed_ms=elapsed * 1000)
+            update = {field: value for field, value in update.items() if field in keep}
+            get_stream_writer()({"event": "stage", "stage": name, "status": "failed" if failed else "completed",
+                                 "elapsed_ms": elapsed * 1000, "update": update})
+            return update
+
+        def node(state: Any) -> Dict[str, Any]:
+            start = time.perf_counter()
+            state = prepare(state)
+            if state is None:
+                return {}
+            profile = current_profile.get()
+            if profile is None:
+                return delta(run_stage(state), start)
+            with profile.section(name):
+                update = run_stage(state)
+            return delta(update, start)
+
+        async def anode(state: Any) -> Dict[str, Any]:
+            start = time.perf_counter()
+            state = prepare(state)
+            if state is None:
+                return {}
+            if arun_stage is not None:
+                return delta(await arun_stage(state), start)
+            return delta(await asyncio.to_thread(run_stage, state), start)
+
+        return RunnableLambda(node, afunc=anode, name=name.lower())
+
+    def stage_context(self, state: SupportState, stage: str) -> Dict[str, Any]:
+        """The state fields a stage declares in `reads`, for abilities that take a context."""
+        reads = next(s.get("reads", []) for s in self.spec.stages if s["name"] == stage)
+        return {field: getattr(state, field) for field in reads}
 
     # ----------------------------
     # Stage implementations (call abilities via MCP clients)
+    #
+    # Each stage returns only the fields it changed plus its own
+    # current_stage/completed_stages entry; the completed_stages and
+    # clarification_requests reducers append (completed_stages in config
+    # order). A failing stage returns {}.
     # ----------------------------
     def intake_stage(self, state: SupportState) -> Dict[str, Any]:
-        langie("🔹 Stage 1: INTAKE - Accepting payload")
+        stage_log("🔹 Stage 1: INTAKE - Accepting payload")
         try:
             state.validate_state()
-            state_dict = state.model_dump()
-            state_dict["current_stage"] = "INTAKE"
-            state_dict["completed_stages"] = state_dict.get("completed_stages", []) + ["INTAKE"]
-            state_dict["needs_clarification"] = False
-            state_dict["is_complete"] = False
-
-            ability_log("accept_payload", "STATE", {"payload": state_dict})
-            state_dict = state_client.execute("accept_payload", {"payload": state_dict})
-            print(f"✅ Received ticket {state_dict['ticket_id']} from {state_dict['customer_name']}")
-            return state_dict
+            update = {
+                "current_stage": "INTAKE",
+                "completed_stages": ["INTAKE"],
+                "needs_clarification": False,
+                "is_complete": False,
+            }
+
+            ability_log("accept_payload", "STATE", {"payload": update})
+            update = state_client.execute("accept_payload", {"payload": update})
+            result_log("✅ Received ticket %s from %s", state.ticket_id, state.customer_name)
+            return update
         except Exception as e:
-            print(f"❌ Error in INTAKE stage: {e}")
-            return state.model_dump()
+            error_log("❌ Error in INTAKE stage: %s", e)
+            return {}
 
     def understand_stage(self, state: SupportState) -> Dict[str, Any]:
-        langie("🔹 Stage 2: UNDERSTAND - Parsing request and extracting entities")
+        stage_log("🔹 Stage 2: UNDERSTAND - Parsing request and extracting entities")
         try:
-            state_dict = state.model_dump()
-
             ability_log("parse_request_text", "COMMON", {"text": state.query})
             structured = common_client.execute("parse_request_text", {"text": state.query})
 
             ability_log("extract_entities", "ATLAS", {"text": state.query})
             entities = atlas_client.execute("extract_entities", {"text": state.query})
 
-            state_dict["structured_data"] = structured
-            state_dict["extracted_entities"] = entities
-            state_dict["current_stage"] = "UNDERSTAND"
-            state_dict["completed_stages"] = state_dict.get("completed_stages", []) + ["UNDERSTAND"]
+            return self._understand_result(structured, entities)
+        except Exception as e:
+            error_log("❌ Error in UNDERSTAND stage: %s", e)
+            return {}
 
-            print(f"✅ Parsed request: {structured}")
-            print(f"✅ Extracted entities: {entities}")
-            return state_dict
+    async def aunderstand_stage(self, state: SupportState) -> Dict[str, Any]:
+        stage_log("🔹 Stage 2: UNDERSTAND - Parsing request and extracting entities")
+        try:
+            ability_log("parse_request_text", "COMMON", {"text": state.query})
+            ability_log("extract_entities", "ATLAS", {"text": state.query})
+            structured, entities = await asyncio.gather(
+                common_client.aexecute("parse_request_text", {"text": state.query}),
+                atlas_client.aexecute("extract_entities", {"text": state.query}),
+            )
+            return self._understand_result(structured, entities)
         except Exception as e:
-            print(f"❌ Error in UNDERSTAND stage: {e}")
-            return state.model_dump()
+            error_log("❌ Error in UNDERSTAND stage: %s", e)
+            return {}
+
+    def _understand_result(self, structured: Any, entities: Any) -> Dict[str, Any]:
+        result_log("✅ Parsed request: %s", structured)
+        result_log("✅ Extracted entities: %s", entities)
+        return {
+            "structured_data": structured,
+            "extracted_entities": entities,
+            "current_stage": "UNDERSTAND",
+            "completed_stages": ["UNDERSTAND"],
+        }
 
     def prepare_stage(self, state: SupportState) -> Dict[str, Any]:
-        langie("🔹 Stage 3: PREPARE - Normalizing, enriching, and adding flags")
+        stage_log("🔹 Stage 3: PREPARE - Normalizing, enriching, and adding flags")
         try:
-            state_dict = state.model_dump()
-            structured = state_dict.get("structured_data", {})
+            structured = state.structured_data or {}
 
             ability_log("normalize_fields", "COMMON", {"data": structured})
             normalized = common_client.execute("normalize_fields", {"data": structured})
@@ -198,25 +295,45 @@ class LangGraphCustomerSupportAgent:
             ability_log("add_flags_calculations", "COMMON", {"data": structured, "priority": state.priority.value})
             flags = common_client.execute("add_flags_calculations", {"data": {"priority": state.priority.value}})
 
-            state_dict["normalized_fields"] = normalized
-            state_dict["enriched_data"] = enriched
-            state_dict["flags"] = flags
-            state_dict["current_stage"] = "PREPARE"
-            state_dict["completed_stages"] = state_dict.get("completed_stages", []) + ["PREPARE"]
+            return self._prepare_result(normalized, enriched, flags)
+        except Exception as e:
+            error_log("❌ Error in PREPARE stage: %s", e)
+            return {}
+
+    async def aprepare_stage(self, state: SupportState) -> Dict[str, Any]:
+        stage_log("🔹 Stage 3: PREPARE - Normalizing, enriching, and adding flags")
+        try:
+            structured = state.structured_data or {}
 
-            print(f"✅ Normalized data: {normalized}")
-            print(f"✅ Enriched data: {enriched}")
-            print(f"✅ Flags: {flags}")
-            return state_dict
+            ability_log("normalize_fields", "COMMON", {"data": structured})
+            ability_log("enrich_records", "ATLAS", {"data": structured})
+            ability_log("add_flags_calculations", "COMMON", {"data": structured, "priority": state.priority.value})
+            normalized, enriched, flags = await asyncio.gather(
+                common_client.aexecute("normalize_fields", {"data": structured}),
+                atlas_client.aexecute("enrich_records", {"data": structured}),
+                common_client.aexecute("add_flags_calculations", {"data": {"priority": state.priority.value}}),
+            )
+            return self._prepare_result(normalized, enriched, flags)
         except Exception as e:
-            print(f"❌ Error in PREPARE stage: {e}")
-            return state.model_dump()
+            error_log("❌ Error in PREPARE stage: %s", e)
+            return {}
+
+    def _prepare_result(self, normalized: Any, enriched: Any, flags: Any) -> Dict[str, Any]:
+        result_log("✅ Normalized data: %s", normalized)
+        result_log("✅ Enriched data: %s", enriched)
+        result_log("✅ Flags: %s", flags)
+        return {
+            "normalized_fields": normalized,
+            "enriched_data": enriched,
+            "flags": flags,
+            "current_stage": "PREPARE",
+            "completed_stages": ["PREPARE"],
+        }
 
     def ask_stage(self, state: SupportState) -> Dict[str, Any]:
-        langie("🔹 Stage 4: ASK - Determine if clarification is required")
+        stage_log("🔹 Stage 4: ASK - Determine if clarification is required")
         try:
-            state_dict = state.model_dump()
-            entities = state_dict.get("extracted_entities", {})
+            entities = state.extracted_entities or {}
             # Dynamic heuristic: clarification needed if key entities are missing or query is too short
             needs_clarification = (
                 len(state.query.split()) < 5 or
@@ -224,69 +341,79 @@ class LangGraphCustomerSupportAgent:
                 not entities.get("accounts")
             )
 
+            update = {"current_stage": "ASK", "completed_stages": ["ASK"]}
             if needs_clarification:
                 ability_log("clarify_question", "ATLAS", {"missing_info": "Please provide more details about your issue"})
                 clarification = atlas_client.execute("clarify_question", {"missing_info": "Please provide more details about your issue"})
-                print(f"❓ Clarification needed: {clarification}")
-                state_dict["needs_clarification"] = True
-                state_dict.setdefault("clarification_requests", []).append(clarification)
+                result_log("❓ Clarification needed: %s", clarification)
+                update["needs_clarification"] = True
+                update["clarification_requests"] = [clarification]
             else:
-                print("✅ No clarification needed")
-                state_dict["needs_clarification"] = False
-
-            state_dict["current_stage"] = "ASK"
-            state_dict["completed_stages"] = state_dict.get("completed_stages", []) + ["ASK"]
-            return state_dict
+                result_log("✅ No clarification needed")
+                update["needs_clarification"] = False
+            return update
         except Exception as e:
-            print(f"❌ Error in ASK stage: {e}")
-            return state.model_dump()
+            error_log("❌ Error in ASK stage: %s", e)
+            return {}
 
     def wait_stage(self, state: SupportState) -> Dict[str, Any]:
-        langie("🔹 Stage 5: WAIT - If clarification requested, extract answer")
+        stage_log("🔹 Stage 5: WAIT - If clarification requested, wait for the answer")
         try:
-            state_dict = state.model_dump()
-
+            update = {}
             if state.needs_clarification:
-                ability_log("extract_answer", "ATLAS", {"ticket_id": state.ticket_id})
-                answer = atlas_client.execute("extract_answer", {"ticket_id": state.ticket_id})
+                if self.graph.checkpointer is not None:
+                    # Parks the ticket: the run stops here and resume() re-enters
+                    # this stage with the customer's answer as the return value
+                    question = state.clarification_requests[-1] if state.clarification_requests else ""
+                    answer = interrupt({"ticket_id": state.ticket_id, "question": question})
+                else:
+                    ability_log("extract_answer", "ATLAS", {"ticket_id": state.ticket_id})
+                    answer = atlas_client.execute("extract_answer", {"ticket_id": state.ticket_id})
                 ability_log("store_answer", "STATE", {"answer": answer})
-                state_dict = state_client.execute("store_answer", {"state": state_dict, "answer": answer})
-                print(f"✅ Received answer: {answer}")
-                state_dict["needs_clarification"] = False
+                update = state_client.execute("store_answer", {"state": update, "answer": answer})
+                result_log("✅ Received answer: %s", answer)
+                update["needs_clarification"] = False
             else:
-                print("✅ No waiting needed")
+                result_log("✅ No waiting needed")
 
-            state_dict["current_stage"] = "WAIT"
-            state_dict["completed_stages"] = state_dict.get("completed_stages", []) + ["WAIT"]
-            return state_dict
+            update["current_stage"] = "WAIT"
+            update["completed_stages"] = ["WAIT"]
+            return update
+        except GraphInterrupt:
+            raise
         except Exception as e:
-            print(f"❌ Error in WAIT stage: {e}")
-            return state.model_dump()
+            error_log("❌ Error in WAIT stage: %s", e)
+            return {}
 
     def retrieve_stage(self, state: SupportState) -> Dict[str, Any]:
-        langie("🔹 Stage 6: RETRIEVE - Searching knowledge base")
+        stage_log("🔹 Stage 6: RETRIEVE - Searching knowledge base")
         try:
-            state_dict = state.model_dump()
-
-            ability_log("knowledge_base_search", "ATLAS", {"query": state.query})
-            kb_results = atlas_client.execute("knowledge_base_search", {"query": state.query})
+            # The customer's clarification, when there is one, sharpens the search
+            query = f"{state.query} {state.clarification_answer}" if state.clarification_answer else state.query
+            prefetched = kb_prefetch.get()
+            if prefetched is not None and query in prefetched:
+                # Already scored together with the rest of the batch
+                kb_results = prefetched[query]
+            else:
+                ability_log("knowledge_base_search", "ATLAS", {"query": query})
+                kb_results = atlas_client.execute("knowledge_base_search", {"query": query})
 
             ability_log("store_data", "STATE", {"data": kb_results})
-            state_dict = state_client.execute("store_data", {"state": state_dict, "data": kb_results})
+            update = state_client.execute("store_data", {"state": {}, "data": kb_results})
 
-            state_dict["current_stage"] = "RETRIEVE"
-            state_dict["completed_stages"] = state_dict.get("completed_stages", []) + ["RETRIEVE"]
+            update["current_stage"] = "RETRIEVE"
+            update["completed_stages"] = ["RETRIEVE"]
 
-            print(f"✅ Retrieved {len(kb_results)} KB results")
-            return state_dict
+            result_log("✅ Retrieved %s KB results", len(kb_results))
+            return update
         except Exception as e:
-            print(f"❌ Error in RETRIEVE stage: {e}")
-            return state.model_dump()
+            error_log("❌ Error in RETRIEVE stage: %s", e)
+            return {}
 
     def decide_stage(self, state: SupportState) -> Dict[str, Any]:
-        langie("🔹 Stage 7: DECIDE - Evaluating solutions and making decisions")
+        stage_log("🔹 Stage 7: DECIDE - Evaluating solutions and making decisions")
         try:
-            state_dict = state.model_dump()
+            kbs = state.kb_results or []
 
             potential = [
                 {"solution": "Standard troubleshooting", "confidence": 0.7},
@@ -300,7 +427,6 @@ class LangGraphCustomerSupportAgent:
             elif isinstance(eval_result, int):
                 base_score = int(eval_result)
             else:
-                kbs = state_dict.get("kb_results", [])
                 if kbs:
                     base_score = int(max(r.get("relevance", 0.6) * 100 if isinstance(r.get("relevance"), float) else r.get("relevance", 60) for r in kbs))
                 else:
@@ -310,8 +436,8 @@ class LangGraphCustomerSupportAgent:
                 base_score = int(base_score * 100)
 
             priority = state.priority.value
-            sentiment = state_dict.get("structured_data", {}).get("sentiment", "neutral")
-            kb_relevance = max([r.get("relevance", 0.6) for r in state_dict.get("kb_results", [])], default=0.6)
+            sentiment = (state.structured_data or {}).get("sentiment", "neutral")
+            kb_relevance = max([r.get("relevance", 0.6) for r in kbs], default=0.6)
 
             # Dynamic scoring adjustment
             base_score += int(kb_relevance * 10)  # Boost score if KB results are highly relevant
@@ -325,88 +451,114 @@ class LangGraphCustomerSupportAgent:
             escalation_required = atlas_client.execute("escalation_decision", {"score": solution_score})
 
             ability_log("update_payload", "STATE", {"solution_score": solution_score, "escalation_required": escalation_required})
-            state_dict = state_client.execute("update_payload", {
-                "state": state_dict,
+            update = state_client.execute("update_payload", {
+                "state": {},
                 "updates": {"solution_score": solution_score, "escalation_required": bool(escalation_required)}
             })
 
-            state_dict["current_stage"] = "DECIDE"
-            state_dict["completed_stages"] = state_dict.get("completed_stages", []) + ["DECIDE"]
+            update["current_stage"] = "DECIDE"
+            update["completed_stages"] = ["DECIDE"]
 
-            print(f"✅ Solution score: {solution_score}")
-            print(f"✅ Escalation required: {escalation_required}")
-            return state_dict
+            result_log("✅ Solution score: %s", solution_score)
+            result_log("✅ Escalation required: %s", escalation_required)
+            return update
         except Exception as e:
-            print(f"❌ Error in DECIDE stage: {e}")
-            return state.model_dump()
+            error_log("❌ Error in DECIDE stage: %s", e)
+            return {}
 
     def update_stage(self, state: SupportState) -> Dict[str, Any]:
-        langie("🔹 Stage 8: UPDATE - Update or close ticket")
+        stage_log("🔹 Stage 8: UPDATE - Update or close ticket")
         try:
-            state_dict = state.model_dump()
-
             if state.escalation_required:
                 updates = {"status": "escalated", "priority": "high", "assigned_to": "senior_support"}
-                ability_log("update_ticket", "ATLAS", {"ticket_id": state.ticket_id, "updates": updates})
-                atlas_client.execute("update_ticket", {"ticket_id": state.ticket_id, "updates": updates})
-                print("✅ Ticket escalated to senior support")
+                self.side_effect(state.ticket_id, "update_ticket", {"ticket_id": state.ticket_id, "updates": updates})
+                result_log("✅ Ticket escalated to senior support")
             else:
-                ability_log("close_ticket", "ATLAS", {"ticket_id": state.ticket_id})
-                atlas_client.execute("close_ticket", {"ticket_id": state.ticket_id})
-                print("✅ Ticket closed")
+                self.side_effect(state.ticket_id, "close_ticket", {"ticket_id": state.ticket_id})
+                result_log("✅ Ticket closed")
 
-            state_dict["current_stage"] = "UPDATE"
-            state_dict["completed_stages"] = state_dict.get("completed_stages", []) + ["UPDATE"]
-            return state_dict
+            return {"current_stage": "UPDATE", "completed_stages": ["UPDATE"]}
         except Exception as e:
-            print(f"❌ Error in UPDATE stage: {e}")
-            return state.model_dump()
+            error_log("❌ Error in UPDATE stage: %s", e)
+            return {}
 
     def create_stage(self, state: SupportState) -> Dict[str, Any]:
-        langie("🔹 Stage 9: CREATE - Generating response")
+        stage_log("🔹 Stage 9: CREATE - Generating response")
         try:
-            state_dict = state.model_dump()
-
-            ability_log("response_generation", "COMMON", {"context": state_dict})
-            response = common_client.execute("response_generation", {"context": state_dict})
+            context = self.stage_context(state, "CREATE")
+            ability_log("response_generation", "COMMON", {"context": context})
+            response = common_client.execute("response_generation", {"context": context})
 
-            state_dict["response_draft"] = response
-            state_dict["current_stage"] = "CREATE"
-            state_dict["completed_stages"] = state_dict.get("completed_stages", []) + ["CREATE"]
-
-            print(f"✅ Response draft created: {str(response)[:120]}...")
-            return state_dict
+            result_log("✅ Response draft created: %s...", str(response)[:120])
+            return {"response_draft": response, "current_stage": "CREATE", "completed_stages": ["CREATE"]}
         except Exception as e:
-            print(f"❌ Error in CREATE stage: {e}")
-            return state.model_dump()
+            error_log("❌ Error in CREATE stage: %s", e)
+            return {}
 
     def do_stage(self, state: SupportState) -> Dict[str, Any]:
-        langie("🔹 Stage 10: DO - Executing API calls and notifications")
+        stage_log("🔹 Stage 10: DO - Executing API calls and notifications")
         try:
-            state_dict = state.model_dump()
+            api_actions = self._api_actions(state)
+            self.side_effect(state.ticket_id, "execute_api_calls", {"actions": api_actions})
 
-            api_actions = [
-                {"action": "log_ticket", "ticket_id": state.ticket_id},
-                {"action": "update_crm", "customer": state.customer_name}
-            ]
+            if not state.escalation_required:
+                message = f"Your ticket {state.ticket_id} has been resolved."
+                self.side_effect(state.ticket_id, "trigger_notifications", {"recipient": state.email, "message": message})
+                result_log("✅ Notification sent to customer")
+
+            return {"current_stage": "DO", "completed_stages": ["DO"]}
+        except Exception as e:
+            error_log("❌ Error in DO stage: %s", e)
+            return {}
+
+    async def ado_stage(self, state: SupportState) -> Dict[str, Any]:
+        if self.outbox() is not None:
+            # Recording intents is a local commit; nothing to overlap
+            return self.do_stage(state)
+        stage_log("🔹 Stage 10: DO - Executing API calls and notifications")
+        try:
+            api_actions = self._api_actions(state)
             ability_log("execute_api_calls", "ATLAS", {"actions": api_actions})
-            atlas_client.execute("execute_api_calls", {"actions": api_actions})
+            calls = [atlas_client.aexecute("execute_api_calls", {"actions": api_actions})]
 
             if not state.escalation_required:
                 message = f"Your ticket {state.ticket_id} has been resolved."
                 ability_log("trigger_notifications", "ATLAS", {"recipient": state.email, "message": message})
-                atlas_client.execute("trigger_notifications", {"recipient": state.email, "message": message})
-                print("✅ Notification sent to customer")
+                calls.append(atlas_client.aexecute("trigger_notifications", {"recipient": state.email, "message": message}))
 
-            state_dict["current_stage"] = "DO"
-            state_dict["completed_stages"] = state_dict.get("completed_stages", []) + ["DO"]
-            return state_dict
+            await asyncio.gather(*calls)
+            if not state.escalation_required:
+                result_log("✅ Notification sent to customer")
+            return {"current_stage": "DO", "completed_stages": ["DO"]}
         except Exception as e:
-            print(f"❌ Error in DO stage: {e}")
-            return state.model_dump()
+            error_log("❌ Error in DO stage: %s", e)
+            return {}
+
+    def checkpointer(self) -> Optional[SqliteCheckpointer]:
+        return load_checkpointer(self.config.get("checkpointing"))
+
+    def outbox(self) -> Optional[Outbox]:
+        return load_outbox(self.config.get("outbox"), atlas_client.execute_many)
+
+    def side_effect(self, ticket_id: str, ability: str, payload: Dict[str, Any]):
+        """Record a side-effecting ATLAS call in the outbox under the graph
+        run's run_key, or make it now when the outbox is disabled."""
+        outbox = self.outbox()
+        if outbox is None:
+            ability_log(ability, "ATLAS", payload)
+            atlas_client.execute(ability, payload)
+        else:
+            ability_log(ability, "OUTBOX", payload)
+            outbox.enqueue(ticket_id, ability, payload, run_key=get_config()["configurable"]["run_key"])
+
+    def _api_actions(self, state: SupportState) -> List[Dict[str, Any]]:
+        return [
+            {"action": "log_ticket", "ticket_id": state.ticket_id},
+            {"action": "update_crm", "customer": state.customer_name}
+        ]
 
     def complete_stage(self, state: SupportState) -> Dict[str, Any]:
-        langie("🔹 Stage 11: COMPLETE - Outputting final payload")
+        stage_log("🔹 Stage 11: COMPLETE - Outputting final payload")
         try:
             state.validate_state()
             final_payload = {
@@ -417,44 +569,346 @@ class LangGraphCustomerSupportAgent:
                 "solution_score": state.solution_score,
                 "response": state.response_draft,
                 "kb_articles_found": len(state.kb_results),
-                "completed_stages": state.completed_stages
+                "completed_stages": list(state.completed_stages)
             }
 
-            state_dict = state.model_dump()
             ability_log("output_payload", "STATE", {"payload": final_payload})
-            state_dict = state_client.execute("output_payload", {"state": state_dict, "payload": final_payload})
+            update = state_client.execute("output_payload", {"state": {}, "payload": final_payload})
 
-            state_dict["current_stage"] = "COMPLETE"
-            state_dict["completed_stages"] = state_dict.get("completed_stages", []) + ["COMPLETE"]
-            state_dict["is_complete"] = True
+            update["current_stage"] = "COMPLETE"
+            update["completed_stages"] = ["COMPLETE"]
+            update["is_complete"] = True
 
-            print("✅ Final payload generated")
-            print(f"📦 Final Payload: {final_payload}")
-            return state_dict
+            result_log("✅ Final payload generated")
+            result_log("📦 Final Payload: %s", final_payload)
+            return update
         except Exception as e:
-            print(f"❌ Error in COMPLETE stage: {e}")
-            return state.model_dump()
+            error_log("❌ Error in COMPLETE stage: %s", e)
+            return {}
 
     # ----------------------------
     # Run method
     # ----------------------------
-    def run(self, input_data: Dict[str, Any]) -> SupportState:
-        langie("🚀 Starting Customer Support Agent Workflow")
-        print("=" * 60)
-
+    def run(self, input_data: Dict[str, Any], profile: Optional[bool] = None) -> SupportState:
+        """Run one ticket through the graph.
+
+        ``profile`` True/False forces profiling on or off for this ticket;
+        None leaves it to the `profiling` section's sample_rate.
+        """
+        ticket_id = input_data.get("ticket_id")
+        with ticket_context(ticket_id), self.profiler.profile(ticket_id, profile):
+            langie("🚀 Starting Customer Support Agent Workflow")
+            notice_log("=" * 60)
+
+            try:
+                initial_state = SupportState(**input_data)
+                initial_state.validate_state()
+                start = time.perf_counter()
+                config = self.thread_config(initial_state.ticket_id)
+                snapshot = self.graph.get_state(config) if config is not None else None
+                graph_input = None if self.resumable(snapshot, config) else self.graph_input(initial_state)
+                final_state = self.settle(
+                    self.graph.invoke(graph_input, self.run_config(config, snapshot)), config, start)
+            except Exception as e:
+                error_log("❌ Error running workflow: %s", e)
+                return SupportState(**input_data)
+
+            return final_state
+
+    def stream(self, input_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Run one ticket like run(), reporting progress as it goes.
+
+        Yields ``{"event": "stage", "stage", "status", "elapsed_ms", "update"}``
+        as soon as each stage node finishes (status completed, failed or
+        skipped; update is the stage's delta), then one final
+        ``{"event": "complete" | "parked", "state", "elapsed_ms"}``, or
+        ``{"event": "error", "error"}`` if the run failed. Each step of the
+        graph runs in the thread that advances the generator.
+        """
+        ticket_id = input_data.get("ticket_id")
+        start = time.perf_counter()
         try:
-            initial_state = SupportState(**input_data)
-            initial_state.validate_state()
-            final_state_dict = self.graph.invoke(initial_state)
-            final_state = SupportState.from_dict(final_state_dict)
+            with ticket_context(ticket_id):
+                langie("🚀 Starting Customer Support Agent Workflow")
+                notice_log("=" * 60)
+                initial_state = SupportState(**input_data)
+                initial_state.validate_state()
+                config = self.thread_config(initial_state.ticket_id)
+                snapshot = self.graph.get_state(config) if config is not None else None
+                graph_input = None if self.resumable(snapshot, config) else self.graph_input(initial_state)
+                chunks = self.graph.stream(graph_input, self.run_config(config, snapshot),
+                                           stream_mode=["custom", "values"])
+            output: Dict[str, Any] = {}
+            while True:
+                # Set per step: the caller may advance the generator from different threads
+                with ticket_context(ticket_id):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                mode, payload = chunk
+                if mode == "values":
+                    output = payload
+                else:
+                    yield payload
+            with ticket_context(ticket_id):
+                final_state = self.settle(output, config, start)
         except Exception as e:
-            print(f"❌ Error running workflow: {e}")
-            return SupportState(**input_data)
+            with ticket_context(ticket_id):
+                error_log("❌ Error running workflow: %s", e)
+            yield {"event": "error", "error": str(e)}
+            return
+        yield {
+            "event": "parked" if self.is_parked(final_state) else "complete",
+            "state": final_state,
+            "elapsed_ms": (time.perf_counter() - start) * 1000,
+        }
 
-        print("=" * 60)
-        langie("🎉 Workflow completed successfully!")
+    def graph_input(self, initial_state: SupportState) -> Any:
+        return initial_state.model_dump() if self.state_mode == "typed" else initial_state
+
+    async def arun(self, input_data: Dict[str, Any]) -> SupportState:
+        with ticket_context(input_data.get("ticket_id")):
+            langie("🚀 Starting Customer Support Agent Workflow")
+            notice_log("=" * 60)
+
+            try:
+                initial_state = SupportState(**input_data)
+                initial_state.validate_state()
+                start = time.perf_counter()
+                config = self.thread_config(initial_state.ticket_id)
+                snapshot = await self.graph.aget_state(config) if config is not None else None
+                graph_input = None if self.resumable(snapshot, config) else self.graph_input(initial_state)
+                final_state = self.settle(
+                    await self.graph.ainvoke(graph_input, self.run_config(config, snapshot)), config, start)
+            except Exception as e:
+                error_log("❌ Error running workflow: %s", e)
+                return SupportState(**input_data)
+
+            return final_state
+
+    def resume(self, ticket_id: str, answer: str) -> SupportState:
+        """Continue a parked ticket with the customer's answer to its
+        clarification question; the run picks up at WAIT and goes on to
+        RETRIEVE with the answer in the state."""
+        with ticket_context(ticket_id):
+            config = self.parked_config(ticket_id)
+            langie("▶️ Resuming ticket with the customer's answer")
+            notice_log("=" * 60)
+            start = time.perf_counter()
+            run_config = self.run_config(config, self.graph.get_state(config))
+            return self.settle(self.graph.invoke(Command(resume=answer), run_config), config, start)
+
+    async def aresume(self, ticket_id: str, answer: str) -> SupportState:
+        with ticket_context(ticket_id):
+            config = self.parked_config(ticket_id)
+            langie("▶️ Resuming ticket with the customer's answer")
+            notice_log("=" * 60)
+            start = time.perf_counter()
+            run_config = self.run_config(config, await self.graph.aget_state(config))
+            return self.settle(await self.graph.ainvoke(Command(resume=answer), run_config), config, start)
+
+    def settle(self, output: Dict[str, Any], config: Optional[Dict[str, Any]], start: float) -> SupportState:
+        """Final state of a graph run, parking the ticket if WAIT interrupted it."""
+        final_state = SupportState.from_dict(output)
+        interrupts = output.get("__interrupt__")
+        metrics_registry.observe(
+            "ticket", (), time.perf_counter() - start, not (final_state.is_complete or interrupts))
+        notice_log("=" * 60)
+        if interrupts:
+            self.graph.checkpointer.park(final_state.ticket_id, str(interrupts[0].value.get("question", "")))
+            self.graph.checkpointer.compact_thread(final_state.ticket_id)
+            langie("⏸️ Ticket parked until the customer answers: %s", interrupts[0].value.get("question"))
+        else:
+            self.finish_thread(config)
+            langie("🎉 Workflow completed successfully!")
         return final_state
 
+    def is_parked(self, state: Optional[SupportState]) -> bool:
+        """True when the ticket's graph run is waiting on WAIT's interrupt.
+
+        Read from the checkpointed graph, not from state fields: a run that
+        failed after ASK asked for clarification is an error, not parked.
+        """
+        if state is None or state.is_complete:
+            return False
+        config = self.thread_config(state.ticket_id)
+        if config is None:
+            return False  # without checkpointing WAIT never interrupts
+        return any(task.interrupts for task in self.graph.get_state(config).tasks)
+
+    # ----------------------------
+    # Checkpointed threads
+    # ----------------------------
+    def thread_config(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        """Graph config running the ticket on its own checkpoint thread; None without checkpointing."""
+        if self.graph.checkpointer is None:
+            return None
+        return {"configurable": {"thread_id": ticket_id}}
+
+    def resumable(self, snapshot: Any, config: Optional[Dict[str, Any]]) -> bool:
+        """True when the ticket has an unfinished checkpointed run to pick up.
+
+        A finished run left behind (keep_completed) is cleared so the ticket
+        starts over rather than appending to the old state. A parked ticket
+        "resumes" into WAIT again and stays parked until resume() answers it.
+        """
+        if snapshot is None:
+            return False  # no checkpointing
+        if snapshot.next:
+            completed = snapshot.values.get("completed_stages") or []
+            notice_log("♻️ Resuming ticket after %s", completed[-1] if completed else "start")
+            return True
+        if snapshot.values:
+            self.graph.checkpointer.delete_thread(config["configurable"]["thread_id"])
+        return False
+
+    def run_config(self, config: Optional[Dict[str, Any]], snapshot: Any = None) -> Dict[str, Any]:
+        """Graph config for one run of a ticket: its thread config plus a
+        `run_key` that scopes the outbox's de-duplication to this run.
+
+        LangGraph saves `configurable` keys in checkpoint metadata, so a run
+        picked up from its checkpoint (resumed after a crash, or answered
+        after parking) keeps the key it started with; any other run of the
+        same ticket_id gets a new one and delivers its side effects again.
+        """
+        run_key = snapshot.metadata.get("run_key") if snapshot is not None and snapshot.next else None
+        config = config or {}
+        return {**config, "configurable": {**config.get("configurable", {}), "run_key": run_key or uuid.uuid4().hex}}
+
+    def parked_config(self, ticket_id: str) -> Dict[str, Any]:
+        config = self.thread_config(ticket_id)
+        if config is None:
+            raise ValueError("Parking tickets needs checkpointing enabled")
+        if self.graph.checkpointer.parked(ticket_id) is None:
+            raise ValueError(f"Ticket {ticket_id} is not waiting for clarification")
+        return config
+
+    def parked_tickets(self, limit: int = 100, before: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Parked tickets, oldest first: ticket_id, question and parked_at."""
+        if self.graph.checkpointer is None:
+            return []
+        return self.graph.checkpointer.list_parked(limit, before)
+
+    def finish_thread(self, config: Optional[Dict[str, Any]]):
+        settings = self.config.get("checkpointing") or {}
+        if config is not None and not settings.get("keep_completed"):
+            self.graph.checkpointer.delete_thread(config["configurable"]["thread_id"])
+
+    # ----------------------------
+    # Batch execution
+    # ----------------------------
+    def run_ticket(
+        self,
+        input_data: Dict[str, Any],
+        prefetched_kb: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    ) -> Tuple[Optional[SupportState], Optional[str]]:
+        """Run one ticket, returning (final_state, error) instead of raising.
+
+        ``prefetched_kb`` maps queries to KB results already retrieved for
+        them; RETRIEVE uses those instead of searching again. A ticket parked
+        in WAIT is not an error: its state is returned as it was parked.
+        """
+        token = kb_prefetch.set(prefetched_kb)
+        try:
+            final_state = self.run(input_data)
+        except Exception as e:
+            return None, str(e)
+        finally:
+            kb_prefetch.reset(token)
+        if not final_state.is_complete and not self.is_parked(final_state):
+            return None, f"Workflow did not complete (last stage: {final_state.current_stage})"
+        return final_state, None
+
+    def run_batch(
+        self,
+        tickets: Iterable[Dict[str, Any]],
+        workers: int = 4,
+        mode: Literal["thread", "process"] = "thread",
+        prefetch_kb: bool = True,
+    ) -> BatchResult:
+        """Push many tickets through the compiled graph concurrently.
+
+        Results come back in input order; a failing ticket is recorded in
+        ``errors`` and does not abort the rest of the batch. With
+        ``prefetch_kb`` the KB searches of the whole batch run up front as
+        one knowledge_base_search_many call.
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown batch mode: {mode}")
+        tickets = list(tickets)
+        workers = max(1, workers)
+        batch = BatchResult()
+
+        start = time.perf_counter()
+        prefetched = self.prefetch_kb_results(tickets) if prefetch_kb else {}
+        ticket_kb = [
+            {t.get("query", ""): prefetched[t.get("query", "")]} if t.get("query", "") in prefetched else None
+            for t in tickets
+        ]
+        if mode == "thread":
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                outcomes = list(pool.map(self.run_ticket, tickets, ticket_kb))
+        else:
+            chunksize = max(1, len(tickets) // (workers * 4))
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_batch_worker,
+                initargs=(self.config_path, self.state_mode),
+            ) as pool:
+                outcomes = [
+                    (decode_state(state, SupportState) if state is not None else None, error)
+                    for state, error in pool.map(_run_batch_ticket, tickets, ticket_kb, chunksize=chunksize)
+                ]
+        batch.elapsed_seconds = time.perf_counter() - start
+
+        for i, (final_state, error) in enumerate(outcomes):
+            batch.results.append(final_state)
+            if error is not None:
+                batch.errors[i] = error
+            elif self.is_parked(final_state):
+                batch.parked.append(i)
+        if batch.elapsed_seconds > 0:
+            batch.tickets_per_second = len(tickets) / batch.elapsed_seconds
+
+        langie(
+            "📊 Batch finished: %d/%d tickets succeeded, %d parked, in %.2fs (%.1f tickets/s)",
+            batch.succeeded, len(tickets), len(batch.parked), batch.elapsed_seconds, batch.tickets_per_second
+        )
+        return batch
+
+    def prefetch_kb_results(self, tickets: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """KB results for every distinct query of a batch, from one ATLAS call."""
+        queries = list(dict.fromkeys(t.get("query", "") for t in tickets))
+        if not queries:
+            return {}
+        ability_log("knowledge_base_search_many", "ATLAS", {"queries": queries})
+        results = atlas_client.execute("knowledge_base_search_many", {"queries": queries})
+        if not isinstance(results, list):
+            return {}  # error result: RETRIEVE falls back to per-ticket searches
+        return {q: r for q, r in zip(queries, results) if r}
+
+# ----------------------------
+# Process-pool workers (one agent per worker process)
+# ----------------------------
+_worker_agent: Optional[LangGraphCustomerSupportAgent] = None
+
+def _init_batch_worker(config_path: str, state_mode: str):
+    global _worker_agent
+    _worker_agent = LangGraphCustomerSupportAgent(config_path, state_mode)
+
+def _run_batch_ticket(
+    input_data: Dict[str, Any],
+    prefetched_kb: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+) -> Tuple[Optional[bytes], Optional[str]]:
+    # States travel back encoded (state_codec): smaller to pickle, and the
+    # parent rebuilds them without validating them a second time
+    final_state, error = _worker_agent.run_ticket(input_data, prefetched_kb)
+    checkpointer = _worker_agent.graph.checkpointer
+    if checkpointer is not None:
+        # The parent reads the checkpoint to tell parked tickets apart
+        checkpointer.flush()
+    return (encode_state(final_state) if final_state is not None else None), error
+
 # ----------------------------
 # Demo / CLI run
 # ----------------------------
@@ -486,21 +940,20 @@ if __name__ == "__main__":
         "ticket_id": "TKT-10007"
     }
 
+    event_sink.configure(console=True)
     agent = LangGraphCustomerSupportAgent()
-    print("\n--- Running critical sample ---\n")
-    res1 = agent.run(input_critical)
-
-    print("\n--- Running clarification sample ---\n")
-    res2 = agent.run(input_clarify)
+    print("\n--- Running critical, clarification and resolved samples ---\n")
+    batch = agent.run_batch([input_critical, input_clarify, input_resolved], workers=3)
+    for i, error in batch.errors.items():
+        print(f"❌ Sample {i + 1} failed: {error}")
 
-    print("\n--- Running resolved sample ---\n")
-    res3 = agent.run(input_resolved)
+    for i in batch.parked:
+        # The customer answers later; the parked ticket continues from WAIT
+        batch.results[i] = agent.resume(
+            batch.results[i].ticket_id, "It affects my account on the main product and started after yesterday's update")
 
     print("\n\n📊 Demo finished. Final payloads:")
-    print("\nCritical case:")
-    print(json.dumps(res1.final_payload, indent=2))
-    print("\nClarification case:")
-    print(json.dumps(res2.final_payload, indent=2))
-    print("\nResolved case:")
-    print(json.dumps(res3.final_payload, indent=2))
+    for label, res in zip(["Critical", "Clarification", "Resolved"], batch.results):
+        print(f"\n{label} case:")
+        print(json.dumps(res.final_payload if res is not None else {}, indent=2))
 
@@ -3,11 +3,84 @@
 import gradio as gr
 import yaml
 import json
-from agent import LangGraphCustomerSupportAgent, SupportState, Priority
-import io
-from contextlib import redirect_stdout
+import os
+import queue
+import tempfile
+import threading
+from agent import SupportState, Priority
+from graph_registry import graph_registry
+from events import event_sink
+from ingest import ingest_file
 
-# Function to run the agent
+def result_payload(result: SupportState, parked: bool) -> str:
+    if parked:
+        # Parked in WAIT: answer it in "Answer a Clarification" below
+        question = result.clarification_requests[-1] if result.clarification_requests else ""
+        return json.dumps({"ticket_id": result.ticket_id, "status": "waiting_for_clarification", "question": question}, indent=2)
+    return json.dumps(result.final_payload, indent=2)
+
+# ----------------------------
+# Streaming progress
+# ----------------------------
+class TicketProgress:
+    """What the UI shows for one ticket while its stages stream in."""
+
+    def __init__(self, ticket_id):
+        self.ticket_id = ticket_id
+        self.lines = []
+        self.partial = {}
+        self.payload = ""
+        self.error = ""
+
+    def apply(self, event):
+        kind = event["event"]
+        if kind == "stage":
+            icon = {"completed": "✅", "failed": "❌", "skipped": "⏭️"}[event["status"]]
+            self.lines.append(f"{icon} {event['stage']} {event['status']} in {event['elapsed_ms']:.2f} ms")
+            # Partial results: every field the stages have produced so far
+            self.partial.update({k: v for k, v in event["update"].items() if k not in ("current_stage", "completed_stages")})
+            self.payload = json.dumps(self.partial, indent=2, default=str)
+        elif kind == "error":
+            self.error = f"Error running agent: {event['error']}"
+        else:
+            self.lines.append(f"{'⏸️ Parked' if kind == 'parked' else '🎉 Completed'} after {event['elapsed_ms']:.1f} ms")
+            logs = event_sink.render(self.ticket_id)
+            event_sink.clear(self.ticket_id)
+            if logs:
+                self.lines.extend(["", logs])
+            self.payload = result_payload(event["state"], kind == "parked")
+
+    def outputs(self):
+        return "\n".join(self.lines), self.payload, self.error
+
+def stream_tickets(agent, inputs):
+    """Run tickets concurrently, yielding (input index, progress event) as events arrive.
+
+    Each ticket's graph runs start to finish on its own thread, whichever
+    thread Gradio uses to advance this generator.
+    """
+    events = queue.Queue()
+
+    def worker(i, input_data):
+        try:
+            for event in agent.stream(input_data):
+                events.put((i, event))
+        except Exception as e:
+            events.put((i, {"event": "error", "error": str(e)}))
+        finally:
+            events.put((i, None))
+
+    for i, input_data in enumerate(inputs):
+        threading.Thread(target=worker, args=(i, input_data), daemon=True).start()
+    remaining = len(inputs)
+    while remaining:
+        i, event = events.get()
+        if event is None:
+            remaining -= 1
+        else:
+            yield i, event
+
+# Function to run the agent, streaming each stage as it finishes
 def run_agent(customer_name, email, query, priority, ticket_id):
     input_data = {
         "customer_name": customer_name,
@@ -17,18 +90,63 @@ def run_agent(customer_name, email, query, priority, ticket_id):
         "ticket_id": ticket_id
     }
     try:
-        agent = LangGraphCustomerSupportAgent()
-        log_stream = io.StringIO()
-        with redirect_stdout(log_stream):
-            result = agent.run(input_data)
-        logs = log_stream.getvalue()
-        payload = json.dumps(result.final_payload, indent=2)
-        return logs, payload, ""
+        agent = graph_registry.get_agent()
+        # Each ticket logs into its own buffer, so concurrent requests never mix
+        event_sink.clear(ticket_id)
+        progress = TicketProgress(ticket_id)
+        for _, event in stream_tickets(agent, [input_data]):
+            progress.apply(event)
+            yield progress.outputs()
     except Exception as e:
         print(f"DEBUG: Error running agent: {str(e)}")
-        return "", "", f"Error running agent: {str(e)}"
+        yield "", "", f"Error running agent: {str(e)}"
+
+# Function to continue a parked ticket with the customer's answer
+def resume_agent(ticket_id, answer):
+    try:
+        agent = graph_registry.get_agent()
+        event_sink.clear(ticket_id)
+        result = agent.resume(ticket_id, answer)
+        logs = event_sink.render(ticket_id)
+        event_sink.clear(ticket_id)
+        return logs, result_payload(result, agent.is_parked(result)), ""
+    except Exception as e:
+        print(f"DEBUG: Error resuming ticket: {str(e)}")
+        return "", "", f"Error resuming ticket: {str(e)}"
 
-# Function to run demo test cases
+# Function to ingest an uploaded ticket file, streaming progress
+def run_bulk_ingestion(tickets_file, workers, window):
+    if tickets_file is None:
+        yield "Upload a CSV or JSONL file of tickets first.", None
+        return
+    path = tickets_file if isinstance(tickets_file, str) else tickets_file.name
+    name = os.path.splitext(os.path.basename(path))[0]
+    output_path = os.path.join(tempfile.mkdtemp(prefix="ingest-"), f"{name}.results.jsonl")
+    progress = queue.Queue()
+    result = {}
+
+    def work():
+        try:
+            result["stats"] = ingest_file(
+                graph_registry.get_agent(), path, output_path,
+                workers=int(workers or 8), window=int(window or 64),
+                on_progress=lambda stats: progress.put(stats.render()),
+            )
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            progress.put(None)
+
+    threading.Thread(target=work, daemon=True).start()
+    while (line := progress.get()) is not None:
+        yield line, None
+    if "error" in result:
+        print(f"DEBUG: Error ingesting {path}: {result['error']}")
+        yield f"Error ingesting tickets: {result['error']}", None
+    else:
+        yield f"{result['stats'].render()}\nWrote {os.path.basename(output_path)}", output_path
+
+# Function to run demo test cases concurrently, streaming all three
 def run_demo_cases():
     demo_inputs = [
         {
@@ -53,58 +171,92 @@ def run_demo_cases():
             "ticket_id": "TKT-10007"
         }
     ]
-    results = []
-    for i, input_data in enumerate(demo_inputs, 1):
-        try:
-            agent = LangGraphCustomerSupportAgent()
-            log_stream = io.StringIO()
-            with redirect_stdout(log_stream):
-                result = agent.run(input_data)
-            logs = log_stream.getvalue()
-            payload = json.dumps(result.final_payload, indent=2)
-            results.extend([logs, payload, ""])
-            print(f"DEBUG: Demo Case {i} completed successfully")
-        except Exception as e:
-            print(f"DEBUG: Error in Demo Case {i}: {str(e)}")
-            results.extend(["", "", f"Error in Demo Case {i}: {str(e)}"])
-    return results
+    try:
+        agent = graph_registry.get_agent()
+    except Exception as e:
+        print(f"DEBUG: Error in Demo Cases: {str(e)}")
+        yield [value for i in range(1, 4) for value in ("", "", f"Error in Demo Case {i}: {str(e)}")]
+        return
+    progress = []
+    for input_data in demo_inputs:
+        event_sink.clear(input_data["ticket_id"])
+        progress.append(TicketProgress(input_data["ticket_id"]))
+    for i, event in stream_tickets(agent, demo_inputs):
+        progress[i].apply(event)
+        if event["event"] == "error":
+            progress[i].error = f"Error in Demo Case {i + 1}: {event['error']}"
+            print(f"DEBUG: Error in Demo Case {i + 1}: {event['error']}")
+        elif event["event"] != "stage":
+            print(f"DEBUG: Demo Case {i + 1} completed successfully")
+        yield [value for p in progress for value in p.outputs()]
 
 # Gradio interface
 with gr.Blocks(title="Customer Support Agent", theme=gr.themes.Soft(), css=".error-box {background-color: #ffe6e6; border: 2px solid red; padding: 10px;}") as app:
     gr.Markdown("# Customer Support Agent Workflow")
     gr.Markdown("Enter a customer support query to run the Lang Graph agent. View results below or run demo test cases.")
 
-    # Input form
-    gr.Markdown("## Submit a Support Query")
-    with gr.Row():
-        customer_name = gr.Textbox(label="Customer Name", value="John Doe")
-        email = gr.Textbox(label="Email", value="john.doe@example.com")
-    query = gr.Textbox(label="Query", lines=3, value="How to reset my password for the main product?")
-    priority = gr.Dropdown(label="Priority", choices=[e.value for e in Priority], value="medium")
-    ticket_id = gr.Textbox(label="Ticket ID", value="TKT-10008")
-    submit_button = gr.Button("Run Agent")
-
-    # Output for custom query
-    logs_output = gr.Textbox(label="Execution Logs", lines=10, interactive=False)
-    payload_output = gr.JSON(label="Final Payload")
-    error_output = gr.Textbox(label="Errors", lines=3, interactive=False, elem_classes="error-box")
-    submit_button.click(
-        fn=run_agent,
-        inputs=[customer_name, email, query, priority, ticket_id],
-        outputs=[logs_output, payload_output, error_output]
-    )
-
-    # Demo test cases
-    gr.Markdown("## Run Demo Test Cases")
-    demo_button = gr.Button("Run Demo Cases")
-    with gr.Group():
-        demo_outputs = []
-        for i in range(1, 4):
-            gr.Markdown(f"### Demo Case {i}")
-            logs = gr.Textbox(label=f"Logs (Case {i})", lines=5, interactive=False)
-            payload = gr.JSON(label=f"Payload (Case {i})")
-            error = gr.Textbox(label=f"Errors (Case {i})", lines=3, interactive=False, elem_classes="error-box")
-            demo_outputs.extend([logs, payload, error])
-    demo_button.click(fn=run_demo_cases, outputs=demo_outputs)
+    with gr.Tab("Single Ticket"):
+        # Input form
+        gr.Markdown("## Submit a Support Query")
+        with gr.Row():
+            customer_name = gr.Textbox(label="Customer Name", value="John Doe")
+            email = gr.Textbox(label="Email", value="john.doe@example.com")
+        query = gr.Textbox(label="Query", lines=3, value="How to reset my password for the main product?")
+        priority = gr.Dropdown(label="Priority", choices=[e.value for e in Priority], value="medium")
+        ticket_id = gr.Textbox(label="Ticket ID", value="TKT-10008")
+        submit_button = gr.Button("Run Agent")
+
+        # Output for custom query
+        logs_output = gr.Textbox(label="Execution Logs", lines=10, interactive=False)
+        payload_output = gr.JSON(label="Final Payload")
+        error_output = gr.Textbox(label="Errors", lines=3, interactive=False, elem_classes="error-box")
+        submit_button.click(
+            fn=run_agent,
+            inputs=[customer_name, email, query, priority, ticket_id],
+            outputs=[logs_output, payload_output, error_output]
+        )
+
+        # Answer for a ticket parked in WAIT
+        gr.Markdown("## Answer a Clarification")
+        with gr.Row():
+            resume_ticket_id = gr.Textbox(label="Ticket ID", value="TKT-10008")
+            resume_answer = gr.Textbox(label="Customer's Answer", lines=2)
+        resume_button = gr.Button("Resume Ticket")
+        resume_button.click(
+            fn=resume_agent,
+            inputs=[resume_ticket_id, resume_answer],
+            outputs=[logs_output, payload_output, error_output]
+        )
+
+        # Demo test cases
+        gr.Markdown("## Run Demo Test Cases")
+        demo_button = gr.Button("Run Demo Cases")
+        with gr.Group():
+            demo_outputs = []
+            for i in range(1, 4):
+                gr.Markdown(f"### Demo Case {i}")
+                logs = gr.Textbox(label=f"Logs (Case {i})", lines=5, interactive=False)
+                payload = gr.JSON(label=f"Payload (Case {i})")
+                error = gr.Textbox(label=f"Errors (Case {i})", lines=3, interactive=False, elem_classes="error-box")
+                demo_outputs.extend([logs, payload, error])
+        demo_button.click(fn=run_demo_cases, outputs=demo_outputs)
+
+    # Bulk ingestion of a CSV/JSONL file
+    with gr.Tab("Bulk Ingestion"):
+        gr.Markdown("Upload a CSV (with a header row) or JSONL file of tickets with customer_name, email, query, priority and ticket_id.")
+        tickets_file = gr.File(label="Tickets (CSV or JSONL)", file_types=[".csv", ".jsonl", ".ndjson"])
+        with gr.Row():
+            bulk_workers = gr.Number(label="Workers", value=8, precision=0)
+            bulk_window = gr.Number(label="Tickets in flight", value=64, precision=0)
+        bulk_button = gr.Button("Ingest Tickets")
+        bulk_progress = gr.Textbox(label="Progress", lines=3, interactive=False)
+        bulk_results = gr.File(label="Results (JSONL)")
+        bulk_button.click(
+            fn=run_bulk_ingestion,
+            inputs=[tickets_file, bulk_workers, bulk_window],
+            outputs=[bulk_progress, bulk_results]
+        )
 
+# Compile the workflow graph before the first request arrives
+graph_registry.warm_up()
 app.launch()
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""Throughput of one MCP ability over each transport, offline.
+
+Calls an ATLAS ability through the in-process transport and through the
+JSON-RPC transports against the mcp_server.py stand-in (stdio child and
+Unix socket), first one request at a time, then with many requests
+pipelined over the connection pool, and then as concurrent coroutines
+(arequest) on one event loop.
+
+    python -m benchmarks.mcp_transport --calls 5000 --pool-size 4
+"""
+from typing import Any, Callable, Dict
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from mcp_clients import local_servers
+from mcp_transport import SERVER_SCRIPT, make_transport
+
+def calls_per_second(call: Callable[[int], Any], calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        call(i)
+    return calls / (time.perf_counter() - start)
+
+async def gathered_calls_per_second(transport: Any, ability: str, payload: Callable[[int], Dict[str, Any]],
+                                    calls: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(transport.arequest(ability, payload(i)) for i in range(calls)))
+    return calls / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--ability", default="extract_entities")
+    args = parser.parse_args()
+
+    def payload(i: int) -> Dict[str, Any]:
+        return {"text": f"Cannot login to account {i} since yesterday"}
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "mcp.sock")
+    server = subprocess.Popen([sys.executable, SERVER_SCRIPT, "--unix", socket_path], stderr=subprocess.DEVNULL)
+    while not os.path.exists(socket_path):
+        time.sleep(0.05)
+
+    transports = {
+        "inprocess": make_transport("ATLAS", {}, local_servers["ATLAS"]),
+        "stdio": make_transport("ATLAS", {"transport": "stdio", "pool_size": args.pool_size}, None),
+        "unix": make_transport("ATLAS", {"transport": "unix", "path": socket_path, "pool_size": args.pool_size}, None),
+    }
+    results = {}
+    try:
+        for name, transport in transports.items():
+            if hasattr(transport, "submit"):
+                # Open the whole pool before timing (stdio spawns a process per connection)
+                for future in [transport.submit(args.ability, payload(i)) for i in range(64)]:
+                    future.result()
+            transport.request(args.ability, payload(0))
+            results[f"{name}/sequential"] = calls_per_second(lambda i: transport.request(args.ability, payload(i)), args.calls)
+            if hasattr(transport, "submit"):
+                start = time.perf_counter()
+                futures = [transport.submit(args.ability, payload(i)) for i in range(args.calls)]
+                for future in futures:
+                    future.result()
+                results[f"{name}/pipelined"] = args.calls / (time.perf_counter() - start)
+            results[f"{name}/async"] = asyncio.run(
+                gathered_calls_per_second(transport, args.ability, payload, args.calls))
+    finally:
+        for transport in transports.values():
+            transport.close()
+        server.terminate()
+        server.wait()
+
+    print(json.dumps({"ability": args.ability, "calls": args.calls, "calls_per_second": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Size and speed of state_codec against json.dumps(model_dump()).
+
+Encodes/decodes a corpus of fully processed tickets both ways; round trips
+are covered by tests/test_state_codec.py.
+
+    python -m benchmarks.state_codec --tickets 2000 --kb-size 5
+"""
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import time
+
+from agent import SupportState
+from state_codec import encode_state, decode_state
+
+def processed_state(i: int, kb_size: int) -> SupportState:
+    return SupportState(
+        customer_name=f"Customer {i}",
+        email=f"customer{i}@example.com",
+        query=f"Cannot login to account {i} on the main product since yesterday",
+        priority=["low", "medium", "high", "critical"][i % 4],
+        ticket_id=f"TKT-{i:06d}",
+        structured_data={"text": "cannot login to account", "key_phrases": ["login", "account"],
+                         "sentiment": "negative", "sentiment_score": -0.42},
+        extracted_entities={"products": ["main product"], "accounts": [str(i)], "dates": ["yesterday"]},
+        normalized_fields={"priority": "medium", "email": f"customer{i}@example.com"},
+        enriched_data={"sla_hours": 24, "customer_tier": "gold", "history": [f"TKT-{i - 1:06d}"]},
+        flags={"sla_risk": i % 3 == 0, "vip": False},
+        kb_results=[{"title": f"Article {n}", "url": f"https://kb.example.com/{n}", "relevance": 0.9 - n / 100}
+                    for n in range(kb_size)],
+        solution_score=80 + i % 20,
+        escalation_required=i % 5 == 0,
+        response_draft=f"Dear Customer {i},\n\nWe have addressed your query.\n\nBest regards,\nSupport Team",
+        final_payload={"ticket_id": f"TKT-{i:06d}", "status": "resolved", "solution_score": 80 + i % 20},
+        current_stage="COMPLETE",
+        completed_stages=["INTAKE", "UNDERSTAND", "PREPARE", "ASK", "WAIT", "RETRIEVE",
+                          "DECIDE", "UPDATE", "CREATE", "DO", "COMPLETE"],
+        is_complete=True,
+    )
+
+def per_second(fn: Callable[[Any], Any], items: List[Any]) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return len(items) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=2000)
+    parser.add_argument("--kb-size", type=int, default=5, help="KB results carried in each state")
+    args = parser.parse_args()
+
+    states = [processed_state(i, args.kb_size) for i in range(args.tickets)]
+    encoded = [encode_state(s) for s in states]
+    as_json = [json.dumps(s.model_dump(), default=str) for s in states]
+    results: Dict[str, Any] = {
+        "bytes_per_state": {
+            "codec": round(sum(map(len, encoded)) / len(states), 1),
+            "json": round(sum(len(j.encode("utf-8")) for j in as_json) / len(states), 1),
+        },
+        "encode_per_second": {
+            "codec": round(per_second(encode_state, states)),
+            "json": round(per_second(lambda s: json.dumps(s.model_dump(), default=str).encode("utf-8"), states)),
+        },
+        "decode_per_second": {
+            "codec/model": round(per_second(lambda d: decode_state(d, SupportState), encoded)),
+            "codec/typed": round(per_second(decode_state, encoded)),
+            "json/model": round(per_second(lambda j: SupportState(**json.loads(j)), as_json)),
+        },
+    }
+    print(json.dumps({"tickets": args.tickets, "kb_size": args.kb_size, **results}, indent=2))
+
+if __name__ == "__main__":
+    main()
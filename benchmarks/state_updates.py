@@ -0,0 +1,117 @@
+"""Memory/latency benchmark: full-copy stage updates vs. delta updates.
+
+Runs an eleven-node chain that mimics the workflow's state traffic three ways:
+
+* legacy   - every node model_dump()s the pydantic state, rebuilds
+             completed_stages by concatenation and returns the full dict
+             (the behaviour before stages returned deltas)
+* delta    - nodes return only the fields they change (pydantic state)
+* typed    - delta nodes over the SupportStateTyped dict, no re-validation
+
+and then the real agent in its "pydantic" and "typed" state modes.
+
+    python -m benchmarks.state_updates --tickets 200 --kb-size 50
+"""
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import time
+import tracemalloc
+
+from langgraph.graph import StateGraph, END
+
+from agent import LangGraphCustomerSupportAgent, SupportState
+from state_schema import SupportStateTyped
+
+STAGES = ["INTAKE", "UNDERSTAND", "PREPARE", "ASK", "WAIT", "RETRIEVE",
+          "DECIDE", "UPDATE", "CREATE", "DO", "COMPLETE"]
+
+class LegacySupportState(SupportState):
+    # Plain fields, as before the reducers were introduced
+    current_stage: str = "INIT"
+    completed_stages: List[str] = []
+    clarification_requests: List[str] = []
+
+def make_ticket(i: int, kb_size: int) -> Dict[str, Any]:
+    return {
+        "customer_name": f"Customer {i}",
+        "email": f"customer{i}@example.com",
+        "query": "How to reset my password for the main product account? " * 4,
+        "priority": "medium",
+        "ticket_id": f"TKT-{i:06d}",
+        "kb_results": [
+            {"title": f"Article {n}", "url": f"https://example.com/kb/{n}", "relevance": 0.5}
+            for n in range(kb_size)
+        ],
+        "enriched_data": {f"field_{n}": "x" * 32 for n in range(kb_size)},
+    }
+
+def legacy_node(name: str) -> Callable[[Any], Dict[str, Any]]:
+    def node(state):
+        state_dict = state.model_dump()
+        state_dict["current_stage"] = name
+        state_dict["completed_stages"] = state_dict.get("completed_stages", []) + [name]
+        return state_dict
+    return node
+
+def delta_node(name: str) -> Callable[[Any], Dict[str, Any]]:
+    def node(state):
+        return {"current_stage": name, "completed_stages": [name]}
+    return node
+
+def build_chain(schema: Any, make_node: Callable[[str], Callable]) -> Any:
+    workflow = StateGraph(schema)
+    for name in STAGES:
+        workflow.add_node(name.lower(), make_node(name))
+    workflow.set_entry_point(STAGES[0].lower())
+    for a, b in zip(STAGES, STAGES[1:]):
+        workflow.add_edge(a.lower(), b.lower())
+    workflow.add_edge(STAGES[-1].lower(), END)
+    return workflow.compile()
+
+def measure(run_one: Callable[[int], Any], tickets: int) -> Dict[str, float]:
+    run_one(0)  # warm-up
+    start = time.perf_counter()
+    for i in range(tickets):
+        run_one(i)
+    elapsed = time.perf_counter() - start
+
+    # Separate pass: tracemalloc would otherwise dominate the timings
+    tracemalloc.start()
+    for i in range(min(tickets, 20)):
+        run_one(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "ms_per_ticket": round(elapsed / tickets * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--kb-size", type=int, default=50, help="KB results / enriched fields carried in state")
+    args = parser.parse_args()
+
+    inputs = [make_ticket(i, args.kb_size) for i in range(args.tickets)]
+    legacy = build_chain(LegacySupportState, legacy_node)
+    delta = build_chain(SupportState, delta_node)
+    typed = build_chain(SupportStateTyped, delta_node)
+
+    results = {
+        "chain/legacy": measure(lambda i: legacy.invoke(LegacySupportState(**inputs[i])), args.tickets),
+        "chain/delta": measure(lambda i: delta.invoke(SupportState(**inputs[i])), args.tickets),
+        "chain/typed": measure(lambda i: typed.invoke(SupportState(**inputs[i]).model_dump()), args.tickets),
+    }
+
+    for mode in ("pydantic", "typed"):
+        agent = LangGraphCustomerSupportAgent(state_mode=mode)
+        def run_agent(i: int):
+            ticket = {k: inputs[i][k] for k in ("customer_name", "email", "query", "priority", "ticket_id")}
+            agent.run(ticket)
+        results[f"agent/{mode}"] = measure(run_agent, args.tickets)
+
+    print(json.dumps({"tickets": args.tickets, "kb_size": args.kb_size, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Seeded synthetic tickets for load tests and benchmarks.
+
+    python -m benchmarks.synthetic --tickets 1000 --seed 7 > tickets.jsonl
+
+The same TicketMix (seed included) always yields the same tickets. A mix
+controls:
+
+* query length - words per query are log-normal around ``query_words``
+  (median) with shape ``query_sigma``; a template is padded with neutral
+  filler words to that length, never cut below it
+* priorities   - relative weights of low/medium/high/critical
+* clarification_rate - share of tickets whose query lacks the account and
+  product keywords, so ASK parks them (exact: ASK's rule is deterministic)
+* escalation_rate - share of the other tickets written to escalate
+  (negative wording, no KB match). The rest are written to be resolvable
+  (neutral wording, a KB match), but DECIDE's score has random jitter and
+  high/critical tickets lose points, so some of them escalate too: treat
+  the observed rate as at least this
+"""
+from typing import Any, Dict, Iterator, List
+import argparse
+import json
+import math
+import random
+import sys
+
+from pydantic import BaseModel, Field
+
+# Each template has the product and account keywords (or, for CLARIFY, none
+# of them) and no sentiment words beyond the intended ones
+RESOLVABLE = (
+    "I cannot login to my account",
+    "Password reset for my account is not arriving",
+    "How do I change the password on my account",
+    "Please help me login to the account on my phone",
+)
+ESCALATING = (
+    "The product keeps failing with errors on my account",
+    "Billing on my account for the product is broken",
+    "Terrible experience the product crashed and my account lost its settings",
+    "Unable to export invoices from the product on my account",
+)
+CLARIFY = (
+    "It does not work",
+    "Help needed",
+    "Something changed after the last update",
+    "The page stays blank when I open it on my laptop",
+)
+FILLER = (
+    "since", "yesterday", "today", "after", "the", "latest", "update", "on", "my", "laptop",
+    "and", "phone", "when", "I", "try", "again", "it", "still", "happens", "every", "time",
+    "with", "this", "from", "home", "office", "browser", "app", "order", "number", "invoice",
+    "settings", "page", "screen", "team", "member", "email", "address", "region", "plan",
+)
+NAMES = ("Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn")
+
+class TicketMix(BaseModel):
+    seed: int = 42
+    query_words: float = 12.0
+    query_sigma: float = 0.5
+    priorities: Dict[str, float] = Field(default_factory=lambda: {"low": 0.4, "medium": 0.3, "high": 0.2, "critical": 0.1})
+    clarification_rate: float = 0.2
+    escalation_rate: float = 0.3
+
+def query_text(rng: random.Random, template: str, words: int) -> str:
+    tokens = template.split()
+    while len(tokens) < words:
+        # Numbers keep otherwise similar queries distinct (no accidental cache hits)
+        tokens.append(str(rng.randint(1000, 99999)) if rng.random() < 0.1 else rng.choice(FILLER))
+    return " ".join(tokens)
+
+def generate(mix: TicketMix, count: int) -> Iterator[Dict[str, Any]]:
+    """`count` input_schema tickets; ticket_id TKT-<seed>-<n>."""
+    rng = random.Random(mix.seed)
+    levels, weights = zip(*mix.priorities.items())
+    for n in range(count):
+        words = max(1, round(rng.lognormvariate(math.log(mix.query_words), mix.query_sigma)))
+        if rng.random() < mix.clarification_rate:
+            template = rng.choice(CLARIFY)
+        elif rng.random() < mix.escalation_rate:
+            template = rng.choice(ESCALATING)
+        else:
+            template = rng.choice(RESOLVABLE)
+        name = rng.choice(NAMES)
+        yield {
+            "customer_name": f"{name} {n}",
+            "email": f"{name.lower()}.{n}@example.com",
+            "query": query_text(rng, template, words),
+            "priority": rng.choices(levels, weights)[0],
+            "ticket_id": f"TKT-{mix.seed}-{n:06d}",
+        }
+
+def generate_list(mix: TicketMix, count: int) -> List[Dict[str, Any]]:
+    return list(generate(mix, count))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--query-words", type=float, default=12.0, help="median words per query")
+    parser.add_argument("--query-sigma", type=float, default=0.5)
+    parser.add_argument("--clarification-rate", type=float, default=0.2)
+    parser.add_argument("--escalation-rate", type=float, default=0.3)
+    args = parser.parse_args()
+    mix = TicketMix(seed=args.seed, query_words=args.query_words, query_sigma=args.query_sigma,
+                    clarification_rate=args.clarification_rate, escalation_rate=args.escalation_rate)
+    for ticket in generate(mix, args.tickets):
+        sys.stdout.write(json.dumps(ticket) + "\n")
+
+if __name__ == "__main__":
+    main()
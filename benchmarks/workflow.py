@@ -0,0 +1,261 @@
+"""End-to-end workflow benchmark over synthetic tickets, with baselines.
+
+Runs the same seeded ticket set (benchmarks/synthetic.py) through the real
+agent three ways:
+
+* serial - run_ticket() one after another
+* batch  - run_batch() on a thread pool of --workers
+* async  - arun() with --workers tickets in flight on one event loop
+
+Each mode runs in a fresh spawned process with its own checkpoint and
+outbox files in a temp directory, so caches, peak RSS and parked threads do
+not leak from one mode into the next. A mode reports tickets/s, end-to-end
+and per-stage p50/p99 latency (from metrics.py), peak RSS and the observed
+outcome mix next to the requested one.
+
+    python -m benchmarks.workflow --tickets 500 --save baseline.json
+    python -m benchmarks.workflow --tickets 500 --compare baseline.json
+
+--compare exits 1 when throughput fell, or the peak RSS, ticket p50/p99 or
+a serial-mode stage p50 rose, by more than --tolerance (relative) against
+the baseline. Latency changes under --min-delta-ms are ignored as noise.
+Stage latencies of the concurrent modes include waiting for the GIL, and
+per-stage p99 rests on a handful of samples per run, so those are shown
+but only gated with --gate-stage-p99. Each mode runs --repeat times and
+keeps the best value of every metric (as timeit does), which damps
+scheduler noise on shared machines. Before running, the generator is
+checked to be deterministic (exits 2 if not).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+from benchmarks.synthetic import TicketMix, generate_list
+
+MODES = ("serial", "batch", "async")
+
+def isolated_config(config_path: str, directory: str) -> str:
+    """A copy of `config_path` whose checkpoint and outbox files live in `directory`."""
+    with open(config_path, encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    for section, filename in (("checkpointing", "checkpoints.db"), ("outbox", "outbox.db")):
+        if config.get(section):
+            config[section]["path"] = os.path.join(directory, filename)
+    path = os.path.join(directory, "config.yaml")
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    return path
+
+def classify(agent: Any, state: Any, error: Optional[str]) -> str:
+    if error is not None or state is None:
+        return "error"
+    if agent.is_parked(state):
+        return "parked"
+    if not state.is_complete:
+        return "error"
+    return "escalated" if state.escalation_required else "resolved"
+
+def run_mode(mode: str, tickets: List[Dict[str, Any]], workers: int, config_path: str, state_mode: str,
+             seed: int) -> Dict[str, Any]:
+    """One mode in this (spawned) process; returns its report."""
+    from events import event_sink
+    from metrics import metrics_registry
+    from agent import LangGraphCustomerSupportAgent
+
+    event_sink.configure(enabled=False, console=False)
+    # solution_evaluation draws from the module-level RNG
+    random.seed(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        agent = LangGraphCustomerSupportAgent(isolated_config(config_path, directory), state_mode)
+        agent.run_ticket({**tickets[0], "ticket_id": "TKT-warmup"})
+        metrics_registry.reset()
+
+        start = time.perf_counter()
+        if mode == "serial":
+            outcomes = [agent.run_ticket(t) for t in tickets]
+        elif mode == "batch":
+            batch = agent.run_batch(tickets, workers=workers)
+            outcomes = [(state, batch.errors.get(i)) for i, state in enumerate(batch.results)]
+        else:
+            async def run_all() -> List[Tuple[Any, Optional[str]]]:
+                gate = asyncio.Semaphore(workers)
+
+                async def one(ticket: Dict[str, Any]) -> Tuple[Any, Optional[str]]:
+                    async with gate:
+                        try:
+                            return await agent.arun(ticket), None
+                        except Exception as e:
+                            return None, str(e)
+                return await asyncio.gather(*(one(t) for t in tickets))
+            outcomes = asyncio.run(run_all())
+        elapsed = time.perf_counter() - start
+
+        snapshot = metrics_registry.snapshot()
+        counts = {"resolved": 0, "escalated": 0, "parked": 0, "error": 0}
+        for state, error in outcomes:
+            counts[classify(agent, state, error)] += 1
+
+    finished = counts["resolved"] + counts["escalated"]
+    ticket = snapshot.get("ticket", {}).get("all", {})
+    return {
+        "tickets": len(tickets),
+        "elapsed_seconds": round(elapsed, 4),
+        "tickets_per_second": round(len(tickets) / elapsed, 2) if elapsed > 0 else 0.0,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "outcomes": counts,
+        "observed": {
+            "clarification_rate": round(counts["parked"] / len(tickets), 4),
+            "escalation_rate": round(counts["escalated"] / finished, 4) if finished else 0.0,
+        },
+        "ticket": {k: round(ticket.get(k, 0.0), 4) for k in ("p50_ms", "p99_ms")},
+        "stages": {
+            stage: {"count": s["count"], "p50_ms": round(s["p50_ms"], 4), "p99_ms": round(s["p99_ms"], 4)}
+            for stage, s in snapshot.get("stage", {}).items()
+        },
+    }
+
+def best_of(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Highest throughput, lowest latencies and RSS across repeated runs of one mode."""
+    best = min(runs, key=lambda r: r["elapsed_seconds"])
+    result = {**best, "repeats": len(runs)}
+    result["peak_rss_mb"] = min(r["peak_rss_mb"] for r in runs)
+    result["ticket"] = {q: min(r["ticket"][q] for r in runs) for q in best["ticket"]}
+    result["stages"] = {
+        stage: {**stats, **{q: min(r["stages"].get(stage, stats)[q] for r in runs) for q in ("p50_ms", "p99_ms")}}
+        for stage, stats in best["stages"].items()
+    }
+    return result
+
+def generator_is_deterministic(mix: TicketMix) -> bool:
+    first, again = generate_list(mix, 200), generate_list(mix, 200)
+    other = generate_list(mix.model_copy(update={"seed": mix.seed + 1}), 200)
+    return first == again and [t["query"] for t in first] != [t["query"] for t in other]
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# ----------------------------
+# Baselines
+# ----------------------------
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float,
+            min_delta_ms: float, gate_stage_p99: bool = False) -> List[str]:
+    """Print a side-by-side table; returns the regressions found."""
+    regressions: List[str] = []
+    if baseline.get("mix") != current.get("mix") or baseline.get("tickets") != current.get("tickets"):
+        print("⚠️  Baseline used a different ticket mix or count; numbers are not like for like")
+
+    def check(label: str, old: Optional[float], new: Optional[float], higher_is_better: bool, ms: bool,
+              gated: bool = True):
+        if old is None or new is None:
+            return
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        regressed = worse > tolerance and not (ms and abs(new - old) < min_delta_ms)
+        flag = ("  REGRESSION" if gated else "  (not gated)") if regressed else ""
+        print(f"{label:<40} {old:>12.3f} {new:>12.3f} {change:>+9.1%}{flag}")
+        if regressed and gated:
+            regressions.append(label)
+
+    print(f"{'':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for mode, new in current["modes"].items():
+        old = baseline.get("modes", {}).get(mode)
+        if old is None:
+            continue
+        check(f"{mode} tickets/s", old["tickets_per_second"], new["tickets_per_second"], True, False)
+        check(f"{mode} peak RSS MB", old["peak_rss_mb"], new["peak_rss_mb"], False, False)
+        for q in ("p50_ms", "p99_ms"):
+            check(f"{mode} ticket {q}", old["ticket"].get(q), new["ticket"].get(q), False, True)
+        for stage, stats in new["stages"].items():
+            for q in ("p50_ms", "p99_ms"):
+                check(f"{mode} {stage} {q}", old["stages"].get(stage, {}).get(q), stats[q], False, True,
+                      gated=(q == "p50_ms" and mode == "serial") or gate_stage_p99)
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode; the best value of each metric is kept")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"comma-separated subset of {','.join(MODES)}")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--state-mode", choices=["pydantic", "typed"], default="pydantic")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--query-words", type=float, default=12.0, help="median words per query")
+    parser.add_argument("--query-sigma", type=float, default=0.5)
+    parser.add_argument("--clarification-rate", type=float, default=0.2)
+    parser.add_argument("--escalation-rate", type=float, default=0.3)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="relative change counted as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05)
+    parser.add_argument("--gate-stage-p99", action="store_true", help="fail on per-stage p99 regressions too")
+    args = parser.parse_args()
+
+    modes = [m for m in args.modes.split(",") if m]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+    mix = TicketMix(seed=args.seed, query_words=args.query_words, query_sigma=args.query_sigma,
+                    clarification_rate=args.clarification_rate, escalation_rate=args.escalation_rate)
+    if not generator_is_deterministic(mix):
+        print("❌ Synthetic generator is not deterministic for a fixed seed", file=sys.stderr)
+        return 2
+    tickets = generate_list(mix, args.tickets)
+
+    report: Dict[str, Any] = {
+        "tickets": args.tickets,
+        "workers": args.workers,
+        "repeat": args.repeat,
+        "state_mode": args.state_mode,
+        "mix": mix.model_dump(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count(), "revision": git_revision(),
+                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")},
+        "modes": {},
+    }
+    context = multiprocessing.get_context("spawn")
+    for mode in modes:
+        runs = []
+        for _ in range(max(1, args.repeat)):
+            with context.Pool(1) as pool:
+                runs.append(pool.apply(run_mode, (mode, tickets, args.workers, args.config, args.state_mode, args.seed)))
+        result = report["modes"][mode] = best_of(runs)
+        print(f"{mode:<7} {result['tickets_per_second']:>8.1f} tickets/s  "
+              f"p50 {result['ticket']['p50_ms']:.2f} ms  p99 {result['ticket']['p99_ms']:.2f} ms  "
+              f"peak RSS {result['peak_rss_mb']:.0f} MB  {result['outcomes']}")
+
+    print(json.dumps({mode: r["observed"] for mode, r in report["modes"].items()}),
+          f"(requested clarification_rate={mix.clarification_rate}, escalation_rate>={mix.escalation_rate})")
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.tolerance, args.min_delta_ms, args.gate_stage_p99)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            return 1
+        print("✅ No regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,508 @@
+"""Durable LangGraph checkpoints (config.yaml `checkpointing` section).
+
+With checkpointing enabled the graph is compiled with a SqliteCheckpointer
+and every ticket runs on its own thread (thread_id = ticket_id), so LangGraph
+saves the state after each node. When a process dies mid-ticket, the next
+`run` of that ticket picks up after its last completed stage instead of
+starting again from INTAKE and repeating the external calls.
+
+The store is SQLite in WAL mode with the same layout as LangGraph's
+in-memory saver: a row per checkpoint without its channel values, a blob per
+(channel, version) so a step only stores the channels it changed, and the
+pending writes of each task. Values use the saver's serde; larger ones are
+zlib-compressed.
+
+Writes are group-committed: put/put_writes queue their statements and a
+committer thread applies everything queued in the last
+``commit_interval_ms`` (or ``max_batch`` statements, whichever comes first)
+in one transaction. A crash can therefore lose the last few milliseconds of
+checkpoints, which only means those stages run again on resume. Reading a
+thread that has writes queued commits the queue first, so reads always see
+the latest state.
+
+The same store indexes parked tickets: tickets whose WAIT stage interrupted
+the graph to wait for a customer's answer. A parked ticket is only rows
+here (its history compacted to the latest checkpoint), so any number of
+them can wait without holding a thread or coroutine.
+"""
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+import atexit
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from events import error_log, notice_log
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+) WITHOUT ROWID;
+-- Tickets interrupted in WAIT until the customer answers
+CREATE TABLE IF NOT EXISTS parked (
+    ticket_id TEXT PRIMARY KEY,
+    question TEXT NOT NULL,
+    parked_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS parked_age ON parked (parked_at);
+"""
+
+# Non-langgraph types the state channels carry, allowed when loading checkpoints
+ALLOWED_MSGPACK_MODULES = [("state_schema", "Priority")]
+
+# Serialized values at least this long are stored zlib-compressed
+COMPRESS_MIN_BYTES = 512
+ZLIB_SUFFIX = "+zlib"
+
+Statement = Tuple[str, Tuple[Any, ...]]
+
+class SqliteCheckpointer(BaseCheckpointSaver[str]):
+    def __init__(self, path: str, commit_interval_ms: float = 5.0, max_batch: int = 512, serde: Any = None):
+        super().__init__(serde=serde or JsonPlusSerializer(allowed_msgpack_modules=ALLOWED_MSGPACK_MODULES))
+        self.path = path
+        self.commit_interval = max(0.0, commit_interval_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        # _lock serialises use of the connection; _cond guards the queue
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._queue: List[Statement] = []
+        # Threads with queued statements; reads of any other thread skip the flush
+        self._dirty: Set[str] = set()
+        self._closed = False
+        self.commits = 0
+        self.statements = 0
+        self._committer = threading.Thread(target=self._commit_loop, name="checkpoint-committer", daemon=True)
+        self._committer.start()
+
+    # ----------------------------
+    # Group commit
+    # ----------------------------
+    def _enqueue(self, thread_id: str, statements: List[Statement]):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("checkpointer is closed")
+            first = not self._queue
+            self._queue.extend(statements)
+            self._dirty.add(thread_id)
+            if first or len(self._queue) >= self.max_batch:
+                self._cond.notify()
+
+    def _commit_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._queue:
+                    return
+                # Give concurrent tickets the rest of the interval to join this commit
+                deadline = time.monotonic() + self.commit_interval
+                while len(self._queue) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            try:
+                self.flush()
+            except Exception as e:
+                error_log("❌ Checkpoint commit failed: %s", e)
+
+    def flush(self):
+        """Commit everything queued so far in one transaction."""
+        # Take the connection before the queue so batches commit in queue order
+        with self._lock:
+            with self._cond:
+                batch, self._queue = self._queue, []
+                self._dirty = set()
+            if not batch:
+                return
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in batch:
+                    self._db.execute(sql, params)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self.commits += 1
+            self.statements += len(batch)
+
+    def _query(self, sql: str, params: Tuple[Any, ...], thread_id: Optional[str] = None) -> List[Tuple]:
+        if thread_id is None or thread_id in self._dirty:
+            self.flush()
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # ----------------------------
+    # Serialization
+    # ----------------------------
+    def _dump(self, value: Any) -> Tuple[str, bytes]:
+        kind, data = self.serde.dumps_typed(value)
+        if len(data) >= COMPRESS_MIN_BYTES:
+            return kind + ZLIB_SUFFIX, zlib.compress(data, 1)
+        return kind, data
+
+    def _load(self, kind: str, data: bytes) -> Any:
+        if kind.endswith(ZLIB_SUFFIX):
+            kind, data = kind[:-len(ZLIB_SUFFIX)], zlib.decompress(data)
+        return self.serde.loads_typed((kind, data))
+
+    # ----------------------------
+    # BaseCheckpointSaver
+    # ----------------------------
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            rows = self._query(
+                "SELECT checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata FROM checkpoints"
+                " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id), thread_id,
+            )
+        else:
+            rows = self._query(
+                "SELECT checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata FROM checkpoints"
+                " WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns), thread_id,
+            )
+        return self._tuple(thread_id, checkpoint_ns, rows[0]) if rows else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config is not None:
+            configurable = config["configurable"]
+            where.append("thread_id = ?")
+            params.append(configurable["thread_id"])
+            if "checkpoint_ns" in configurable:
+                where.append("checkpoint_ns = ?")
+                params.append(configurable["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        rows = self._query(
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata"
+            " FROM checkpoints" + (" WHERE " + " AND ".join(where) if where else "") +
+            " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC",
+            tuple(params),
+        )
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self._load(row[4], row[5])
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._tuple(thread_id, checkpoint_ns, tuple(row))
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, row: Tuple) -> CheckpointTuple:
+        checkpoint_id, parent_id, kind, data, metadata_kind, metadata = row
+        checkpoint: Checkpoint = self._load(kind, data)
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint, "channel_values": self._load_blobs(
+                thread_id, checkpoint_ns, checkpoint["channel_versions"])},
+            metadata=self._load(metadata_kind, metadata),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                  "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+        )
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        if not versions:
+            return {}
+        channels = list(versions)
+        rows = self._query(
+            "SELECT channel, version, type, value FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?"
+            f" AND channel IN ({','.join('?' * len(channels))})",
+            (thread_id, checkpoint_ns, *channels), thread_id,
+        )
+        wanted = {(channel, str(version)) for channel, version in versions.items()}
+        return {
+            channel: self._load(kind, value)
+            for channel, version, kind, value in rows
+            if (channel, version) in wanted and kind != "empty"
+        }
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[Tuple[str, str, Any]]:
+        rows = self._query(
+            "SELECT task_id, idx, channel, type, value, task_path FROM writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id), thread_id,
+        )
+        rows.sort(key=lambda r: writes_sort_key(r[5], r[0], r[1]))
+        return [(task_id, channel, self._load(kind, value)) for task_id, _, channel, kind, value, _ in rows]
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        stored = checkpoint.copy()
+        values = stored.pop("channel_values")
+        statements: List[Statement] = []
+        for channel, version in new_versions.items():
+            kind, value = self._dump(values[channel]) if channel in values else ("empty", b"")
+            statements.append((
+                "INSERT OR REPLACE INTO blobs (thread_id, checkpoint_ns, channel, version, type, value)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, channel, str(version), kind, value),
+            ))
+        kind, data = self._dump(stored)
+        metadata_kind, metadata_data = self._dump(get_checkpoint_metadata(config, metadata))
+        statements.append((
+            "INSERT OR REPLACE INTO checkpoints"
+            " (thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (thread_id, checkpoint_ns, checkpoint["id"], configurable.get("checkpoint_id"),
+             kind, data, metadata_kind, metadata_data),
+        ))
+        self._enqueue(thread_id, statements)
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config["configurable"]
+        key = (configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"])
+        statements: List[Statement] = []
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            kind, data = self._dump(value)
+            # Regular writes keep their first value on replay; special ones (errors, interrupts) are replaced
+            verb = "INSERT OR IGNORE" if idx >= 0 else "INSERT OR REPLACE"
+            statements.append((
+                f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value,"
+                " task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, task_id, idx, channel, kind, data, task_path),
+            ))
+        self._enqueue(key[0], statements)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._enqueue(thread_id, [
+            (f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            for table in ("checkpoints", "blobs", "writes")
+        ] + [("DELETE FROM parked WHERE ticket_id = ?", (thread_id,))])
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    # ----------------------------
+    # Parked tickets
+    # ----------------------------
+    def park(self, ticket_id: str, question: str):
+        self._enqueue(ticket_id, [(
+            "INSERT OR REPLACE INTO parked (ticket_id, question, parked_at) VALUES (?, ?, ?)",
+            (ticket_id, question, time.time()),
+        )])
+
+    def unpark(self, ticket_id: str):
+        self._enqueue(ticket_id, [("DELETE FROM parked WHERE ticket_id = ?", (ticket_id,))])
+
+    def parked(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT question, parked_at FROM parked WHERE ticket_id = ?", (ticket_id,), ticket_id)
+        return {"ticket_id": ticket_id, "question": rows[0][0], "parked_at": rows[0][1]} if rows else None
+
+    def list_parked(self, limit: int = 100, before: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Oldest parked tickets first; `before` keeps those parked before that time."""
+        rows = self._query(
+            "SELECT ticket_id, question, parked_at FROM parked WHERE parked_at < ? ORDER BY parked_at LIMIT ?",
+            (before if before is not None else float("inf"), limit),
+        )
+        return [{"ticket_id": t, "question": q, "parked_at": at} for t, q, at in rows]
+
+    def parked_count(self) -> int:
+        (count,) = self._query("SELECT COUNT(*) FROM parked", ())[0]
+        return count
+
+    def compact_thread(self, thread_id: str, checkpoint_ns: str = ""):
+        """Drop everything but the latest checkpoint of a thread (and the blobs and writes it needs)."""
+        rows = self._query(
+            "SELECT checkpoint_id, type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+            " ORDER BY checkpoint_id DESC LIMIT 1",
+            (thread_id, checkpoint_ns), thread_id,
+        )
+        if not rows:
+            return
+        checkpoint_id, kind, data = rows[0]
+        versions = [(channel, str(version)) for channel, version in self._load(kind, data)["channel_versions"].items()]
+        key = (thread_id, checkpoint_ns)
+        statements: List[Statement] = [
+            ("DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?",
+             (*key, checkpoint_id)),
+            ("UPDATE checkpoints SET parent_id = NULL WHERE thread_id = ? AND checkpoint_ns = ?", key),
+            ("DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?",
+             (*key, checkpoint_id)),
+        ]
+        if versions:
+            statements.append((
+                "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND (channel, version) NOT IN"
+                f" (VALUES {','.join(['(?, ?)'] * len(versions))})",
+                (*key, *(v for pair in versions for v in pair)),
+            ))
+        else:
+            statements.append(("DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?", key))
+        self._enqueue(thread_id, statements)
+
+    # ----------------------------
+    # Housekeeping
+    # ----------------------------
+    def stats(self) -> Dict[str, Any]:
+        self.flush()
+        with self._lock:
+            (threads,) = self._db.execute("SELECT COUNT(DISTINCT thread_id) FROM checkpoints").fetchone()
+            (parked,) = self._db.execute("SELECT COUNT(*) FROM parked").fetchone()
+        return {
+            "threads": threads,
+            "parked": parked,
+            "commits": self.commits,
+            "statements": self.statements,
+            "mean_commit_size": self.statements / self.commits if self.commits else 0.0,
+        }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._committer.join()
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+# ----------------------------
+# Configured instance
+# ----------------------------
+# Keyed by (pid, path) like the outbox: forked workers open their own connection and committer
+_checkpointers: Dict[Tuple[int, str], SqliteCheckpointer] = {}
+_checkpointers_lock = threading.Lock()
+
+def load_checkpointer(settings: Optional[Dict[str, Any]]) -> Optional[SqliteCheckpointer]:
+    """The checkpointer named in config; None when checkpointing is disabled."""
+    if not settings or not settings.get("enabled"):
+        return None
+    path = os.path.abspath(settings.get("path") or "checkpoints.db")
+    key = (os.getpid(), path)
+    with _checkpointers_lock:
+        checkpointer = _checkpointers.get(key)
+        if checkpointer is None:
+            checkpointer = _checkpointers[key] = SqliteCheckpointer(
+                path,
+                commit_interval_ms=settings.get("commit_interval_ms", 5.0),
+                max_batch=settings.get("max_batch", 512),
+            )
+            notice_log("💾 Checkpointing to %s", path)
+    return checkpointer
+
+@atexit.register
+def _close_checkpointers():
+    with _checkpointers_lock:
+        checkpointers = [c for (pid, _), c in _checkpointers.items() if pid == os.getpid()]
+        _checkpointers.clear()
+    for checkpointer in checkpointers:
+        checkpointer.close()
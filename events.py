@@ -0,0 +1,141 @@
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+from collections import deque
+from contextlib import contextmanager
+import contextvars
+import sys
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+# Ticket the current thread/task is working on; LangGraph copies the context
+# into the threads and tasks that run graph nodes
+current_ticket: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_ticket", default=None)
+
+class Event(NamedTuple):
+    ts: float
+    ticket_id: Optional[str]
+    level: int
+    kind: str            # langie | stage_start | stage_end | ability_call | result | error | notice
+    message: str         # %-style template, formatted only when rendered
+    args: tuple
+    fields: Dict[str, Any]
+
+    def render(self) -> str:
+        text = self.message % self.args if self.args else self.message
+        if self.kind == "ability_call":
+            return f"  ▶ Executing ability: {self.fields['ability']} via {self.fields['server']} MCP with payload keys: {self.fields['keys']}"
+        if self.kind in ("langie", "stage_start"):
+            return f"🤖 Langie: {text}"
+        if self.kind == "stage_end":
+            return f"  ⏱ {self.fields['stage']} finished in {self.fields['elapsed_ms']:.2f} ms"
+        return text
+
+# ----------------------------
+# Event sink (per-ticket ring buffers)
+# ----------------------------
+class EventSink:
+    """Leveled sink that keeps the latest events of each ticket in memory.
+
+    Events are stored unformatted and rendered to text only when asked for,
+    so a disabled (or filtered-out) event costs one attribute check.
+    """
+
+    def __init__(self, enabled: bool = True, level: int = INFO, capacity: int = 256,
+                 max_tickets: int = 1024, console: bool = False):
+        self._buffers: Dict[Optional[str], deque] = {}
+        self._lock = threading.Lock()
+        self.configure(enabled=enabled, level=level, capacity=capacity,
+                       max_tickets=max_tickets, console=console)
+
+    def configure(self, enabled: Optional[bool] = None, level: Optional[int] = None,
+                  capacity: Optional[int] = None, max_tickets: Optional[int] = None,
+                  console: Optional[bool] = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if level is not None:
+            self.level = level
+        if capacity is not None:
+            self.capacity = capacity
+        if max_tickets is not None:
+            self.max_tickets = max_tickets
+        if console is not None:
+            # Echo rendered events to stdout as they happen (CLI use)
+            self.console = console
+
+    def is_enabled_for(self, level: int) -> bool:
+        return self.enabled and level >= self.level
+
+    def emit(self, kind: str, message: str, *args: Any, level: int = INFO,
+             ticket_id: Optional[str] = None, **fields: Any):
+        if not self.enabled or level < self.level:
+            return
+        if ticket_id is None:
+            ticket_id = current_ticket.get()
+        event = Event(time.time(), ticket_id, level, kind, message, args, fields)
+        buffer = self._buffers.get(ticket_id)
+        if buffer is None:
+            with self._lock:
+                buffer = self._buffers.get(ticket_id)
+                if buffer is None:
+                    while len(self._buffers) >= self.max_tickets:
+                        # Oldest ticket first (dicts keep insertion order)
+                        del self._buffers[next(iter(self._buffers))]
+                    buffer = self._buffers[ticket_id] = deque(maxlen=self.capacity)
+        buffer.append(event)
+        if self.console:
+            line = event.render() + "\n"
+            # One write under the lock, so concurrent tickets never interleave a line
+            with self._lock:
+                sys.stdout.write(line)
+
+    def events(self, ticket_id: Optional[str], min_level: int = DEBUG) -> List[Event]:
+        buffer = self._buffers.get(ticket_id)
+        if buffer is None:
+            return []
+        return [e for e in list(buffer) if e.level >= min_level]
+
+    def render(self, ticket_id: Optional[str], min_level: int = DEBUG) -> str:
+        return "\n".join(e.render() for e in self.events(ticket_id, min_level))
+
+    def clear(self, ticket_id: Optional[str] = None):
+        with self._lock:
+            if ticket_id is None:
+                self._buffers.clear()
+            else:
+                self._buffers.pop(ticket_id, None)
+
+event_sink = EventSink()
+
+@contextmanager
+def ticket_context(ticket_id: Optional[str]) -> Iterator[None]:
+    token = current_ticket.set(ticket_id)
+    try:
+        yield
+    finally:
+        current_ticket.reset(token)
+
+# ----------------------------
+# Logging helpers used by the agent and the MCP servers
+# ----------------------------
+def langie(msg: str, *args: Any):
+    event_sink.emit("langie", msg, *args)
+
+def ability_log(ability: str, server: str, payload: Dict[str, Any]):
+    if event_sink.is_enabled_for(INFO):
+        event_sink.emit("ability_call", "", ability=ability, server=server, keys=list(payload.keys()))
+
+def result_log(msg: str, *args: Any):
+    event_sink.emit("result", msg, *args)
+
+def notice_log(msg: str, *args: Any):
+    event_sink.emit("notice", msg, *args)
+
+def error_log(msg: str, *args: Any):
+    event_sink.emit("error", msg, *args, level=ERROR)
+
+def stage_log(msg: str, *args: Any):
+    event_sink.emit("stage_start", msg, *args)
@@ -0,0 +1,152 @@
+"""Dictionary (gazetteer) entity extraction for ATLAS extract_entities.
+
+A gazetteer maps entity categories to canonical values and the phrases that
+mention them:
+
+    products:
+      main_product: [product, login, password]
+      premium_plan: [premium plan, pro tier]
+    accounts:
+      customer_account: [account]
+
+All phrases are compiled once into a word-level Aho-Corasick automaton, so
+a text is scanned in a single pass over its tokens however many phrases the
+dictionary holds. Overlapping mentions resolve leftmost-longest ("premium
+plan" wins over "plan").
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from collections import deque
+import json
+import os
+import re
+
+import yaml
+
+# Reproduces the keywords extract_entities has always recognised
+DEFAULT_GAZETTEER: Dict[str, Dict[str, List[str]]] = {
+    "products": {"main_product": ["product", "login", "password"]},
+    "accounts": {"customer_account": ["account"]},
+    "dates": {"recent_date": ["yesterday", "today"]},
+}
+
+# Words, plus identifiers such as ACC-1042 or plan.v2 kept as one token
+_TOKEN_RE = re.compile(r"[^\W_]+(?:[-_.@/][^\W_]+)*")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+class Gazetteer:
+    """Word-level Aho-Corasick automaton over a category -> value -> phrases dict."""
+
+    def __init__(self, entries: Dict[str, Dict[str, Iterable[str]]]):
+        # products/accounts/dates are always present: ask_stage checks them
+        self.categories: List[str] = list(dict.fromkeys([*DEFAULT_GAZETTEER, *entries]))
+        self._vocab: Dict[str, int] = {}
+        self._entities: List[Tuple[str, str]] = []  # entity id -> (category, value)
+        self._goto: List[Dict[int, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int]]] = [[]]  # node -> [(entity id, phrase length)]
+        self.n_phrases = 0
+        for category, values in entries.items():
+            for value, phrases in (values or {}).items():
+                entity = len(self._entities)
+                self._entities.append((category, value))
+                for phrase in phrases:
+                    self._add(tokenize(phrase), entity)
+        self._link()
+
+    def _add(self, tokens: List[str], entity: int):
+        if not tokens:
+            return
+        node = 0
+        for token in tokens:
+            symbol = self._vocab.setdefault(token, len(self._vocab))
+            child = self._goto[node].get(symbol)
+            if child is None:
+                child = self._goto[node][symbol] = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = child
+        if (entity, len(tokens)) not in self._out[node]:
+            self._out[node].append((entity, len(tokens)))
+            self.n_phrases += 1
+
+    def _link(self):
+        """Breadth-first failure links; each node inherits its suffixes' outputs."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for symbol, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and symbol not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(symbol, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    @classmethod
+    def from_file(cls, path: str, include_defaults: bool = True) -> "Gazetteer":
+        """Load a YAML or JSON gazetteer, merged over DEFAULT_GAZETTEER."""
+        with open(path, "r", encoding="utf-8") as f:
+            loaded = json.load(f) if path.endswith(".json") else yaml.safe_load(f)
+        return cls(merge_gazetteers(DEFAULT_GAZETTEER, loaded or {}) if include_defaults else loaded or {})
+
+    def matches(self, text: str) -> List[Tuple[int, int, str, str]]:
+        """Non-overlapping (start token, length, category, value) mentions."""
+        goto, fail, out, vocab = self._goto, self._fail, self._out, self._vocab
+        found = []
+        node = 0
+        for pos, token in enumerate(tokenize(text)):
+            symbol = vocab.get(token)
+            if symbol is None:
+                node = 0  # no phrase contains this token
+                continue
+            while node and symbol not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(symbol, 0)
+            for entity, length in out[node]:
+                found.append((pos - length + 1, length, entity))
+        found.sort(key=lambda m: (m[0], -m[1]))
+        result = []
+        covered = 0
+        for start, length, entity in found:
+            if start >= covered:
+                result.append((start, length) + self._entities[entity])
+                covered = start + length
+        return result
+
+    def extract(self, text: str) -> Dict[str, List[str]]:
+        """{category: [values in order of first mention]}, one key per category."""
+        entities: Dict[str, List[str]] = {category: [] for category in self.categories}
+        for _, _, category, value in self.matches(text):
+            if value not in entities[category]:
+                entities[category].append(value)
+        return entities
+
+    def extract_many(self, texts: Iterable[str]) -> List[Dict[str, List[str]]]:
+        return [self.extract(text) for text in texts]
+
+def merge_gazetteers(*sources: Dict[str, Dict[str, Iterable[str]]]) -> Dict[str, Dict[str, List[str]]]:
+    merged: Dict[str, Dict[str, List[str]]] = {}
+    for source in sources:
+        for category, values in source.items():
+            for value, phrases in (values or {}).items():
+                merged.setdefault(category, {}).setdefault(value, []).extend(phrases)
+    return merged
+
+# ----------------------------
+# Configured instance (config.yaml `gazetteer` section)
+# ----------------------------
+_gazetteers: Dict[Optional[str], Gazetteer] = {}
+
+def load_gazetteer(settings: Optional[Dict[str, Any]]) -> Gazetteer:
+    """The gazetteer named in config, or the built-in default dictionary."""
+    path = (settings or {}).get("path")
+    key = os.path.abspath(path) if path else None
+    gazetteer = _gazetteers.get(key)
+    if gazetteer is None:
+        gazetteer = Gazetteer.from_file(path) if path else Gazetteer(DEFAULT_GAZETTEER)
+        gazetteer = _gazetteers.setdefault(key, gazetteer)
+    return gazetteer
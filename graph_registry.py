@@ -0,0 +1,56 @@
+from typing import Dict, Iterable, List, Optional
+import threading
+
+from agent import LangGraphCustomerSupportAgent
+from workflow_spec import DEFAULT_CONFIG_PATH, get_workflow_spec
+
+# ----------------------------
+# Compiled-graph registry
+# ----------------------------
+class GraphRegistry:
+    """Thread-safe cache of compiled agents keyed by config content hash.
+
+    Handlers call get_agent() instead of constructing an agent per request,
+    so the StateGraph is compiled once per distinct config.yaml content.
+    """
+
+    def __init__(self):
+        self._agents: Dict[str, LangGraphCustomerSupportAgent] = {}
+        self._lock = threading.Lock()
+
+    def get_agent(self, config_path: str = DEFAULT_CONFIG_PATH) -> LangGraphCustomerSupportAgent:
+        key = get_workflow_spec(config_path).content_hash
+        agent = self._agents.get(key)
+        if agent is not None:
+            return agent
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is None:
+                agent = LangGraphCustomerSupportAgent(config_path)
+                # Key by the spec the agent was actually built from, in case
+                # the file changed between the lookup and the build
+                key = agent.spec.content_hash
+                agent = self._agents.setdefault(key, agent)
+            return agent
+
+    def get_graph(self, config_path: str = DEFAULT_CONFIG_PATH):
+        return self.get_agent(config_path).graph
+
+    def warm_up(self, config_paths: Iterable[str] = (DEFAULT_CONFIG_PATH,)) -> List[str]:
+        """Compile graphs ahead of the first request; returns their keys."""
+        return [self.get_agent(path).spec.content_hash for path in config_paths]
+
+    def invalidate(self, content_hash: Optional[str] = None) -> int:
+        """Drop one compiled graph (or all of them); returns how many were dropped."""
+        with self._lock:
+            if content_hash is None:
+                dropped = len(self._agents)
+                self._agents.clear()
+            else:
+                dropped = 1 if self._agents.pop(content_hash, None) is not None else 0
+        return dropped
+
+    def keys(self) -> List[str]:
+        return list(self._agents)
+
+graph_registry = GraphRegistry()
@@ -0,0 +1,178 @@
+"""Bulk ticket ingestion from CSV or JSONL files.
+
+    python ingest.py tickets.csv -o results.jsonl --workers 8 --window 64
+
+Rows are read lazily and pushed through the agent with at most ``window``
+tickets in flight, so memory stays flat however large the input is. Each
+finished ticket is appended to the output JSONL as soon as it completes
+(in completion order, tagged with its input line), and progress with
+throughput is reported on stderr. Per-ticket logging is switched off.
+
+A CSV file needs a header row naming the input_schema fields
+(customer_name, email, query, priority, ticket_id); a JSONL file holds one
+such object per line.
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Set, TextIO, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from pydantic import BaseModel
+
+from agent import LangGraphCustomerSupportAgent, SupportState
+from events import event_sink
+
+class IngestStats(BaseModel):
+    processed: int = 0
+    succeeded: int = 0
+    parked: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def tickets_per_second(self) -> float:
+        return self.processed / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def render(self) -> str:
+        return (f"{self.processed} tickets ({self.succeeded} ok, {self.parked} parked, {self.failed} failed) "
+                f"in {self.elapsed_seconds:.1f}s, {self.tickets_per_second:.1f} tickets/s")
+
+# (input line, ticket or None, error reading the row)
+Row = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+def read_tickets(path: str) -> Iterator[Row]:
+    """Rows of a .csv or .jsonl/.ndjson file, one at a time."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if ext == ".csv":
+            # Line 1 is the header
+            for line, row in enumerate(csv.DictReader(f), 2):
+                yield line, {k: v for k, v in row.items() if k is not None}, None
+        elif ext in (".jsonl", ".ndjson"):
+            for line, text in enumerate(f, 1):
+                if not text.strip():
+                    continue
+                try:
+                    ticket = json.loads(text)
+                except ValueError as e:
+                    yield line, None, f"invalid JSON: {e}"
+                    continue
+                if isinstance(ticket, dict):
+                    yield line, ticket, None
+                else:
+                    yield line, None, "expected a JSON object"
+        else:
+            raise ValueError(f"Unsupported ticket file type: {path} (expected .csv or .jsonl)")
+
+def outcome(agent: LangGraphCustomerSupportAgent, line: int, ticket_id: Any, state: Optional[SupportState],
+            error: Optional[str]) -> Dict[str, Any]:
+    if error is None and not state.is_complete and not agent.is_parked(state):
+        error = f"Workflow did not complete (last stage: {state.current_stage})"
+    if error is not None:
+        return {"line": line, "ticket_id": ticket_id, "status": "error", "error": error}
+    if not state.is_complete:
+        question = state.clarification_requests[-1] if state.clarification_requests else ""
+        return {"line": line, "ticket_id": ticket_id, "status": "parked", "question": question}
+    return {"line": line, "ticket_id": ticket_id, "status": "complete", "payload": state.final_payload}
+
+def ingest(
+    agent: LangGraphCustomerSupportAgent,
+    rows: Iterable[Row],
+    out: TextIO,
+    workers: int = 8,
+    window: int = 64,
+    on_progress: Optional[Callable[[IngestStats], None]] = None,
+    progress_interval: float = 0.5,
+) -> IngestStats:
+    """Run `rows` through the agent, writing one JSON line per ticket to `out`.
+
+    At most ``window`` tickets are read ahead of the ones finished; two
+    rows with the same ticket_id never run at the same time, since they
+    would share a checkpoint thread.
+    """
+    stats = IngestStats()
+    start = time.perf_counter()
+    last_report = start
+    in_flight: Dict[Future, Tuple[int, Any]] = {}
+    running_ids: Set[Any] = set()
+
+    def record(result: Dict[str, Any]):
+        out.write(json.dumps(result, default=str) + "\n")
+        stats.processed += 1
+        if result["status"] == "complete":
+            stats.succeeded += 1
+        elif result["status"] == "parked":
+            stats.parked += 1
+        else:
+            stats.failed += 1
+
+    def settle(done: Iterable[Future]):
+        nonlocal last_report
+        for future in done:
+            line, ticket_id = in_flight.pop(future)
+            running_ids.discard(ticket_id)
+            try:
+                state, error = future.result()
+            except Exception as e:
+                state, error = None, str(e)
+            event_sink.clear(ticket_id)
+            record(outcome(agent, line, ticket_id, state, error))
+        now = time.perf_counter()
+        if on_progress is not None and now - last_report >= progress_interval:
+            last_report = now
+            stats.elapsed_seconds = now - start
+            on_progress(stats)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for line, ticket, error in rows:
+            if ticket is None:
+                record({"line": line, "ticket_id": None, "status": "error", "error": error})
+                continue
+            ticket_id = ticket.get("ticket_id")
+            while len(in_flight) >= max(1, window) or ticket_id in running_ids:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                settle(done)
+            in_flight[pool.submit(agent.run_ticket, ticket)] = (line, ticket_id)
+            running_ids.add(ticket_id)
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            settle(done)
+
+    out.flush()
+    stats.elapsed_seconds = time.perf_counter() - start
+    if on_progress is not None:
+        on_progress(stats)
+    return stats
+
+def ingest_file(agent: LangGraphCustomerSupportAgent, input_path: str, output_path: str,
+                **kwargs: Any) -> IngestStats:
+    with open(output_path, "w", encoding="utf-8") as out:
+        return ingest(agent, read_tickets(input_path), out, **kwargs)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="tickets as .csv or .jsonl")
+    parser.add_argument("-o", "--output", help="results JSONL (default: <input>.results.jsonl)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--window", type=int, default=64, help="tickets in flight at most")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--state-mode", choices=["pydantic", "typed"], default="typed")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.input)[0] + ".results.jsonl"
+    event_sink.configure(enabled=False, console=False)
+    agent = LangGraphCustomerSupportAgent(args.config, args.state_mode)
+
+    def report(stats: IngestStats):
+        print(f"\r{stats.render()}", end="", file=sys.stderr, flush=True)
+
+    stats = ingest_file(agent, args.input, output, workers=args.workers, window=args.window, on_progress=report)
+    print(f"\nWrote {output}", file=sys.stderr)
+    return 1 if stats.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
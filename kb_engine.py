@@ -0,0 +1,479 @@
+"""Local knowledge-base search engine (BM25 over an inverted index).
+
+Articles are loaded from a directory (``*.json`` article objects, or
+``*.md``/``*.txt`` files whose first line is the title) or from a JSONL file
+with ``title``, ``url`` and ``body``/``text`` fields. The index is a single
+binary file that is opened with mmap, so worker processes share the pages
+instead of each loading a copy:
+
+    python kb_engine.py build kb/articles.jsonl kb/index.kbi
+    python kb_engine.py query kb/index.kbi "how do I reset my password"
+
+Postings are stored per term in descending BM25-impact order, so a top-k
+query reads only the head of each list and stops as soon as no unread
+posting can introduce a new winner (threshold algorithm); the forward index
+then resolves the exact scores of the few candidates still in contention.
+Both steps run as NumPy passes over the mmap-ed arrays.
+
+A batch of queries is scored at once by search_many(): the batch becomes a
+sparse query-term matrix that is multiplied against the postings with NumPy,
+one dense (queries x articles) score block at a time.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from array import array
+from bisect import bisect_left
+from collections import Counter
+import io
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"KBIX"
+FORMAT_VERSION = 1
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 2
+# Postings top_k reads from each list in its first round (then doubling);
+# one NumPy pass over a few thousand postings costs about as much as a small
+# one, and a deeper first read leaves fewer candidates to resolve
+FIRST_READ = 4096
+
+# Relevance reported to DECIDE is on the scale of the built-in sample
+# articles it was tuned on: 0.6 (GENERIC_ARTICLE) for no real match, up to
+# 0.95 for an article covering every query term
+RELEVANCE_FLOOR = 0.6
+RELEVANCE_SPAN = 0.35
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or our "
+    "please the this to was we what when where which why with you your".split()
+)
+
+# magic, version, n_docs, n_terms, n_postings, avgdl, then (offset, length) per section
+_HEADER = struct.Struct("<4sIIIQd")
+_SECTIONS = ("vocab_offsets", "vocab_blob", "post_offsets", "post_docs", "post_impacts",
+             "fwd_offsets", "fwd_terms", "fwd_impacts", "meta_offsets", "meta_blob")
+_SECTION_TABLE = struct.Struct("<" + "QQ" * len(_SECTIONS))
+_TYPECODES = {"vocab_offsets": "Q", "post_offsets": "Q", "post_docs": "I", "post_impacts": "f",
+              "fwd_offsets": "Q", "fwd_terms": "I", "fwd_impacts": "f", "meta_offsets": "Q"}
+assert array("I").itemsize == 4 and array("f").itemsize == 4 and array("Q").itemsize == 8
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Flat positions of the slices [start, start + length), and the slice each came from."""
+    which = np.repeat(np.arange(len(starts)), lengths)
+    index = np.arange(len(which)) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return index, which
+
+# ----------------------------
+# Article loading
+# ----------------------------
+def load_articles(source: str) -> Iterator[Dict[str, str]]:
+    """Yield {"title", "url", "body"} dicts from a directory or a JSONL file."""
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if name.endswith(".json"):
+                    with open(path, "r", encoding="utf-8") as f:
+                        yield _article(json.load(f), default_url=path)
+                elif name.endswith((".md", ".txt")):
+                    with open(path, "r", encoding="utf-8") as f:
+                        title, _, body = f.read().partition("\n")
+                    yield {"title": title.lstrip("# ").strip(), "url": path, "body": body}
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield _article(json.loads(line))
+
+def _article(data: Dict[str, Any], default_url: str = "") -> Dict[str, str]:
+    return {
+        "title": str(data.get("title", "")),
+        "url": str(data.get("url", default_url)),
+        "body": str(data.get("body", data.get("text", ""))),
+    }
+
+# ----------------------------
+# Index build
+# ----------------------------
+def build_index(articles: Iterable[Dict[str, str]]) -> bytes:
+    """Build the binary index image for the given articles."""
+    doc_tfs: List[Counter] = []
+    doc_lens: List[int] = []
+    meta = array("Q", [0])
+    meta_blob = io.BytesIO()
+    df: Counter = Counter()
+    for article in articles:
+        tokens = tokenize(article["title"]) * TITLE_WEIGHT + tokenize(article["body"])
+        tf = Counter(tokens)
+        doc_tfs.append(tf)
+        doc_lens.append(len(tokens))
+        df.update(tf.keys())
+        meta_blob.write(json.dumps([article["title"], article["url"]]).encode("utf-8"))
+        meta.append(meta_blob.tell())
+
+    n_docs = len(doc_tfs)
+    avgdl = (sum(doc_lens) / n_docs) if n_docs else 0.0
+    terms = sorted(df)
+    term_ids = {term: i for i, term in enumerate(terms)}
+    idf = [math.log(1 + (n_docs - df[t] + 0.5) / (df[t] + 0.5)) for t in terms]
+
+    postings: List[List[Tuple[float, int]]] = [[] for _ in terms]
+    fwd_offsets = array("Q", [0])
+    fwd_terms = array("I")
+    fwd_impacts = array("f")
+    for doc, (tf, dl) in enumerate(zip(doc_tfs, doc_lens)):
+        norm = K1 * (1 - B + B * dl / avgdl) if avgdl else K1
+        entries = sorted((term_ids[t], idf[term_ids[t]] * c * (K1 + 1) / (c + norm)) for t, c in tf.items())
+        for tid, impact in entries:
+            postings[tid].append((impact, doc))
+            fwd_terms.append(tid)
+            fwd_impacts.append(impact)
+        fwd_offsets.append(len(fwd_terms))
+
+    post_offsets = array("Q", [0])
+    post_docs = array("I")
+    post_impacts = array("f")
+    for plist in postings:
+        plist.sort(key=lambda p: (-p[0], p[1]))
+        post_docs.extend(doc for _, doc in plist)
+        post_impacts.extend(impact for impact, _ in plist)
+        post_offsets.append(len(post_docs))
+
+    vocab_offsets = array("Q", [0])
+    vocab_blob = io.BytesIO()
+    for term in terms:
+        vocab_blob.write(term.encode("utf-8"))
+        vocab_offsets.append(vocab_blob.tell())
+
+    sections = {
+        "vocab_offsets": vocab_offsets.tobytes(), "vocab_blob": vocab_blob.getvalue(),
+        "post_offsets": post_offsets.tobytes(), "post_docs": post_docs.tobytes(),
+        "post_impacts": post_impacts.tobytes(), "fwd_offsets": fwd_offsets.tobytes(),
+        "fwd_terms": fwd_terms.tobytes(), "fwd_impacts": fwd_impacts.tobytes(),
+        "meta_offsets": meta.tobytes(), "meta_blob": meta_blob.getvalue(),
+    }
+    out = io.BytesIO()
+    out.write(b"\0" * (_HEADER.size + _SECTION_TABLE.size))
+    table = []
+    for name in _SECTIONS:
+        out.write(b"\0" * (-out.tell() % 8))  # keep every array 8-byte aligned
+        table += [out.tell(), len(sections[name])]
+        out.write(sections[name])
+    out.seek(0)
+    out.write(_HEADER.pack(MAGIC, FORMAT_VERSION, n_docs, len(terms), len(post_docs), avgdl))
+    out.write(_SECTION_TABLE.pack(*table))
+    return out.getvalue()
+
+# ----------------------------
+# Query side
+# ----------------------------
+class KnowledgeBase:
+    """Read-only view over an index image (bytes or an mmap of the index file)."""
+
+    def __init__(self, buffer: Any, path: Optional[str] = None):
+        self.path = path
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, version, self.n_docs, self.n_terms, self.n_postings, self.avgdl = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Not a version {FORMAT_VERSION} KB index: {path or '<buffer>'}")
+        table = _SECTION_TABLE.unpack_from(view, _HEADER.size)
+        for i, name in enumerate(_SECTIONS):
+            offset, length = table[2 * i], table[2 * i + 1]
+            section = view[offset:offset + length]
+            setattr(self, f"_{name}", section.cast(_TYPECODES[name]) if name in _TYPECODES else section)
+        self._postings_np: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._forward_np: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def build(cls, articles: Iterable[Dict[str, str]]) -> "KnowledgeBase":
+        return cls(build_index(articles))
+
+    @classmethod
+    def open(cls, path: str) -> "KnowledgeBase":
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, path)
+
+    def save(self, path: str):
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self._buffer)
+        os.replace(tmp, path)
+
+    def close(self):
+        self._postings_np = self._forward_np = None  # NumPy views hold exports of the sections
+        for name in _SECTIONS:
+            getattr(self, f"_{name}").release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def term_id(self, term: str) -> Optional[int]:
+        """Binary search of the sorted vocabulary, straight off the buffer."""
+        key = term.encode("utf-8")
+        offsets, blob = self._vocab_offsets, self._vocab_blob
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = blob[offsets[mid]:offsets[mid + 1]].tobytes()
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def document(self, doc: int) -> Tuple[str, str]:
+        title, url = json.loads(self._meta_blob[self._meta_offsets[doc]:self._meta_offsets[doc + 1]].tobytes())
+        return title, url
+
+    def query_terms(self, query: str) -> List[int]:
+        seen = []
+        for token in tokenize(query):
+            tid = self.term_id(token)
+            if tid is not None and tid not in seen:
+                seen.append(tid)
+        return seen
+
+    def term_impacts(self, docs: np.ndarray, term_ids: np.ndarray) -> np.ndarray:
+        """(docs x terms) impacts from the forward index, 0 where a document
+        lacks the term.
+
+        Each document's entries are sorted by term id, so every (doc, term)
+        pair is found by a binary search over the document's slice; the
+        searches for all pairs advance together, one NumPy step per halving.
+        """
+        offsets, terms, impacts = self.forward_arrays()
+        lo = np.repeat(offsets[docs], len(term_ids))
+        hi = np.repeat(offsets[docs + 1], len(term_ids))
+        end = hi.copy()
+        target = np.tile(term_ids, len(docs))
+        while True:
+            active = lo < hi
+            if not active.any():
+                break
+            mid = (lo + hi) // 2
+            below = active & (terms[np.minimum(mid, len(terms) - 1)] < target)
+            lo = np.where(below, mid + 1, lo)
+            hi = np.where(active & ~below, mid, hi)
+        found = lo < end
+        found[found] = terms[lo[found]] == target[found]
+        out = np.zeros(len(target))
+        out[found] = impacts[lo[found]]
+        return out.reshape(len(docs), len(term_ids))
+
+    def top_k(self, term_ids: List[int], k: int) -> List[Tuple[int, float]]:
+        """Exact top-k (doc, BM25 score) with early termination.
+
+        Postings are read in impact order, FIRST_READ of each list and then
+        twice as many each round, until the sum of the next unread impacts
+        (the best score a document not seen yet could reach) drops to the
+        current k-th partial score. The seen documents whose upper bound can
+        still reach that score are then scored exactly through the forward
+        index (term_impacts). Each round and the resolution are NumPy passes.
+        """
+        if not term_ids or k <= 0:
+            return []
+        offsets, docs, impacts = self.postings_arrays()
+        terms = np.asarray(term_ids, dtype=np.int64)
+        starts, ends = offsets[terms], offsets[terms + 1]
+        lengths = ends - starts
+        read = np.minimum(lengths, FIRST_READ)
+        while True:
+            index, which = _ranges(starts, read)
+            seen, slot = np.unique(docs[index], return_inverse=True)
+            partial = np.bincount(slot, weights=impacts[index], minlength=len(seen))
+            # Next unread impact of each list (0 once a list is exhausted)
+            frontier = np.where(read < lengths, impacts[np.minimum(starts + read, ends - 1)], 0.0)
+            threshold = frontier.sum()
+            if threshold == 0.0:
+                break  # every list exhausted: partial scores are exact
+            if len(seen) >= k:
+                kth = np.partition(partial, len(seen) - k)[len(seen) - k]
+                if threshold <= kth:
+                    break
+            read = np.minimum(lengths, read * 2)
+
+        scores = partial
+        if threshold > 0.0:
+            # Only seen documents can still make the top k; an unread term adds
+            # at most its list's frontier impact
+            unseen = np.ones((len(seen), len(terms)), dtype=bool)
+            unseen[slot, which] = False
+            unseen &= frontier > 0.0
+            bound = partial + unseen @ frontier
+            pending = (bound >= kth) & unseen.any(axis=1)
+            if pending.any():
+                scores[pending] = self.term_impacts(seen[pending], terms).sum(axis=1)
+        order = np.lexsort((seen, -scores))[:k]
+        return list(zip(seen[order].tolist(), scores[order].tolist()))
+
+    def relevance(self, term_ids: List[int], top: List[Tuple[int, float]]) -> List[float]:
+        """Relevance of each top_k hit on DECIDE's confidence scale.
+
+        The share of the query's IDF weight an article's terms cover, scaled
+        by its score relative to the best hit, mapped onto RELEVANCE_FLOOR ..
+        RELEVANCE_FLOOR + RELEVANCE_SPAN. A raw score over the sum of each
+        term's best impact rarely nears 1 for a multi-term query, since no
+        single article holds every term's best posting.
+        """
+        if not top:
+            return []
+        post_offsets, fwd_offsets, fwd_terms = self._post_offsets, self._fwd_offsets, self._fwd_terms
+        idf = []
+        for tid in term_ids:
+            df = post_offsets[tid + 1] - post_offsets[tid]
+            idf.append(math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5)))
+        total = sum(idf)
+        best = top[0][1]
+        relevance = []
+        for doc, score in top:
+            start, end = fwd_offsets[doc], fwd_offsets[doc + 1]
+            covered = 0.0
+            for tid, weight in zip(term_ids, idf):
+                i = bisect_left(fwd_terms, tid, start, end)
+                if i < end and fwd_terms[i] == tid:
+                    covered += weight
+            quality = covered / total * score / best
+            relevance.append(round(RELEVANCE_FLOOR + RELEVANCE_SPAN * quality, 4))
+        return relevance
+
+    def postings_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(post_offsets, post_docs, post_impacts) as zero-copy NumPy arrays."""
+        if self._postings_np is None:
+            self._postings_np = (
+                np.frombuffer(self._post_offsets, dtype=np.uint64).astype(np.int64, copy=False),
+                np.frombuffer(self._post_docs, dtype=np.uint32),
+                np.frombuffer(self._post_impacts, dtype=np.float32),
+            )
+        return self._postings_np
+
+    def forward_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(fwd_offsets, fwd_terms, fwd_impacts) as zero-copy NumPy arrays."""
+        if self._forward_np is None:
+            self._forward_np = (
+                np.frombuffer(self._fwd_offsets, dtype=np.uint64).astype(np.int64, copy=False),
+                np.frombuffer(self._fwd_terms, dtype=np.uint32),
+                np.frombuffer(self._fwd_impacts, dtype=np.float32),
+            )
+        return self._forward_np
+
+    def top_k_many(self, queries: List[List[int]], k: int,
+                   max_cells: int = 1 << 22) -> List[List[Tuple[int, float]]]:
+        """Exact top-k (doc, BM25 score) for each query of a batch.
+
+        Each block of queries is scored as the sparse product of its
+        query-term matrix with the term-article impact matrix: every posting
+        of a term in the block is expanded once per query that uses it and
+        summed into a dense (queries x articles) block with one bincount.
+        Blocks are sized so that the dense block stays under max_cells
+        scores; argpartition then picks each row's k best.
+        """
+        results: List[List[Tuple[int, float]]] = [[] for _ in queries]
+        n = self.n_docs
+        if k <= 0 or not n:
+            return results
+        offsets, docs, impacts = self.postings_arrays()
+        k = min(k, n)
+        rows_per_block = max(1, max_cells // n)
+        for first in range(0, len(queries), rows_per_block):
+            block = queries[first:first + rows_per_block]
+            rows_by_term: Dict[int, List[int]] = {}
+            for row, term_ids in enumerate(block):
+                for tid in term_ids:
+                    rows_by_term.setdefault(tid, []).append(row)
+            if not rows_by_term:
+                continue
+            cells, weights = [], []
+            for tid, rows in rows_by_term.items():
+                start, end = offsets[tid], offsets[tid + 1]
+                row_base = np.asarray(rows, dtype=np.int64)[:, None] * n
+                cells.append((row_base + docs[start:end]).ravel())
+                weights.append(np.broadcast_to(impacts[start:end], (len(rows), end - start)).ravel())
+            scores = np.bincount(np.concatenate(cells), weights=np.concatenate(weights),
+                                 minlength=len(block) * n).reshape(len(block), n)
+            if k < n:
+                candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                candidates = np.broadcast_to(np.arange(n), scores.shape)
+            picked = np.take_along_axis(scores, candidates, axis=1)
+            order = np.lexsort((candidates, -picked))
+            for row in range(len(block)):
+                results[first + row] = [
+                    (doc, score)
+                    for doc, score in zip(candidates[row, order[row]].tolist(), picked[row, order[row]].tolist())
+                    if score > 0.0
+                ]
+        return results
+
+    def search_many(self, queries: List[str], k: int = 3) -> List[List[Dict[str, Any]]]:
+        """search() for a batch of queries, scored together by top_k_many()."""
+        term_ids = [self.query_terms(query) for query in queries]
+        return [self.hits(terms, top) for terms, top in zip(term_ids, self.top_k_many(term_ids, k))]
+
+    def search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+        """Top-k articles as {"title", "url", "relevance"}, best first (see relevance())."""
+        term_ids = self.query_terms(query)
+        if not term_ids:
+            return []
+        return self.hits(term_ids, self.top_k(term_ids, k))
+
+    def hits(self, term_ids: List[int], top: List[Tuple[int, float]]) -> List[Dict[str, Any]]:
+        results = []
+        for (doc, _), relevance in zip(top, self.relevance(term_ids, top)):
+            title, url = self.document(doc)
+            results.append({"title": title, "url": url, "relevance": relevance})
+        return results
+
+# ----------------------------
+# Configured instance (config.yaml `knowledge_base` section)
+# ----------------------------
+_knowledge_bases: Dict[str, KnowledgeBase] = {}
+
+def load_knowledge_base(settings: Optional[Dict[str, Any]]) -> Optional[KnowledgeBase]:
+    """Open (building first if needed) the index named in config; None if unset."""
+    if not settings or not (settings.get("index") or settings.get("source")):
+        return None
+    index_path = settings.get("index")
+    source = settings.get("source")
+    key = os.path.abspath(index_path or source)
+    kb = _knowledge_bases.get(key)
+    if kb is None:
+        if index_path and os.path.exists(index_path):
+            kb = KnowledgeBase.open(index_path)
+        else:
+            kb = KnowledgeBase.build(load_articles(source))
+            if index_path:
+                kb.save(index_path)
+                kb = KnowledgeBase.open(index_path)
+        kb = _knowledge_bases.setdefault(key, kb)
+    return kb
+
+def main(argv: List[str]) -> int:
+    if len(argv) == 3 and argv[0] == "build":
+        kb = KnowledgeBase.build(load_articles(argv[1]))
+        kb.save(argv[2])
+        print(f"Indexed {kb.n_docs} articles, {kb.n_terms} terms, {kb.n_postings} postings -> {argv[2]}")
+        return 0
+    if len(argv) >= 3 and argv[0] == "query":
+        kb = KnowledgeBase.open(argv[1])
+        print(json.dumps(kb.search(" ".join(argv[2:]), k=5), indent=2))
+        return 0
+    print("usage: python kb_engine.py build <articles dir|.jsonl> <index>\n"
+          "       python kb_engine.py query <index> <text>")
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,101 @@
+"""Micro-batching of concurrent MCP calls (config.yaml `servers.<name>.batching`).
+
+Calls to the same ability that arrive within ``max_delay_ms`` of each other
+are collected, up to ``max_batch_size``, and sent as one execute_many
+request; each caller gets a Future for its own result. A batch is flushed
+as soon as it is full, or when its oldest call has waited max_delay_ms.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import time
+
+class MicroBatcher:
+    def __init__(self, send_many: Callable[[str, List[Dict[str, Any]]], List[Any]],
+                 max_batch_size: int = 32, max_delay_ms: float = 2.0, max_concurrent_batches: int = 8,
+                 name: str = "mcp-batcher"):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay = max(0.0, max_delay_ms) / 1000.0
+        self._send_many = send_many
+        # ability -> (deadline, [(payload, future)])
+        self._pending: Dict[str, Tuple[float, List[Tuple[Dict[str, Any], Future]]]] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._senders = ThreadPoolExecutor(max_workers=max(1, max_concurrent_batches), thread_name_prefix=name)
+        self.batches = 0
+        self.calls = 0
+        self._timer = threading.Thread(target=self._timer_loop, name=f"{name}-timer", daemon=True)
+        self._timer.start()
+
+    def submit(self, ability: str, payload: Dict[str, Any]) -> Future:
+        future: Future = Future()
+        full = None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("batcher is closed")
+            deadline, calls = self._pending.get(ability) or (time.monotonic() + self.max_delay, [])
+            calls.append((payload, future))
+            if len(calls) >= self.max_batch_size:
+                self._pending.pop(ability, None)
+                full = calls
+            elif len(calls) == 1:
+                # New batch: the timer has a new deadline to wait for
+                self._pending[ability] = (deadline, calls)
+                self._cond.notify()
+        if full is not None:
+            self._dispatch(ability, full)
+        return future
+
+    def _timer_loop(self):
+        while True:
+            due: List[Tuple[str, List[Tuple[Dict[str, Any], Future]]]] = []
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+                now = time.monotonic()
+                next_deadline: Optional[float] = None
+                for ability, (deadline, calls) in list(self._pending.items()):
+                    if deadline <= now or self._closed:
+                        del self._pending[ability]
+                        due.append((ability, calls))
+                    elif next_deadline is None or deadline < next_deadline:
+                        next_deadline = deadline
+                if not due and next_deadline is not None:
+                    self._cond.wait(next_deadline - now)
+            for ability, calls in due:
+                self._dispatch(ability, calls)
+
+    def _dispatch(self, ability: str, calls: List[Tuple[Dict[str, Any], Future]]):
+        self.batches += 1
+        self.calls += len(calls)
+        self._senders.submit(self._send, ability, calls)
+
+    def _send(self, ability: str, calls: List[Tuple[Dict[str, Any], Future]]):
+        try:
+            results = self._send_many(ability, [payload for payload, _ in calls])
+            if not isinstance(results, list) or len(results) != len(calls):
+                raise RuntimeError(f"{ability}: batch returned {len(results) if isinstance(results, list) else results!r} "
+                                   f"results for {len(calls)} calls")
+        except Exception as e:
+            for _, future in calls:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(calls, results):
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "calls": self.calls,
+            "mean_batch_size": self.calls / self.batches if self.batches else 0.0,
+        }
+
+    def close(self):
+        """Flush whatever is pending, then stop."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._timer.join()
+        self._senders.shutdown(wait=True)
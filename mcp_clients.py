@@ -1,28 +1,107 @@
 
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import asyncio
+import json
 import random
+import threading
+
+from events import error_log, notice_log
+from metrics import timed_execute
+from ability_cache import cached_execute
+from profiler import profiled_execute
+from mcp_transport import make_transport
+from mcp_batcher import MicroBatcher
+from kb_engine import KnowledgeBase, load_knowledge_base
+from gazetteer import Gazetteer, load_gazetteer
+from sentiment import SentimentLexicon, load_sentiment_lexicon
+from workflow_spec import WorkflowSpec, get_workflow_spec, on_reload
+
+# Abilities with a native batch form: ability -> (batch ability, item key, batch key)
+BATCH_ABILITIES = {
+    "parse_request_text": ("parse_request_text_many", "text", "texts"),
+    "extract_entities": ("extract_entities_many", "text", "texts"),
+    "knowledge_base_search": ("knowledge_base_search_many", "query", "queries"),
+}
+
+class MCPServer:
+    """Base of the in-process servers.
+
+    Settings the abilities need (lexicon, gazetteer, KB) are resolved from
+    the workflow spec once per spec and kept, rather than looked up on
+    every call; a reload of config.yaml hands the server the new spec.
+    """
+
+    def __init__(self, spec: Optional[WorkflowSpec] = None):
+        # (spec, values resolved from it); None until the first call
+        self._configured: Optional[Tuple[WorkflowSpec, Dict[str, Any]]] = None
+        if spec is not None:
+            self.configure(spec)
+        else:
+            on_reload(self.configure)
+
+    def configure(self, spec: WorkflowSpec):
+        self._configured = (spec, {})
+
+    def _current(self) -> Tuple[WorkflowSpec, Dict[str, Any]]:
+        current = self._configured
+        if current is None:
+            self.configure(get_workflow_spec())
+            current = self._configured
+        return current
+
+    def workflow_spec(self) -> WorkflowSpec:
+        return self._current()[0]
+
+    def resolved(self, name: str, load: Callable[[WorkflowSpec], Any]) -> Any:
+        """`load(spec)`, computed once per spec."""
+        spec, values = self._current()
+        if name not in values:
+            values[name] = load(spec)
+        return values[name]
+
+    def execute_many(self, ability: str, payloads: List[Dict[str, Any]]) -> List[Any]:
+        """One result per payload, in order. Abilities in BATCH_ABILITIES run
+        as a single batch call when the payloads differ only in their item."""
+        native = BATCH_ABILITIES.get(ability)
+        if native and len(payloads) > 1:
+            batch_ability, item_key, batch_key = native
+            rest = [{k: v for k, v in p.items() if k != item_key} for p in payloads]
+            if all(r == rest[0] for r in rest):
+                results = self.execute(batch_ability, {**rest[0], batch_key: [p.get(item_key, "") for p in payloads]})
+                if isinstance(results, list) and len(results) == len(payloads):
+                    return results
+        return [self.execute(ability, payload) for payload in payloads]
 
 # ----------------------------
 # COMMON MCP Server (internal)
 # ----------------------------
-class CommonMCPServer:
-    def parse_request_text(self, text: str) -> Dict[str, Any]:
+class CommonMCPServer(MCPServer):
+    def sentiment_lexicon(self) -> SentimentLexicon:
+        return self.resolved("sentiment", lambda spec: load_sentiment_lexicon(spec.config.get("sentiment")))
+
+    def parse_request_text(self, text: str, lexicon: Optional[SentimentLexicon] = None) -> Dict[str, Any]:
         try:
+            score, label = (lexicon or self.sentiment_lexicon()).analyze(text)
             return {
                 "structured_text": text,
                 "key_phrases": text.split()[:6],
-                "sentiment": "negative" if any(w in text.lower() for w in ["down", "fail", "error", "urgent"]) else "neutral"
+                "sentiment": label,
+                "sentiment_score": round(score, 4),
             }
         except Exception as e:
-            print(f"❌ Error in parse_request_text: {e}")
+            error_log("❌ Error in parse_request_text: %s", e)
             return {"error": str(e)}
 
+    def parse_request_text_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        lexicon = self.sentiment_lexicon()
+        return [self.parse_request_text(text, lexicon) for text in texts]
+
     def normalize_fields(self, data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             normalized = data.copy()
             return normalized
         except Exception as e:
-            print(f"❌ Error in normalize_fields: {e}")
+            error_log("❌ Error in normalize_fields: %s", e)
             return {"error": str(e)}
 
     def add_flags_calculations(self, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -32,7 +111,7 @@ class CommonMCPServer:
                 flags["sla_risk"] = True
             return flags
         except Exception as e:
-            print(f"❌ Error in add_flags_calculations: {e}")
+            error_log("❌ Error in add_flags_calculations: %s", e)
             return {"error": str(e)}
 
     def solution_evaluation(self, solutions: List[Dict[str, Any]]) -> int:
@@ -42,20 +121,25 @@ class CommonMCPServer:
             score = min(100, max(0, score + random.randint(-5, 5)))
             return score
         except Exception as e:
-            print(f"❌ Error in solution_evaluation: {e}")
+            error_log("❌ Error in solution_evaluation: %s", e)
             return 60
 
     def response_generation(self, context: Dict[str, Any]) -> str:
         try:
             return f"Dear {context.get('customer_name', 'Customer')},\n\nWe have addressed your query: {context.get('query', 'your issue')}.\n\nBest regards,\nSupport Team"
         except Exception as e:
-            print(f"❌ Error in response_generation: {e}")
+            error_log("❌ Error in response_generation: %s", e)
             return "Error generating response"
 
+    @profiled_execute("COMMON")
+    @cached_execute("COMMON")
+    @timed_execute("COMMON")
     def execute(self, ability: str, payload: Dict[str, Any]):
         try:
             if ability == "parse_request_text":
                 return self.parse_request_text(payload.get("text", ""))
+            if ability == "parse_request_text_many":
+                return self.parse_request_text_many(payload.get("texts", []))
             if ability == "normalize_fields":
                 return self.normalize_fields(payload.get("data", {}))
             if ability == "add_flags_calculations":
@@ -66,28 +150,37 @@ class CommonMCPServer:
                 return self.response_generation(payload.get("context", {}))
             return {"result": "common_mocked_result"}
         except Exception as e:
-            print(f"❌ Error in COMMON execute: {e}")
+            error_log("❌ Error in COMMON execute: %s", e)
             return {"error": str(e)}
 
+    async def aexecute(self, ability: str, payload: Dict[str, Any]):
+        # COMMON abilities are in-process and CPU-light, so they run inline
+        return self.execute(ability, payload)
+
 # ----------------------------
 # ATLAS MCP Server (external)
 # ----------------------------
-class AtlasMCPServer:
+# Returned when a search finds nothing relevant
+GENERIC_ARTICLE = {"title": "Generic troubleshooting", "url": "https://example.com/kb/000", "relevance": 0.6}
+
+class AtlasMCPServer(MCPServer):
+    def gazetteer(self) -> Gazetteer:
+        return self.resolved("gazetteer", lambda spec: load_gazetteer(spec.config.get("gazetteer")))
+
     def extract_entities(self, text: str) -> Dict[str, Any]:
         try:
-            entities = {"products": [], "accounts": [], "dates": []}
-            words = text.lower().split()
-            if "account" in words:
-                entities["accounts"].append("customer_account")
-            if "product" in words or "login" in words or "password" in words:
-                entities["products"].append("main_product")
-            if "yesterday" in words or "today" in words:
-                entities["dates"].append("recent_date")
-            return entities
+            return self.gazetteer().extract(text)
         except Exception as e:
-            print(f"❌ Error in extract_entities: {e}")
+            error_log("❌ Error in extract_entities: %s", e)
             return {"error": str(e)}
 
+    def extract_entities_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        try:
+            return self.gazetteer().extract_many(texts)
+        except Exception as e:
+            error_log("❌ Error in extract_entities_many: %s", e)
+            return [{"error": str(e)} for _ in texts]
+
     def enrich_records(self, data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             enriched = data.copy()
@@ -95,82 +188,115 @@ class AtlasMCPServer:
             enriched["historical_tickets"] = 2
             return enriched
         except Exception as e:
-            print(f"❌ Error in enrich_records: {e}")
+            error_log("❌ Error in enrich_records: %s", e)
             return {"error": str(e)}
 
     def clarify_question(self, missing_info: str) -> str:
         try:
             return f"Can you please provide more details about: {missing_info}?"
         except Exception as e:
-            print(f"❌ Error in clarify_question: {e}")
+            error_log("❌ Error in clarify_question: %s", e)
             return "Error requesting clarification"
 
     def extract_answer(self, ticket_id: str) -> str:
         try:
             return "Customer provided additional details about the issue."
         except Exception as e:
-            print(f"❌ Error in extract_answer: {e}")
+            error_log("❌ Error in extract_answer: %s", e)
             return "Error extracting answer"
 
-    def knowledge_base_search(self, query: str) -> List[Dict[str, Any]]:
+    def knowledge_base_settings(self) -> Dict[str, Any]:
+        return self.workflow_spec().config.get("knowledge_base") or {}
+
+    def knowledge_base(self) -> Optional[KnowledgeBase]:
+        return self.resolved("knowledge_base", lambda spec: load_knowledge_base(spec.config.get("knowledge_base")))
+
+    def knowledge_base_search(self, query: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
         try:
-            lower_q = query.lower()
-            results = []
-            if "password" in lower_q or "login" in lower_q:
-                results.append({"title": "How to reset password", "url": "https://example.com/kb/123", "relevance": 0.95})
-            if "down" in lower_q or "production" in lower_q:
-                results.append({"title": "Production outage runbook", "url": "https://example.com/kb/999", "relevance": 0.9})
-            if not results:
-                results.append({"title": "Generic troubleshooting", "url": "https://example.com/kb/000", "relevance": 0.6})
-            return results
+            settings = self.knowledge_base_settings()
+            kb = self.knowledge_base()
+            if kb is not None:
+                results = kb.search(query, k or settings.get("top_k", 3))
+            else:
+                results = self.sample_articles(query)
+            return results or [GENERIC_ARTICLE.copy()]
         except Exception as e:
-            print(f"❌ Error in knowledge_base_search: {e}")
+            error_log("❌ Error in knowledge_base_search: %s", e)
             return []
 
+    def knowledge_base_search_many(self, queries: List[str], k: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """knowledge_base_search for a batch of queries, scored in one pass."""
+        try:
+            settings = self.knowledge_base_settings()
+            kb = self.knowledge_base()
+            if kb is not None:
+                batch = kb.search_many(list(queries), k or settings.get("top_k", 3))
+            else:
+                batch = [self.sample_articles(query) for query in queries]
+            return [results or [GENERIC_ARTICLE.copy()] for results in batch]
+        except Exception as e:
+            error_log("❌ Error in knowledge_base_search_many: %s", e)
+            return [[] for _ in queries]
+
+    def sample_articles(self, query: str) -> List[Dict[str, Any]]:
+        # No KB index configured: built-in sample articles
+        lower_q = query.lower()
+        results = []
+        if "password" in lower_q or "login" in lower_q:
+            results.append({"title": "How to reset password", "url": "https://example.com/kb/123", "relevance": 0.95})
+        if "down" in lower_q or "production" in lower_q:
+            results.append({"title": "Production outage runbook", "url": "https://example.com/kb/999", "relevance": 0.9})
+        return results
+
     def escalation_decision(self, score: int) -> bool:
         try:
             return score < 90
         except Exception as e:
-            print(f"❌ Error in escalation_decision: {e}")
+            error_log("❌ Error in escalation_decision: %s", e)
             return True
 
     def update_ticket(self, ticket_id: str, updates: Dict[str, Any]) -> bool:
         try:
-            print(f"[ATLAS] Updating ticket {ticket_id} with {updates}")
+            notice_log("[ATLAS] Updating ticket %s with %s", ticket_id, updates)
             return True
         except Exception as e:
-            print(f"❌ Error in update_ticket: {e}")
+            error_log("❌ Error in update_ticket: %s", e)
             return False
 
     def close_ticket(self, ticket_id: str) -> bool:
         try:
-            print(f"[ATLAS] Closing ticket {ticket_id}")
+            notice_log("[ATLAS] Closing ticket %s", ticket_id)
             return True
         except Exception as e:
-            print(f"❌ Error in close_ticket: {e}")
+            error_log("❌ Error in close_ticket: %s", e)
             return False
 
     def execute_api_calls(self, actions: List[Dict[str, Any]]) -> bool:
         try:
             for a in actions:
-                print(f"[ATLAS] Executing API call: {a}")
+                notice_log("[ATLAS] Executing API call: %s", a)
             return True
         except Exception as e:
-            print(f"❌ Error in execute_api_calls: {e}")
+            error_log("❌ Error in execute_api_calls: %s", e)
             return False
 
     def trigger_notifications(self, recipient: str, message: str) -> bool:
         try:
-            print(f"[ATLAS] Sending notification to {recipient}: {message}")
+            notice_log("[ATLAS] Sending notification to %s: %s", recipient, message)
             return True
         except Exception as e:
-            print(f"❌ Error in trigger_notifications: {e}")
+            error_log("❌ Error in trigger_notifications: %s", e)
             return False
 
+    @profiled_execute("ATLAS")
+    @cached_execute("ATLAS")
+    @timed_execute("ATLAS")
     def execute(self, ability: str, payload: Dict[str, Any]):
         try:
             if ability == "extract_entities":
                 return self.extract_entities(payload.get("text", ""))
+            if ability == "extract_entities_many":
+                return self.extract_entities_many(payload.get("texts", []))
             if ability == "enrich_records":
                 return self.enrich_records(payload.get("data", {}))
             if ability == "clarify_question":
@@ -178,7 +304,9 @@ class AtlasMCPServer:
             if ability == "extract_answer":
                 return self.extract_answer(payload.get("ticket_id", ""))
             if ability == "knowledge_base_search":
-                return self.knowledge_base_search(payload.get("query", ""))
+                return self.knowledge_base_search(payload.get("query", ""), payload.get("k"))
+            if ability == "knowledge_base_search_many":
+                return self.knowledge_base_search_many(payload.get("queries", []), payload.get("k"))
             if ability == "escalation_decision":
                 return self.escalation_decision(payload.get("score", 0))
             if ability == "update_ticket":
@@ -191,18 +319,23 @@ class AtlasMCPServer:
                 return self.trigger_notifications(payload.get("recipient"), payload.get("message"))
             return {"result": "atlas_mocked_result"}
         except Exception as e:
-            print(f"❌ Error in ATLAS execute: {e}")
+            error_log("❌ Error in ATLAS execute: %s", e)
             return {"error": str(e)}
 
+    async def aexecute(self, ability: str, payload: Dict[str, Any]):
+        # ATLAS is an external service: keep its calls off the event loop so
+        # independent calls in a stage overlap instead of queueing
+        return await asyncio.to_thread(self.execute, ability, payload)
+
 # ----------------------------
 # STATE MCP Server (internal state management)
 # ----------------------------
-class StateMCPServer:
+class StateMCPServer(MCPServer):
     def accept_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         try:
             return payload
         except Exception as e:
-            print(f"❌ Error in accept_payload: {e}")
+            error_log("❌ Error in accept_payload: %s", e)
             return {"error": str(e)}
 
     def store_answer(self, state: Dict[str, Any], answer: str) -> Dict[str, Any]:
@@ -210,7 +343,7 @@ class StateMCPServer:
             state["clarification_answer"] = answer
             return state
         except Exception as e:
-            print(f"❌ Error in store_answer: {e}")
+            error_log("❌ Error in store_answer: %s", e)
             return state
 
     def store_data(self, state: Dict[str, Any], data: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -218,7 +351,7 @@ class StateMCPServer:
             state["kb_results"] = data
             return state
         except Exception as e:
-            print(f"❌ Error in store_data: {e}")
+            error_log("❌ Error in store_data: %s", e)
             return state
 
     def output_payload(self, state: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -226,7 +359,7 @@ class StateMCPServer:
             state["final_payload"] = payload
             return state
         except Exception as e:
-            print(f"❌ Error in output_payload: {e}")
+            error_log("❌ Error in output_payload: %s", e)
             return state
 
     def update_payload(self, state: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
@@ -234,9 +367,11 @@ class StateMCPServer:
             state.update(updates)
             return state
         except Exception as e:
-            print(f"❌ Error in update_payload: {e}")
+            error_log("❌ Error in update_payload: %s", e)
             return state
 
+    @profiled_execute("STATE")
+    @timed_execute("STATE")
     def execute(self, ability: str, payload: Dict[str, Any]):
         try:
             if ability == "accept_payload":
@@ -251,10 +386,148 @@ class StateMCPServer:
                 return self.update_payload(payload.get("state", {}), payload.get("updates", {}))
             return {"result": "state_mocked_result"}
         except Exception as e:
-            print(f"❌ Error in STATE execute: {e}")
+            error_log("❌ Error in STATE execute: %s", e)
             return {"error": str(e)}
 
+    async def aexecute(self, ability: str, payload: Dict[str, Any]):
+        return self.execute(ability, payload)
+
+# ----------------------------
+# Clients (transport and routing from config.yaml)
+# ----------------------------
+# Server objects behind the `inprocess` transport
+local_servers = {"COMMON": CommonMCPServer(), "ATLAS": AtlasMCPServer(), "STATE": StateMCPServer()}
+
+# Transports and batchers by (server, canonical settings), so a reload that
+# leaves a server's settings alone keeps its connections
+_transports: Dict[Tuple[str, str], Any] = {}
+_batchers: Dict[Tuple[str, str], MicroBatcher] = {}
+_transports_lock = threading.Lock()
+
+class Routes:
+    """Where abilities go under one spec: built once per config.yaml
+    content, so routing a call is a few dict lookups."""
+
+    def __init__(self, spec: WorkflowSpec):
+        self.content_hash = spec.content_hash
+        self.ability_servers: Dict[str, str] = spec.ability_servers
+        self.transports: Dict[str, Any] = {}
+        self.batchers: Dict[Tuple[str, str], MicroBatcher] = {}
+        servers = spec.config.get("servers") or {}
+        for server, local in local_servers.items():
+            settings = servers.get(server) or {}
+            key = (server, json.dumps(settings, sort_keys=True))
+            if key not in _transports:
+                _transports[key] = make_transport(server, settings, local)
+            self.transports[server] = _transports[key]
+            batching = settings.get("batching") or {}
+            if batching.get("enabled"):
+                key = (server, json.dumps(batching, sort_keys=True))
+                if key not in _batchers:
+                    _batchers[key] = MicroBatcher(
+                        lambda ability, payloads, server=server: transport_for(server).request_many(ability, payloads),
+                        max_batch_size=batching.get("max_batch_size", 32),
+                        max_delay_ms=batching.get("max_delay_ms", 2.0),
+                        name=f"mcp-{server.lower()}-batcher",
+                    )
+                for ability in batching.get("abilities") or ():
+                    self.batchers[(server, ability)] = _batchers[key]
+
+_routes: Optional[Routes] = None
+
+def routes() -> Routes:
+    """Routing for the current config.yaml, built on first use."""
+    global _routes
+    current = _routes
+    if current is None:
+        with _transports_lock:
+            current = _routes
+            if current is None:
+                current = _routes = Routes(get_workflow_spec())
+    return current
+
+def _spec_reloaded(spec: WorkflowSpec):
+    global _routes
+    if _routes is not None and _routes.content_hash != spec.content_hash:
+        # Rebuilt on the next call; transports whose settings did not change are reused
+        _routes = None
+
+on_reload(_spec_reloaded)
+
+def transport_for(server: str):
+    """Transport for `server` per the `servers` section of config.yaml."""
+    return routes().transports[server]
+
+def batcher_for(server: str, ability: str) -> Optional[MicroBatcher]:
+    """The micro-batcher for `ability` if `servers.<server>.batching` enables it."""
+    return routes().batchers.get((server, ability))
+
+def close_transports():
+    global _routes
+    with _transports_lock:
+        _routes = None
+        batchers = list(_batchers.values())
+        _batchers.clear()
+        transports = list(_transports.values())
+        _transports.clear()
+    for batcher in batchers:
+        batcher.close()
+    for transport in transports:
+        transport.close()
+
+class MCPClient:
+    """Calls abilities on MCP servers.
+
+    Each ability goes to the server the `abilities:` map in config.yaml
+    assigns it to; `name` is only the fallback for abilities the map does
+    not list. Abilities the server's `batching` settings list are coalesced
+    with concurrent calls from other tickets into execute_many requests.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def server_for(self, ability: str) -> str:
+        return routes().ability_servers.get(ability, self.name)
+
+    def execute(self, ability: str, payload: Dict[str, Any]):
+        server = self.name
+        try:
+            table = routes()
+            server = table.ability_servers.get(ability, self.name)
+            batcher = table.batchers.get((server, ability))
+            if batcher is not None:
+                return batcher.submit(ability, payload).result()
+            return table.transports[server].request(ability, payload)
+        except Exception as e:
+            error_log("❌ %s transport error in %s: %s", server, ability, e)
+            return {"error": str(e)}
+
+    async def aexecute(self, ability: str, payload: Dict[str, Any]):
+        server = self.name
+        try:
+            table = routes()
+            server = table.ability_servers.get(ability, self.name)
+            batcher = table.batchers.get((server, ability))
+            if batcher is not None:
+                return await asyncio.wrap_future(batcher.submit(ability, payload))
+            return await table.transports[server].arequest(ability, payload)
+        except Exception as e:
+            error_log("❌ %s transport error in %s: %s", server, ability, e)
+            return {"error": str(e)}
+
+    def execute_many(self, ability: str, payloads: List[Dict[str, Any]]) -> List[Any]:
+        """execute() for many payloads in one request; one result per payload."""
+        server = self.name
+        try:
+            table = routes()
+            server = table.ability_servers.get(ability, self.name)
+            return table.transports[server].request_many(ability, list(payloads))
+        except Exception as e:
+            error_log("❌ %s transport error in %s: %s", server, ability, e)
+            return [{"error": str(e)} for _ in payloads]
+
 # Instantiate clients for import
-common_client = CommonMCPServer()
-atlas_client = AtlasMCPServer()
-state_client = StateMCPServer()
\ No newline at end of file
+common_client = MCPClient("COMMON")
+atlas_client = MCPClient("ATLAS")
+state_client = MCPClient("STATE")
\ No newline at end of file
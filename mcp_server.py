@@ -0,0 +1,112 @@
+"""Stand-in MCP server process: hosts CommonMCPServer, AtlasMCPServer and
+StateMCPServer behind the JSON-RPC protocol of mcp_transport.py, so the
+out-of-process path can be run and benchmarked without the real services.
+
+    python mcp_server.py --stdio                      # one client on stdin/stdout
+    python mcp_server.py --unix /tmp/mcp.sock         # any number of clients
+
+Requests are handled on a worker pool, so pipelined requests on one
+connection run concurrently and their responses may come back out of order.
+"""
+from typing import Any, BinaryIO, Dict
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+
+from mcp_clients import CommonMCPServer, AtlasMCPServer, StateMCPServer
+
+SERVERS = {"COMMON": CommonMCPServer(), "ATLAS": AtlasMCPServer(), "STATE": StateMCPServer()}
+
+def handle(message: Dict[str, Any]) -> Dict[str, Any]:
+    response: Dict[str, Any] = {"jsonrpc": "2.0", "id": message.get("id")}
+    params = message.get("params") or {}
+    server = SERVERS.get(params.get("server"))
+    method = message.get("method")
+    if method not in ("execute", "execute_many"):
+        response["error"] = {"code": -32601, "message": f"Unknown method: {method}"}
+    elif server is None:
+        response["error"] = {"code": -32602, "message": f"Unknown server: {params.get('server')}"}
+    else:
+        try:
+            if method == "execute":
+                response["result"] = server.execute(params.get("ability", ""), params.get("payload") or {})
+            else:
+                response["result"] = server.execute_many(params.get("ability", ""), params.get("payloads") or [])
+        except Exception as e:
+            response["error"] = {"code": -32000, "message": str(e)}
+    return response
+
+def serve_stream(reader: BinaryIO, writer: BinaryIO, pool: ThreadPoolExecutor):
+    """Answer newline-delimited requests from `reader` until it closes."""
+    lock = threading.Lock()
+
+    def respond(line: bytes):
+        try:
+            response = handle(json.loads(line))
+        except ValueError as e:
+            response = {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": str(e)}}
+        data = json.dumps(response, default=str).encode("utf-8") + b"\n"
+        with lock:
+            writer.write(data)
+            writer.flush()
+
+    for line in reader:
+        if line.strip():
+            pool.submit(respond, line)
+
+def serve_stdio(workers: int):
+    reader, writer = sys.stdin.buffer, sys.stdout.buffer
+    # Keep stray prints from corrupting the protocol stream
+    sys.stdout = sys.stderr
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        serve_stream(reader, writer, pool)
+
+def serve_unix(path: str, workers: int):
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+    pool = ThreadPoolExecutor(max_workers=workers)
+
+    def serve_connection(conn: socket.socket):
+        with conn, conn.makefile("rb") as reader, conn.makefile("wb") as writer:
+            try:
+                serve_stream(reader, writer, pool)
+            except OSError:
+                pass
+
+    # Exit through the finally below (removing the socket file) on SIGTERM too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"MCP stand-in server listening on {path}", file=sys.stderr)
+    try:
+        while True:
+            conn, _ = listener.accept()
+            threading.Thread(target=serve_connection, args=(conn,), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        os.unlink(path)
+        pool.shutdown(wait=False)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--stdio", action="store_true", help="serve one client on stdin/stdout")
+    mode.add_argument("--unix", metavar="PATH", help="listen on a Unix socket")
+    parser.add_argument("--workers", type=int, default=8, help="requests handled concurrently")
+    args = parser.parse_args(argv)
+    if args.stdio:
+        serve_stdio(args.workers)
+    else:
+        serve_unix(args.unix, args.workers)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""Transports between the MCP clients and the servers that run abilities.
+
+``inprocess`` calls a server object directly (tests, single-process runs).
+``stdio`` and ``unix`` speak newline-delimited JSON-RPC 2.0 to a server
+process (see mcp_server.py), either spawned as a child talking over its
+stdin/stdout or listening on a Unix socket:
+
+    --> {"jsonrpc": "2.0", "id": 7, "method": "execute",
+         "params": {"server": "ATLAS", "ability": "...", "payload": {...}}}
+    <-- {"jsonrpc": "2.0", "id": 7, "result": ...}
+
+Connections are persistent and pipelined: a request is written as soon as
+it is issued and a reader thread per connection matches responses back by
+id, so one connection carries many requests in flight. Each server gets a
+pool of up to ``pool_size`` connections (a new one opens only when every
+open one is busy) and at most ``max_in_flight`` outstanding requests,
+shared by threads and event loops: a free slot goes to the longest waiting
+caller, and a waiting coroutine awaits it without holding a thread.
+"""
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from metrics import metrics_registry, is_error_result
+
+# Stand-in server spawned by `stdio` transports that don't set a command
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_server.py")
+
+class RemoteError(Exception):
+    """The server answered a request with a JSON-RPC error."""
+
+class InProcessTransport:
+    def __init__(self, server: Any):
+        self.server = server
+
+    def request(self, ability: str, payload: Dict[str, Any]) -> Any:
+        return self.server.execute(ability, payload)
+
+    async def arequest(self, ability: str, payload: Dict[str, Any]) -> Any:
+        return await self.server.aexecute(ability, payload)
+
+    def request_many(self, ability: str, payloads: List[Dict[str, Any]]) -> List[Any]:
+        return self.server.execute_many(ability, payloads)
+
+    def close(self):
+        pass
+
+# ----------------------------
+# JSON-RPC connections
+# ----------------------------
+class Connection:
+    """One persistent, pipelined JSON-RPC stream."""
+
+    def __init__(self, reader: BinaryIO, writer: BinaryIO, close: Callable[[], None], name: str = "mcp"):
+        self._reader = reader
+        self._writer = writer
+        self._close = close
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.alive = True
+        threading.Thread(target=self._read_loop, name=f"{name}-reader", daemon=True).start()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def submit(self, method: str, params: Dict[str, Any]) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if not self.alive:
+                raise ConnectionError("connection is closed")
+            request_id = next(self._ids)
+            message = {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+            self._pending[request_id] = future
+            try:
+                self._writer.write(json.dumps(message, default=str).encode("utf-8") + b"\n")
+                self._writer.flush()
+            except (OSError, ValueError) as e:
+                self._pending.pop(request_id, None)
+                self.alive = False
+                raise ConnectionError(f"write failed: {e}") from e
+        return future
+
+    def _read_loop(self):
+        error: Exception = ConnectionError("connection closed by server")
+        try:
+            for line in self._reader:
+                message = json.loads(line)
+                future = self._pending.pop(message.get("id"), None)
+                if future is None or future.done():
+                    continue  # timed out and cancelled by the caller
+                if "error" in message:
+                    future.set_exception(RemoteError(message["error"].get("message", "remote error")))
+                else:
+                    future.set_result(message.get("result"))
+        except (OSError, ValueError) as e:
+            error = ConnectionError(f"read failed: {e}")
+        with self._lock:
+            self.alive = False
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def close(self):
+        with self._lock:
+            self.alive = False
+        try:
+            self._close()
+        except OSError:
+            pass
+
+def unix_connector(path: str, name: str = "mcp") -> Callable[[], Connection]:
+    def connect() -> Connection:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        reader, writer = sock.makefile("rb"), sock.makefile("wb")
+
+        def close():
+            sock.shutdown(socket.SHUT_RDWR)
+            sock.close()
+        return Connection(reader, writer, close, name)
+    return connect
+
+def stdio_connector(command: Sequence[str], name: str = "mcp") -> Callable[[], Connection]:
+    def connect() -> Connection:
+        proc = subprocess.Popen(list(command), stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+        def close():
+            proc.stdin.close()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        return Connection(proc.stdout, proc.stdin, close, name)
+    return connect
+
+class InFlightLimit:
+    """Counting semaphore that both threads and coroutines can wait on.
+
+    Each waiter parks on its own Future; release() hands the slot straight
+    to the oldest waiter still interested, resolving it from whichever
+    thread released (wrap_future brings the result back to a waiting loop).
+    """
+
+    def __init__(self, limit: int):
+        self._free = limit
+        self._waiters: deque = deque()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self) -> Optional[Future]:
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return None
+            waiter: Future = Future()
+            self._waiters.append(waiter)
+            return waiter
+
+    def acquire(self):
+        waiter = self._try_acquire()
+        if waiter is not None:
+            waiter.result()
+
+    async def aacquire(self):
+        waiter = self._try_acquire()
+        if waiter is None:
+            return
+        try:
+            await asyncio.wrap_future(waiter)
+        except asyncio.CancelledError:
+            if not waiter.cancel():
+                self.release()  # the slot was handed over as we were cancelled
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.set_running_or_notify_cancel():
+                    break
+            else:
+                self._free += 1
+                return
+        waiter.set_result(None)
+
+class JsonRpcTransport:
+    """Pooled, pipelined JSON-RPC client for one MCP server."""
+
+    def __init__(self, server: str, connect: Callable[[], Connection], pool_size: int = 2,
+                 max_in_flight: int = 64, timeout: float = 30.0):
+        self.server = server
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self._connect = connect
+        self._pool: List[Connection] = []
+        self._lock = threading.Lock()
+        self._slots = InFlightLimit(max(1, max_in_flight))
+
+    def _connection(self) -> Connection:
+        with self._lock:
+            self._pool = [c for c in self._pool if c.alive]
+            if len(self._pool) < self.pool_size and all(c.in_flight for c in self._pool):
+                self._pool.append(self._connect())
+            return min(self._pool, key=lambda c: c.in_flight)
+
+    def _submit(self, method: str, params: Dict[str, Any], slot_held: bool = False) -> Future:
+        if not slot_held:
+            self._slots.acquire()
+        try:
+            future = self._connection().submit(method, {"server": self.server, **params})
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def submit(self, ability: str, payload: Dict[str, Any]) -> Future:
+        """Send one request without waiting; blocks only while max_in_flight are outstanding."""
+        return self._submit("execute", {"ability": ability, "payload": payload})
+
+    def _wait(self, future: Future, label: str, start: float) -> Any:
+        error = True
+        try:
+            result = future.result(self.timeout)
+            error = is_error_result(result)
+            return result
+        except FutureTimeout:
+            future.cancel()
+            raise
+        finally:
+            metrics_registry.observe("ability", (self.server, label), time.perf_counter() - start, error)
+
+    def request(self, ability: str, payload: Dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        return self._wait(self.submit(ability, payload), ability, start)
+
+    def request_many(self, ability: str, payloads: List[Dict[str, Any]]) -> List[Any]:
+        """One execute_many round trip; recorded as `<ability>[batch]`."""
+        start = time.perf_counter()
+        future = self._submit("execute_many", {"ability": ability, "payloads": payloads})
+        return self._wait(future, f"{ability}[batch]", start)
+
+    async def arequest(self, ability: str, payload: Dict[str, Any]) -> Any:
+        """request() for the event loop: awaits the response future, so no
+        thread is held while the request is in flight."""
+        start = time.perf_counter()
+        await self._slots.aacquire()
+        future = self._submit("execute", {"ability": ability, "payload": payload}, slot_held=True)
+        error = True
+        try:
+            # wait_for cancels the request on timeout, as _wait does
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+            error = is_error_result(result)
+            return result
+        finally:
+            metrics_registry.observe("ability", (self.server, ability), time.perf_counter() - start, error)
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for connection in pool:
+            connection.close()
+
+def make_transport(server: str, settings: Optional[Dict[str, Any]], local: Any):
+    """Transport for `server` from its config.yaml `servers` entry."""
+    settings = settings or {}
+    kind = settings.get("transport", "inprocess")
+    if kind == "inprocess":
+        return InProcessTransport(local)
+    name = f"mcp-{server.lower()}"
+    if kind == "unix":
+        connect = unix_connector(settings["path"], name)
+    elif kind == "stdio":
+        connect = stdio_connector(settings.get("command") or [sys.executable, SERVER_SCRIPT, "--stdio"], name)
+    else:
+        raise ValueError(f"Unknown MCP transport for {server}: {kind}")
+    return JsonRpcTransport(
+        server, connect,
+        pool_size=settings.get("pool_size", 2),
+        max_in_flight=settings.get("max_in_flight", 64),
+        timeout=settings.get("timeout", 30.0),
+    )
@@ -0,0 +1,208 @@
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# ----------------------------
+# Log-linear (HDR-style) histogram
+# ----------------------------
+class Histogram:
+    """Latency histogram over integer nanoseconds with bounded relative error.
+
+    Values below 2**precision_bits get exact buckets; above that each power of
+    two is split into 2**(precision_bits - 1) sub-buckets, so the relative
+    error stays under 2**-(precision_bits - 1) (about 3% by default) at any
+    magnitude. Buckets are stored sparsely, so recording is O(1).
+    """
+
+    def __init__(self, precision_bits: int = 6):
+        self._p = precision_bits
+        self._linear = 1 << precision_bits
+        self._half = 1 << (precision_bits - 1)
+        self._counts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def _index(self, value: int) -> int:
+        if value < self._linear:
+            return value
+        shift = value.bit_length() - self._p
+        return self._linear + (shift - 1) * self._half + ((value >> shift) - self._half)
+
+    def _bounds(self, index: int) -> Tuple[int, int]:
+        if index < self._linear:
+            return index, index
+        shift = (index - self._linear) // self._half + 1
+        mantissa = (index - self._linear) % self._half + self._half
+        low = mantissa << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value_ns: int, error: bool = False):
+        value_ns = max(0, int(value_ns))
+        index = self._index(value_ns)
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self.count += 1
+            self.total_ns += value_ns
+            if value_ns > self.max_ns:
+                self.max_ns = value_ns
+            if error:
+                self.errors += 1
+
+    def quantiles(self, qs: Iterable[float] = QUANTILES) -> Dict[float, float]:
+        """Quantile -> value in nanoseconds (bucket midpoint)."""
+        with self._lock:
+            items = sorted(self._counts.items())
+            count = self.count
+        result = {}
+        if not count:
+            return {q: 0.0 for q in qs}
+        for q in qs:
+            rank = max(1, int(q * count + 0.5))
+            seen = 0
+            for index, n in items:
+                seen += n
+                if seen >= rank:
+                    low, high = self._bounds(index)
+                    result[q] = (low + high) / 2
+                    break
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        qs = self.quantiles()
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "sum_ms": self.total_ns / 1e6,
+            "max_ms": self.max_ns / 1e6,
+            **{f"p{int(q * 100)}_ms": v / 1e6 for q, v in qs.items()},
+        }
+
+# ----------------------------
+# Registry
+# ----------------------------
+class MetricsRegistry:
+    """Histograms keyed by (metric family, label values)."""
+
+    FAMILIES = {
+        "stage": ("support_agent_stage_latency_seconds", ("stage",),
+                  "Latency of each workflow stage node",
+                  "Stage runs that failed"),
+        "ability": ("support_agent_ability_latency_seconds", ("server", "ability"),
+                    "Latency of each MCP execute(ability, payload) call",
+                    "MCP calls that raised or returned an error result"),
+        "ticket": ("support_agent_ticket_latency_seconds", (),
+                   "End-to-end latency of one ticket through the graph",
+                   "Tickets that did not complete the workflow"),
+        "queue": ("support_agent_queue_latency_seconds", ("priority",),
+                  "Time a ticket waited in the scheduler before a worker took it",
+                  "Tickets taken from the scheduler after their SLA deadline"),
+    }
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._histograms: Dict[Tuple[str, Tuple[str, ...]], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, family: str, *labels: str) -> Histogram:
+        key = (family, labels)
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, Histogram())
+        return hist
+
+    def observe(self, family: str, labels: Tuple[str, ...], seconds: float, error: bool = False):
+        if self.enabled:
+            self.histogram(family, *labels).record(seconds * 1e9, error)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """{family: {"label1/label2": {count, errors, sum_ms, max_ms, p50_ms, ...}}}"""
+        result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (family, labels), hist in sorted(self._histograms.items()):
+            result.setdefault(family, {})["/".join(labels) or "all"] = hist.snapshot()
+        return result
+
+    def render_prometheus(self) -> str:
+        """Text exposition format: one summary plus an error counter per family."""
+        lines: List[str] = []
+        by_family: Dict[str, List[Tuple[Tuple[str, ...], Histogram]]] = {}
+        for (family, labels), hist in sorted(self._histograms.items()):
+            by_family.setdefault(family, []).append((labels, hist))
+        for family, series in by_family.items():
+            name, label_names, help_text, errors_help = self.FAMILIES[family]
+            errors_name = name.replace("_latency_seconds", "_errors_total")
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} summary")
+            for labels, hist in series:
+                base = [f'{k}="{v}"' for k, v in zip(label_names, labels)]
+                for q, value in hist.quantiles().items():
+                    quantile = 'quantile="%s"' % q
+                    lines.append(f"{name}{{{','.join(base + [quantile])}}} {value / 1e9:.9f}")
+                suffix = f"{{{','.join(base)}}}" if base else ""
+                lines.append(f"{name}_sum{suffix} {hist.total_ns / 1e9:.9f}")
+                lines.append(f"{name}_count{suffix} {hist.count}")
+            lines.append(f"# HELP {errors_name} {errors_help}")
+            lines.append(f"# TYPE {errors_name} counter")
+            for labels, hist in series:
+                base = [f'{k}="{v}"' for k, v in zip(label_names, labels)]
+                suffix = f"{{{','.join(base)}}}" if base else ""
+                lines.append(f"{errors_name}{suffix} {hist.errors}")
+        return "\n".join(lines) + "\n"
+
+metrics_registry = MetricsRegistry()
+
+def is_error_result(result: Any) -> bool:
+    return isinstance(result, dict) and "error" in result
+
+def timed_execute(server: str) -> Callable:
+    """Decorator for an MCP server's execute(ability, payload)."""
+    def decorate(execute: Callable) -> Callable:
+        @wraps(execute)
+        def wrapper(self, ability: str, payload: Dict[str, Any]):
+            if not metrics_registry.enabled:
+                return execute(self, ability, payload)
+            start = time.perf_counter()
+            error = True
+            try:
+                result = execute(self, ability, payload)
+                error = is_error_result(result)
+                return result
+            finally:
+                metrics_registry.observe("ability", (server, ability), time.perf_counter() - start, error)
+        return wrapper
+    return decorate
+
+# ----------------------------
+# Exposition endpoint
+# ----------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics_registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any):
+        pass
+
+def serve_metrics(port: int = 9464, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve GET /metrics from a daemon thread; call .shutdown() to stop."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
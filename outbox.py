@@ -0,0 +1,279 @@
+"""Durable outbox for side-effecting abilities (config.yaml `outbox` section).
+
+UPDATE and DO record their side effects (update_ticket, close_ticket,
+execute_api_calls, trigger_notifications) here instead of calling ATLAS, so
+a ticket completes as soon as the intent is committed. A background flusher
+delivers pending rows in batches, one execute_many call per ability, and
+retries failures with exponential backoff until ``max_attempts``, after
+which a row is marked dead.
+
+The store is SQLite in WAL mode. A row is unique per (ticket_id, run_key,
+action), where run_key identifies one run of the ticket (see
+agent.run_config): recording the same action again within a run, as a run
+resumed from its checkpoint does, replaces the payload while it is still
+pending and is ignored once it has been claimed or delivered. Another run
+of the same ticket_id records and delivers its own side effects.
+Flushers claim rows with a lease before sending them, so several processes
+can share one outbox file, and rows claimed by a flusher that died are
+picked up again when the lease runs out. Delivery is at-least-once.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from events import error_log, notice_log
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticket_id TEXT NOT NULL,
+    run_key TEXT NOT NULL DEFAULT '',
+    action TEXT NOT NULL,
+    ability TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending | inflight | done | dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,           -- retry time, or lease expiry while inflight
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (ticket_id, run_key, action)
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+# Files written before run_key was part of the unique key
+MIGRATE_RUN_KEY = """
+DROP INDEX IF EXISTS outbox_due;
+ALTER TABLE outbox RENAME TO outbox_without_run_key;
+""" + SCHEMA + """
+INSERT INTO outbox (id, ticket_id, action, ability, payload, status, attempts, next_attempt_at, last_error,
+                    created_at, updated_at)
+SELECT id, ticket_id, action, ability, payload, status, attempts, next_attempt_at, last_error,
+       created_at, updated_at FROM outbox_without_run_key;
+DROP TABLE outbox_without_run_key;
+"""
+
+def delivered(result: Any) -> bool:
+    """ATLAS side-effect abilities return True on success."""
+    return result is not False and not (isinstance(result, dict) and "error" in result)
+
+class Outbox:
+    def __init__(self, path: str, send_many: Callable[[str, List[Dict[str, Any]]], List[Any]],
+                 batch_size: int = 100, poll_interval: float = 0.05, max_attempts: int = 5,
+                 backoff_seconds: float = 0.5, lease_seconds: float = 30.0,
+                 retention_seconds: float = 86400.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self._send_many = send_many
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        if columns and "run_key" not in columns:
+            self._db.executescript(f"BEGIN IMMEDIATE; {MIGRATE_RUN_KEY} COMMIT;")
+        else:
+            self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ----------------------------
+    # Producer side
+    # ----------------------------
+    def enqueue(self, ticket_id: str, ability: str, payload: Dict[str, Any], action: Optional[str] = None,
+                run_key: str = ""):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO outbox (ticket_id, run_key, action, ability, payload, next_attempt_at, created_at,"
+                " updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (ticket_id, run_key, action) DO UPDATE SET"
+                " payload = excluded.payload, updated_at = excluded.updated_at"
+                " WHERE status = 'pending'",
+                (ticket_id, run_key, action or ability, ability, json.dumps(payload, default=str), now, now, now),
+            )
+        self._idle.clear()
+        self._wake.set()
+
+    # ----------------------------
+    # Flusher
+    # ----------------------------
+    def start(self) -> "Outbox":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="outbox-flusher", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        last_purge = 0.0
+        while not self._stop.is_set():
+            try:
+                sent = self.flush_once()
+                if time.time() - last_purge > 60.0:
+                    self.purge()
+                    last_purge = time.time()
+            except Exception as e:
+                error_log("❌ Outbox flush failed: %s", e)
+                sent = 0
+            if sent < self.batch_size:
+                if not sent:
+                    self._idle.set()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def _claim(self) -> List[Tuple]:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, ability, payload, attempts FROM outbox"
+                    " WHERE status IN ('pending', 'inflight') AND next_attempt_at <= ?"
+                    " ORDER BY id LIMIT ?",
+                    (now, self.batch_size),
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE outbox SET status = 'inflight', next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                    [(now + self.lease_seconds, now, row[0]) for row in rows],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return rows
+
+    def flush_once(self) -> int:
+        """Claim and deliver one batch of due rows; returns how many were claimed."""
+        rows = self._claim()
+        by_ability: Dict[str, List[Tuple]] = {}
+        for row in rows:
+            by_ability.setdefault(row[1], []).append(row)
+        for ability, group in by_ability.items():
+            try:
+                results = self._send_many(ability, [json.loads(row[2]) for row in group])
+                if not isinstance(results, list) or len(results) != len(group):
+                    raise RuntimeError(f"{ability}: expected {len(group)} results, got {results!r}")
+                errors = [None if delivered(r) else f"{ability} returned {r!r}" for r in results]
+            except Exception as e:
+                errors = [str(e)] * len(group)
+            self._settle(group, errors)
+        return len(rows)
+
+    def _settle(self, rows: List[Tuple], errors: List[Optional[str]]):
+        now = time.time()
+        done, retry, dead = [], [], []
+        for (row_id, _, _, attempts), error in zip(rows, errors):
+            if error is None:
+                done.append((now, row_id))
+            elif attempts + 1 >= self.max_attempts:
+                dead.append((attempts + 1, error, now, row_id))
+            else:
+                backoff = self.backoff_seconds * (2 ** attempts)
+                retry.append((attempts + 1, now + backoff, error, now, row_id))
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany("UPDATE outbox SET status = 'done', updated_at = ? WHERE id = ?", done)
+            self._db.executemany(
+                "UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?,"
+                " updated_at = ? WHERE id = ?", retry)
+            self._db.executemany(
+                "UPDATE outbox SET status = 'dead', attempts = ?, last_error = ?, updated_at = ? WHERE id = ?", dead)
+            self._db.execute("COMMIT")
+        for _, error, _, row_id in dead:
+            error_log("❌ Outbox gave up on row %s: %s", row_id, error)
+
+    def purge(self) -> int:
+        """Delete delivered rows older than retention_seconds."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM outbox WHERE status = 'done' AND updated_at < ?",
+                (time.time() - self.retention_seconds,),
+            )
+        return cursor.rowcount
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        """Wait until nothing is due for delivery; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._thread is None:
+                if not self.flush_once():
+                    return True
+                continue
+            self._wake.set()
+            if self._idle.wait(min(self.poll_interval, max(0.0, deadline - time.monotonic()))) and not self.due():
+                return True
+        return False
+
+    def due(self) -> int:
+        with self._lock:
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'inflight') AND next_attempt_at <= ?",
+                (time.time(),),
+            ).fetchone()
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return {"pending": 0, "inflight": 0, "done": 0, "dead": 0, **dict(rows)}
+
+    def close(self, drain_timeout: float = 5.0):
+        if self._thread is not None:
+            self.drain(drain_timeout)
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._db.close()
+
+# ----------------------------
+# Configured instance
+# ----------------------------
+# Keyed by (pid, path): a forked worker must open its own connection and
+# flusher rather than use the parent's
+_outboxes: Dict[Tuple[int, str], Outbox] = {}
+_outboxes_lock = threading.Lock()
+
+def load_outbox(settings: Optional[Dict[str, Any]],
+                send_many: Callable[[str, List[Dict[str, Any]]], List[Any]]) -> Optional[Outbox]:
+    """The started outbox named in config; None when the outbox is disabled."""
+    if not settings or not settings.get("enabled"):
+        return None
+    path = os.path.abspath(settings.get("path") or "outbox.db")
+    key = (os.getpid(), path)
+    with _outboxes_lock:
+        outbox = _outboxes.get(key)
+        if outbox is None:
+            outbox = _outboxes[key] = Outbox(
+                path, send_many,
+                batch_size=settings.get("batch_size", 100),
+                poll_interval=settings.get("poll_interval", 0.05),
+                max_attempts=settings.get("max_attempts", 5),
+                backoff_seconds=settings.get("backoff_seconds", 0.5),
+                lease_seconds=settings.get("lease_seconds", 30.0),
+            ).start()
+            notice_log("📮 Outbox flusher started on %s", path)
+    return outbox
+
+@atexit.register
+def _close_outboxes():
+    # Give queued side effects a moment to go out; whatever is left stays in
+    # the file and is delivered by the next process that opens it
+    with _outboxes_lock:
+        outboxes = [outbox for (pid, _), outbox in _outboxes.items() if pid == os.getpid()]
+        _outboxes.clear()
+    for outbox in outboxes:
+        outbox.close()
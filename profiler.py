@@ -0,0 +1,323 @@
+"""Opt-in per-ticket profiling (config.yaml `profiling` section).
+
+``agent.run(ticket, profile=True)`` profiles one ticket; with
+``profiling.enabled`` every run is profiled with probability
+``sample_rate`` (e.g. 0.01 in production). A profiled ticket gets:
+
+* a cProfile per stage node and per MCP ability call (ability calls are
+  tagged with the stage they ran in), saved as <STAGE>[.<SERVER>.<ability>].prof
+  for pstats/snakeviz
+* tracemalloc allocations per stage and ability: bytes allocated in the
+  section and still held at its end, by allocation traceback, and the
+  section's peak
+* cpu.folded and alloc.folded: collapsed stacks whose first frames are the
+  ticket_id, stage and ability, ready for flamegraph.pl or speedscope
+* summary.json with calls, wall time (including nested abilities),
+  profiled CPU time, allocated and peak bytes per section
+
+Files go to ``<output_dir>/<ticket_id>-<timestamp>-<pid>/``. Sections are
+exclusive: while an ability runs, its stage's profilers are paused, so an
+ability's time and allocations are counted once, under the ability.
+cpu.folded is rebuilt from cProfile's caller/callee totals rather than
+sampled, so a function reached by several paths has its time split between
+them in proportion to the calls. Only `run` (and run_ticket / thread
+batches) profile; abilities served out of process are seen from the client
+side only.
+
+From Python 3.12 cProfile runs on sys.monitoring, which allows one active
+profiler per process and sees every thread. A section that starts while
+another one is being profiled (the parallel UPDATE, CREATE and DO branches)
+then runs unprofiled and is counted as ``cpu_skipped`` in summary.json,
+and a profiled section's stacks can include the other branches' calls.
+
+One ticket per process is profiled at a time: a ticket sampled while
+another is being profiled runs unprofiled. tracemalloc is process-wide and
+its traces are cleared at every section boundary (which keeps the snapshots
+small), so two profiled tickets would wipe each other's allocations.
+Allocations made by unprofiled tickets running alongside still land in the
+profiled ticket's sections; profile memory at low concurrency.
+
+tracemalloc is started by the first memory profile and left running for
+the life of the process (traces are cleared when each profile ends):
+on CPython 3.11 stopping it while other threads allocate can crash the
+interpreter. Every allocation is slower while it runs, so keep ``memory``
+off where that matters. Memory is not profiled when something else
+started tracemalloc.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+import contextvars
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+
+from events import error_log, notice_log
+
+# Profile of the ticket being run, when it was sampled; LangGraph copies the
+# context into the threads that run graph nodes
+current_profile: contextvars.ContextVar[Optional["TicketProfile"]] = contextvars.ContextVar("current_profile", default=None)
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]")
+
+# Held by the ticket being profiled; see the module docstring
+_profiling_lock = threading.Lock()
+_tracing_owned = False
+
+def _start_tracing(frames: int) -> bool:
+    """False when tracemalloc is in use by someone else (its traces are left alone)."""
+    global _tracing_owned
+    if not _tracing_owned:
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        _tracing_owned = True
+    return True
+
+_INTERNAL_FILES = (tracemalloc.__file__, __file__)
+
+def _external(traceback: tracemalloc.Traceback) -> bool:
+    return not any(frame.filename in _INTERNAL_FILES for frame in traceback)
+
+def _frame_label(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name  # built-in, e.g. <method 'join' of 'str' objects>
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+def folded_cpu(stats: pstats.Stats, prefix: List[str], max_depth: int = 64) -> List[Tuple[str, int]]:
+    """Collapsed stacks (microseconds of own time) rebuilt from cProfile's call graph."""
+    entries = stats.stats  # func -> (cc, nc, tt, ct, callers)
+    callees: Dict[Any, List[Tuple[Any, float]]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, entry in entries.items() if not any(c in entries for c in entry[4])]
+    lines: Counter = Counter()
+
+    def walk(func: Any, stack: List[str], share: float):
+        _, _, tt, ct, _ = entries[func]
+        stack = stack + [_frame_label(func)]
+        own = int(tt * share * 1e6)
+        if own:
+            lines[";".join(stack)] += own
+        if len(stack) >= max_depth:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            callee_ct = entries[callee][3]
+            if callee_ct <= 0 or _frame_label(callee) in stack:
+                continue  # recursion: already counted higher up this stack
+            walk(callee, stack, min(1.0, edge_ct * share / callee_ct))
+
+    for root in roots:
+        walk(root, list(prefix), 1.0)
+    return sorted(lines.items())
+
+def _enable(profile: cProfile.Profile) -> bool:
+    """False when another profiler is active (Python 3.12+; see the module docstring)."""
+    try:
+        profile.enable()
+    except ValueError:
+        return False
+    return True
+
+class _Section:
+    __slots__ = ("calls", "wall", "cpu", "cpu_runs", "cpu_skipped", "allocs", "peak")
+
+    def __init__(self, cpu: bool):
+        self.calls = 0
+        self.wall = 0.0
+        self.peak = 0
+        self.cpu = cProfile.Profile() if cpu else None
+        self.cpu_runs = 0
+        self.cpu_skipped = 0
+        self.allocs: Counter = Counter()
+
+class TicketProfile:
+    """Profiles of one ticket's sections (a stage, or an ability within a stage)."""
+
+    def __init__(self, ticket_id: str, output_dir: str, cpu: bool = True, memory: bool = True,
+                 memory_frames: int = 8):
+        self.ticket_id = ticket_id
+        self.output_dir = output_dir
+        self.cpu = cpu
+        self.memory = memory
+        self.started_at = time.time()
+        self._sections: Dict[Tuple[str, ...], _Section] = {}
+        self._lock = threading.Lock()
+        # Per thread: stack of active section keys
+        self._local = threading.local()
+        self._tracing = self._memory_used = memory and _start_tracing(memory_frames)
+
+    def _get(self, key: Tuple[str, ...]) -> _Section:
+        with self._lock:
+            section = self._sections.get(key)
+            if section is None:
+                section = self._sections[key] = _Section(self.cpu)
+        return section
+
+    def _account_memory(self, key: Optional[Tuple[str, ...]]):
+        # Traces are cleared at every section boundary, so a snapshot holds
+        # exactly what the innermost section allocated and still holds
+        if key is not None:
+            section = self._get(key)
+            section.peak = max(section.peak, tracemalloc.get_traced_memory()[1])
+            for stat in tracemalloc.take_snapshot().statistics("traceback"):
+                if _external(stat.traceback):
+                    section.allocs[stat.traceback] += stat.size
+        tracemalloc.clear_traces()
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def section(self, name: str, ability: bool = False) -> Iterator[None]:
+        local = self._local
+        # Per thread: [key, whether its cpu profile is running] of the active sections
+        stack: List[List[Any]] = local.__dict__.setdefault("stack", [])
+        outer = stack[-1] if stack else None
+        # An ability belongs to the stage it runs in; a stage starts a new path
+        key = (outer[0][0], name) if ability and outer is not None else (name,)
+        section = self._get(key)
+        outer_section = self._sections[outer[0]] if outer is not None else None
+        if outer is not None and outer[1]:
+            outer_section.cpu.disable()
+        if self._tracing:
+            self._account_memory(outer[0] if outer is not None else None)
+        entry = [key, self.cpu and _enable(section.cpu)]
+        if entry[1]:
+            section.cpu_runs += 1
+        elif self.cpu:
+            section.cpu_skipped += 1
+        stack.append(entry)
+        section.calls += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if entry[1]:
+                section.cpu.disable()
+            section.wall += time.perf_counter() - start
+            stack.pop()
+            if self._tracing:
+                self._account_memory(key)
+            if outer is not None and outer[1]:
+                # Resume the section this one paused (on 3.12+ another
+                # thread may have taken the profiler in the meantime)
+                outer[1] = _enable(outer_section.cpu)
+
+    def close(self):
+        if self._tracing:
+            self._tracing = False
+            # Never stopped (see the module docstring); drop what it holds
+            tracemalloc.clear_traces()
+
+    def write(self) -> str:
+        """Write the profile files; returns their directory."""
+        self.close()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(self.started_at))
+        directory = os.path.join(self.output_dir, f"{_UNSAFE.sub('_', self.ticket_id)}-{stamp}-{os.getpid()}")
+        os.makedirs(directory, exist_ok=True)
+        cpu_lines: List[str] = []
+        alloc_lines: List[str] = []
+        summary: Dict[str, Any] = {"ticket_id": self.ticket_id, "started_at": self.started_at, "sections": {}}
+        if self.memory and not self._memory_used:
+            summary["memory"] = "skipped: tracemalloc was already tracing"
+        for key, section in sorted(self._sections.items()):
+            prefix = [self.ticket_id, *key]
+            entry = {"calls": section.calls, "wall_ms": round(section.wall * 1000, 3)}
+            if section.cpu_skipped:
+                entry["cpu_skipped"] = section.cpu_skipped
+            if section.cpu_runs:
+                stats = pstats.Stats(section.cpu)
+                stats.dump_stats(os.path.join(directory, _UNSAFE.sub("_", ".".join(key)) + ".prof"))
+                entry["cpu_ms"] = round(stats.total_tt * 1000, 3)
+                cpu_lines += [f"{stack} {us}" for stack, us in folded_cpu(stats, prefix)]
+            if self._memory_used:
+                entry["alloc_bytes"] = sum(section.allocs.values())
+                entry["peak_bytes"] = section.peak
+                for traceback, size in section.allocs.items():
+                    frames = [f"{os.path.basename(f.filename)}:{f.lineno}" for f in traceback]
+                    alloc_lines.append(f"{';'.join(prefix + frames)} {size}")
+            summary["sections"]["/".join(key)] = entry
+        with open(os.path.join(directory, "cpu.folded"), "w", encoding="utf-8") as f:
+            f.write("\n".join(cpu_lines) + "\n" if cpu_lines else "")
+        with open(os.path.join(directory, "alloc.folded"), "w", encoding="utf-8") as f:
+            f.write("\n".join(alloc_lines) + "\n" if alloc_lines else "")
+        with open(os.path.join(directory, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        return directory
+
+class Profiler:
+    def __init__(self, enabled: bool = False, sample_rate: float = 0.0, output_dir: str = "profiles",
+                 cpu: bool = True, memory: bool = True, memory_frames: int = 8):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.cpu = cpu
+        self.memory = memory
+        self.memory_frames = memory_frames
+        # Sampled tickets that ran unprofiled because another one was being profiled
+        self.skipped = 0
+        # Own RNG so sampling neither consumes nor depends on the global one
+        self._rng = random.Random()
+
+    def sampled(self, force: Optional[bool] = None) -> bool:
+        if force is not None:
+            return force
+        return self.enabled and self.sample_rate > 0 and self._rng.random() < self.sample_rate
+
+    @contextmanager
+    def profile(self, ticket_id: Optional[str], force: Optional[bool] = None) -> Iterator[Optional[TicketProfile]]:
+        """Profile the ticket run inside the block if it is sampled (or forced)."""
+        if not self.sampled(force) or not ticket_id or current_profile.get() is not None:
+            yield None
+            return
+        if not _profiling_lock.acquire(blocking=False):
+            self.skipped += 1
+            yield None
+            return
+        try:
+            profile = TicketProfile(ticket_id, self.output_dir, self.cpu, self.memory, self.memory_frames)
+            token = current_profile.set(profile)
+            try:
+                yield profile
+            finally:
+                current_profile.reset(token)
+                try:
+                    notice_log("🔬 Profile of %s written to %s", ticket_id, profile.write())
+                except Exception as e:
+                    profile.close()
+                    error_log("❌ Could not write profile of %s: %s", ticket_id, e)
+        finally:
+            _profiling_lock.release()
+
+def load_profiler(settings: Optional[Dict[str, Any]]) -> Profiler:
+    """Profiler from the `profiling` section; runs are only profiled on request when it is disabled."""
+    settings = settings or {}
+    return Profiler(
+        enabled=bool(settings.get("enabled")),
+        sample_rate=settings.get("sample_rate", 0.0),
+        output_dir=settings.get("output_dir") or "profiles",
+        cpu=settings.get("cpu", True),
+        memory=settings.get("memory", True),
+        memory_frames=settings.get("memory_frames", 8),
+    )
+
+def profiled_execute(server: str) -> Callable:
+    """Decorator for an MCP server's execute(ability, payload)."""
+    def decorate(execute: Callable) -> Callable:
+        @wraps(execute)
+        def wrapper(self, ability: str, payload: Dict[str, Any]):
+            profile = current_profile.get()
+            if profile is None:
+                return execute(self, ability, payload)
+            with profile.section(f"{server}.{ability}", ability=True):
+                return execute(self, ability, payload)
+        return wrapper
+    return decorate
@@ -0,0 +1,275 @@
+"""Priority- and SLA-aware ticket scheduler (config.yaml `scheduling` section).
+
+Tickets wait in one queue per Priority level. Levels share the workers by
+weighted-fair (stride) queuing: each level carries a pass value that
+advances by 1/weight per ticket served, and the non-empty level with the
+smallest one goes next, so with weights 8/4/2/1 a critical ticket is served
+eight times as often as a low one under load while an idle level earns no
+credit. Within a level tickets go earliest deadline first. A ticket's
+deadline is its submission time plus ``sla_days``, scaled by
+``sla_risk_factor`` when it is at SLA risk. This matches enrich_records
+(sla_days) and add_flags_calculations (sla_risk for high and critical),
+and a job can carry its own ``sla_days`` / ``sla_risk``.
+
+The defaults give every ticket of one level the same window, so EDF only
+reorders a level when jobs carry per-job SLAs; otherwise it is submission
+order (FIFO), except that a resumed ticket keeps the deadline of its first
+submission.
+
+Starvation protection: a ticket that has waited ``max_wait_seconds`` is
+served before anything else, oldest first, whatever its level.
+
+TicketScheduler has the same interface as the plain FIFO TicketQueue
+(put_many, get, close, full, len). service.py uses it in place of the FIFO
+when scheduling is enabled.
+
+Wait times go to the ``queue`` metric family per priority (a ticket served
+after its deadline counts as an error); per-priority depth is in stats()
+and gauges().
+"""
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from collections import deque
+import heapq
+import itertools
+import threading
+import time
+
+from metrics import metrics_registry
+from state_schema import Priority
+
+DEFAULT_WEIGHTS = {"critical": 8, "high": 4, "medium": 2, "low": 1}
+SLA_RISK_PRIORITIES = ("high", "critical")
+
+class QueueFull(Exception):
+    """Not enough room in the queue for the whole submission."""
+
+class TicketQueue:
+    """Bounded FIFO of jobs; a submission is admitted whole or not at all."""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._jobs: Deque[Dict[str, Any]] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put_many(self, jobs: List[Dict[str, Any]]):
+        with self._cond:
+            if self._closed:
+                raise QueueFull("queue is closed")
+            if len(self._jobs) + len(jobs) > self.capacity:
+                raise QueueFull(f"{len(self._jobs)}/{self.capacity} queued, {len(jobs)} submitted")
+            self._jobs.extend(jobs)
+            self._cond.notify(len(jobs))
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """Next job; None once the queue is closed and empty."""
+        with self._cond:
+            while not self._jobs and not self._closed:
+                self._cond.wait()
+            return self._jobs.popleft() if self._jobs else None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def full(self) -> bool:
+        return len(self._jobs) >= self.capacity
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"depth": len(self._jobs)}
+
+    def gauges(self) -> str:
+        return ""
+
+class _Entry:
+    __slots__ = ("deadline", "seq", "enqueued_at", "job", "taken")
+
+    def __init__(self, deadline: float, seq: int, enqueued_at: float, job: Dict[str, Any]):
+        self.deadline = deadline
+        self.seq = seq
+        self.enqueued_at = enqueued_at
+        self.job = job
+        self.taken = False
+
+    def __lt__(self, other: "_Entry") -> bool:
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+class _Level:
+    """One priority level: an EDF heap plus an arrival-order deque for aging.
+
+    An entry lives in both; whichever structure serves it marks it taken
+    and the other drops it lazily.
+    """
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.stride = 1.0 / weight
+        self.pass_ = 0.0
+        self.by_deadline: List[_Entry] = []
+        self.by_arrival: Deque[_Entry] = deque()
+        self.size = 0
+
+    def push(self, entry: _Entry):
+        heapq.heappush(self.by_deadline, entry)
+        self.by_arrival.append(entry)
+        self.size += 1
+
+    def oldest(self) -> Optional[_Entry]:
+        while self.by_arrival and self.by_arrival[0].taken:
+            self.by_arrival.popleft()
+        return self.by_arrival[0] if self.by_arrival else None
+
+    def earliest(self) -> _Entry:
+        while self.by_deadline[0].taken:
+            heapq.heappop(self.by_deadline)
+        return self.by_deadline[0]
+
+    def take(self, entry: _Entry) -> Dict[str, Any]:
+        entry.taken = True
+        self.size -= 1
+        if not self.size:
+            self.by_deadline.clear()
+            self.by_arrival.clear()
+            return entry.job
+        # Drop it right away from whichever end it sits at
+        if self.by_deadline and self.by_deadline[0] is entry:
+            heapq.heappop(self.by_deadline)
+        if self.by_arrival and self.by_arrival[0] is entry:
+            self.by_arrival.popleft()
+        return entry.job
+
+def job_priority(job: Dict[str, Any]) -> str:
+    """Priority value of a job ("medium" if it has none or an unknown one)."""
+    priority = job.get("priority") or (job.get("ticket") or {}).get("priority")
+    if isinstance(priority, Priority):
+        return priority.value
+    priority = str(priority or "").lower()
+    return priority if priority in DEFAULT_WEIGHTS else Priority.MEDIUM.value
+
+class TicketScheduler:
+    def __init__(self, capacity: int, weights: Optional[Dict[str, float]] = None, sla_days: float = 3.0,
+                 sla_risk_factor: float = 0.25, max_wait_seconds: float = 30.0):
+        self.capacity = max(1, capacity)
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self._levels: Dict[str, _Level] = {p.value: _Level(max(1e-6, float(weights[p.value]))) for p in Priority}
+        self.sla_days = sla_days
+        self.sla_risk_factor = sla_risk_factor
+        self.max_wait_seconds = max_wait_seconds
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.aged = 0
+
+    def deadline(self, job: Dict[str, Any], priority: str, now: float) -> float:
+        """Submission time plus the job's SLA window; the window is the same
+        for a whole level unless the job or ticket sets sla_days / sla_risk."""
+        ticket = job.get("ticket") or {}
+        sla_days = job.get("sla_days", ticket.get("sla_days", self.sla_days))
+        sla_risk = job.get("sla_risk", ticket.get("sla_risk", priority in SLA_RISK_PRIORITIES))
+        window = float(sla_days) * 86400.0 * (self.sla_risk_factor if sla_risk else 1.0)
+        return job.get("submitted_at", now) + window
+
+    def put_many(self, jobs: List[Dict[str, Any]]):
+        now = time.time()
+        with self._cond:
+            if self._closed:
+                raise QueueFull("queue is closed")
+            if self._size + len(jobs) > self.capacity:
+                raise QueueFull(f"{self._size}/{self.capacity} queued, {len(jobs)} submitted")
+            for job in jobs:
+                priority = job_priority(job)
+                level = self._levels[priority]
+                if not level.size:
+                    # A level returning from idle starts at the current virtual
+                    # time instead of spending credit saved while it was empty
+                    level.pass_ = max(level.pass_, self._virtual_time)
+                level.push(_Entry(self.deadline(job, priority, now), next(self._seq), now, job))
+            self._size += len(jobs)
+            self._cond.notify(len(jobs))
+
+    def _select(self, now: float) -> Tuple[str, _Entry, bool]:
+        # Starved tickets first, oldest first
+        overdue: Optional[Tuple[str, _Entry]] = None
+        for priority, level in self._levels.items():
+            entry = level.oldest() if level.size else None
+            if entry is not None and now - entry.enqueued_at >= self.max_wait_seconds:
+                if overdue is None or entry.enqueued_at < overdue[1].enqueued_at:
+                    overdue = (priority, entry)
+        if overdue is not None:
+            return overdue[0], overdue[1], True
+        # Ties go to the heavier level
+        priority = min((p for p, level in self._levels.items() if level.size),
+                       key=lambda p: (self._levels[p].pass_, self._levels[p].stride))
+        return priority, self._levels[priority].earliest(), False
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """Next job by the policy above; None once closed and empty."""
+        with self._cond:
+            while not self._size and not self._closed:
+                self._cond.wait()
+            if not self._size:
+                return None
+            now = time.time()
+            priority, entry, aged = self._select(now)
+            level = self._levels[priority]
+            self._virtual_time = level.pass_
+            level.pass_ += level.stride
+            job = level.take(entry)
+            self._size -= 1
+            if aged:
+                self.aged += 1
+        metrics_registry.observe("queue", (priority,), now - entry.enqueued_at, error=now > entry.deadline)
+        return job
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def full(self) -> bool:
+        return self._size >= self.capacity
+
+    def __len__(self) -> int:
+        return self._size
+
+    def depths(self) -> Dict[str, int]:
+        with self._cond:
+            return {priority: level.size for priority, level in self._levels.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        """Depth and wait-time summary per priority, plus how many tickets aging promoted."""
+        waits = metrics_registry.snapshot().get("queue", {})
+        return {
+            "depth": self.depths(),
+            "wait": {priority: waits.get(priority, {}) for priority in self._levels},
+            "aged": self.aged,
+        }
+
+    def gauges(self) -> str:
+        lines = ["# HELP support_agent_queue_depth_by_priority Tickets waiting per priority level",
+                 "# TYPE support_agent_queue_depth_by_priority gauge"]
+        lines += [f'support_agent_queue_depth_by_priority{{priority="{p}"}} {n}' for p, n in self.depths().items()]
+        lines += ["# HELP support_agent_queue_aged_total Tickets served early because they waited max_wait_seconds",
+                  "# TYPE support_agent_queue_aged_total counter",
+                  f"support_agent_queue_aged_total {self.aged}"]
+        return "\n".join(lines) + "\n"
+
+def load_scheduler(settings: Optional[Dict[str, Any]], capacity: int) -> Optional[TicketScheduler]:
+    """A scheduler configured from the `scheduling` section; None when disabled."""
+    if not settings or not settings.get("enabled"):
+        return None
+    return TicketScheduler(
+        capacity,
+        weights=settings.get("weights"),
+        sla_days=settings.get("sla_days", 3.0),
+        sla_risk_factor=settings.get("sla_risk_factor", 0.25),
+        max_wait_seconds=settings.get("max_wait_seconds", 30.0),
+    )
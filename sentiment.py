@@ -0,0 +1,138 @@
+"""Weighted-lexicon sentiment scoring for COMMON parse_request_text.
+
+Each lexicon term carries a weight (negative for complaint words). A term
+ending in ``*`` matches any token with that prefix (``fail*`` covers fail,
+failed, failing, failure). A negator (not, never, can't, ...) flips and
+dampens the next sentiment term within NEGATION_WINDOW tokens, and boosters
+(very, completely, ...) scale it. The summed weight is squashed into a
+score in [-1, 1]:
+
+    score = total / sqrt(total ** 2 + ALPHA)
+
+The lexicon is compiled once into an exact-term dict plus a prefix dict, so
+scoring a text is one tokenization and a few dict lookups per token.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import math
+import os
+import re
+
+import yaml
+
+# The first four reproduce the keywords that used to mark a request negative
+DEFAULT_LEXICON: Dict[str, float] = {
+    "down": -2.0, "fail*": -2.0, "error*": -2.0, "urgent*": -1.5,
+    "outage*": -2.5, "crash*": -2.0, "broken": -2.0, "bug*": -1.0, "unable": -1.5,
+    "losing": -1.5, "lost": -1.0, "stuck": -1.5, "slow*": -1.0, "frustrat*": -2.0,
+    "angry": -2.5, "unacceptable": -2.5, "terrible": -2.5, "worst": -3.0,
+    "thank*": 1.5, "great": 2.0, "good": 1.5, "appreciate*": 1.5, "resolved": 1.5,
+    "works": 1.0, "working": 1.0, "happy": 2.0, "love": 2.5, "excellent": 3.0,
+}
+DEFAULT_NEGATIONS = ("not", "no", "never", "cannot", "can't", "cant", "don't", "dont", "doesn't",
+                     "isn't", "wasn't", "won't", "didn't", "aren't", "couldn't", "without", "nothing")
+DEFAULT_BOOSTERS: Dict[str, float] = {
+    "very": 1.3, "really": 1.3, "extremely": 1.5, "completely": 1.5, "totally": 1.5,
+    "absolutely": 1.5, "so": 1.2, "slightly": 0.7, "somewhat": 0.8,
+}
+NEGATION_WINDOW = 3
+NEGATION_SCALE = -0.75
+ALPHA = 15.0
+NEGATIVE_THRESHOLD = -0.05
+POSITIVE_THRESHOLD = 0.05
+
+_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+class SentimentLexicon:
+    """Compiled lexicon: exact terms, prefix terms, negators and boosters."""
+
+    def __init__(self, weights: Dict[str, float],
+                 negations: Iterable[str] = DEFAULT_NEGATIONS,
+                 boosters: Optional[Dict[str, float]] = None):
+        self._exact: Dict[str, float] = {}
+        self._prefix: Dict[str, float] = {}
+        for term, weight in weights.items():
+            term = term.lower()
+            if term.endswith("*"):
+                self._prefix[term[:-1]] = float(weight)
+            else:
+                self._exact[term] = float(weight)
+        # Longest prefix wins, so check long prefixes first
+        self._prefix_lengths = sorted({len(p) for p in self._prefix}, reverse=True)
+        self._negations = frozenset(negations)
+        self._boosters = dict(DEFAULT_BOOSTERS if boosters is None else boosters)
+
+    @classmethod
+    def from_file(cls, path: str) -> "SentimentLexicon":
+        """Load {weights: {term: weight}, negations: [...], boosters: {...}}
+        (YAML or JSON); weights are merged over DEFAULT_LEXICON."""
+        with open(path, "r", encoding="utf-8") as f:
+            loaded = (json.load(f) if path.endswith(".json") else yaml.safe_load(f)) or {}
+        return cls(
+            {**DEFAULT_LEXICON, **(loaded.get("weights") or {})},
+            loaded.get("negations") or DEFAULT_NEGATIONS,
+            loaded.get("boosters"),
+        )
+
+    def weight(self, token: str) -> Optional[float]:
+        weight = self._exact.get(token)
+        if weight is None:
+            for length in self._prefix_lengths:
+                if len(token) >= length:
+                    weight = self._prefix.get(token[:length])
+                    if weight is not None:
+                        break
+        return weight
+
+    def score_tokens(self, tokens: List[str]) -> float:
+        total = 0.0
+        negated_until = -1
+        boost = 1.0
+        for pos, token in enumerate(tokens):
+            if token in self._negations or token.endswith("n't"):
+                negated_until = pos + NEGATION_WINDOW
+                continue
+            factor = self._boosters.get(token)
+            if factor is not None:
+                boost *= factor
+                continue
+            weight = self.weight(token)
+            if weight is None:
+                continue
+            weight *= boost
+            boost = 1.0
+            if pos <= negated_until:
+                weight *= NEGATION_SCALE
+                negated_until = -1
+            total += weight
+        return total / math.sqrt(total * total + ALPHA) if total else 0.0
+
+    def analyze_tokens(self, tokens: List[str]) -> Tuple[float, str]:
+        score = self.score_tokens(tokens)
+        if score <= NEGATIVE_THRESHOLD:
+            return score, "negative"
+        if score >= POSITIVE_THRESHOLD:
+            return score, "positive"
+        return score, "neutral"
+
+    def analyze(self, text: str) -> Tuple[float, str]:
+        """(score in [-1, 1], "negative" | "neutral" | "positive")."""
+        return self.analyze_tokens(tokenize(text))
+
+# ----------------------------
+# Configured instance (config.yaml `sentiment` section)
+# ----------------------------
+_lexicons: Dict[Optional[str], SentimentLexicon] = {}
+
+def load_sentiment_lexicon(settings: Optional[Dict[str, Any]]) -> SentimentLexicon:
+    """The lexicon named in config, or the built-in DEFAULT_LEXICON."""
+    path = (settings or {}).get("lexicon")
+    key = os.path.abspath(path) if path else None
+    lexicon = _lexicons.get(key)
+    if lexicon is None:
+        lexicon = SentimentLexicon.from_file(path) if path else SentimentLexicon(DEFAULT_LEXICON)
+        lexicon = _lexicons.setdefault(key, lexicon)
+    return lexicon
@@ -0,0 +1,371 @@
+"""Headless HTTP/JSON ticket service (config.yaml `service` section).
+
+    python service.py --port 8080 --workers 8
+
+    POST /tickets                  one ticket, a list, or {"tickets": [...]}
+                                   -> 202 {"tickets": [{ticket_id, status}]};
+                                   ?wait=<seconds> answers 200 once they finish
+                                   (or the wait runs out; at most
+                                   max_wait_seconds, 400 if not a number >= 0)
+    GET  /tickets/<ticket_id>      status and result of a submitted ticket
+    POST /tickets/<ticket_id>/answer   {"answer": "..."} resumes a parked ticket
+    GET  /healthz                  the process is up
+    GET  /readyz                   accepting work (graph compiled, queue not full)
+    GET  /queue                    queue depth (per priority, with wait times,
+                                   when scheduling)
+    GET  /metrics                  Prometheus text (metrics.py plus queue gauges)
+
+Submitted tickets wait in a bounded queue in front of a pool of worker
+threads: FIFO, or ordered by priority and SLA deadline when the
+`scheduling` section is enabled (scheduler.py). A request whose tickets do
+not all fit is refused whole with 429 and a Retry-After header, so callers
+back off instead of piling up memory here. Statuses are queued, running,
+complete, parked and error; results of finished tickets are kept for the
+latest ``max_results`` tickets.
+
+Only the agent is imported (no Gradio), so the service starts quickly.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import json
+import math
+import signal
+import sys
+import threading
+import time
+
+from agent import LangGraphCustomerSupportAgent
+from events import event_sink, error_log
+from graph_registry import graph_registry
+from ingest import outcome
+from metrics import metrics_registry
+from scheduler import QueueFull, TicketQueue, TicketScheduler, job_priority, load_scheduler
+from workflow_spec import DEFAULT_CONFIG_PATH, get_workflow_spec
+
+class TicketService:
+    def __init__(self, agent: LangGraphCustomerSupportAgent, workers: int = 8, queue_size: int = 1024,
+                 max_results: int = 100000, scheduler: Optional[TicketScheduler] = None):
+        self.agent = agent
+        self.queue = scheduler if scheduler is not None else TicketQueue(queue_size)
+        self.max_results = max_results
+        # ticket_id -> record; insertion order is submission order
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._done: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._running = 0
+        self.draining = False
+        self._workers = [threading.Thread(target=self._work, name=f"ticket-worker-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+
+    def start(self) -> "TicketService":
+        for worker in self._workers:
+            worker.start()
+        return self
+
+    @property
+    def ready(self) -> bool:
+        return not self.draining and not self.queue.full and all(w.is_alive() for w in self._workers)
+
+    # ----------------------------
+    # Admission
+    # ----------------------------
+    def submit(self, tickets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Queue tickets; raises QueueFull, or ValueError for a ticket_id already in progress."""
+        jobs = [{"kind": "run", "ticket": ticket, "ticket_id": ticket.get("ticket_id")} for ticket in tickets]
+        return self._admit(jobs)
+
+    def answer(self, ticket_id: str, answer: str) -> Dict[str, Any]:
+        record = self.status(ticket_id)
+        if record is None:
+            return self._admit([{"kind": "resume", "ticket_id": ticket_id, "answer": answer}])[0]
+        if record["status"] != "parked":
+            raise ValueError(f"Ticket {ticket_id} is {record['status']}, not waiting for clarification")
+        # Keeps its place: same priority, deadline counted from the first submission
+        return self._admit([{"kind": "resume", "ticket_id": ticket_id, "answer": answer,
+                             "priority": record["priority"], "submitted_at": record["submitted_at"]}])[0]
+
+    def _admit(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.draining:
+            raise QueueFull("service is shutting down")
+        now = time.time()
+        with self._lock:
+            ids = [job["ticket_id"] for job in jobs]
+            for ticket_id in ids:
+                if not isinstance(ticket_id, str) or not ticket_id:
+                    raise ValueError("every ticket needs a ticket_id")
+                record = self._records.get(ticket_id)
+                if record is not None and record["status"] in ("queued", "running"):
+                    raise ValueError(f"Ticket {ticket_id} is already {record['status']}")
+            if len(set(ids)) != len(ids):
+                raise ValueError("duplicate ticket_id in one submission")
+            self.queue.put_many(jobs)
+            records = []
+            for job in jobs:
+                ticket_id = job["ticket_id"]
+                self._records.pop(ticket_id, None)
+                record = self._records[ticket_id] = {"ticket_id": ticket_id, "status": "queued",
+                                                     "priority": job_priority(job),
+                                                     "submitted_at": job.get("submitted_at", now)}
+                self._done[ticket_id] = threading.Event()
+                records.append(dict(record))
+            self._evict()
+        return records
+
+    def _evict(self):
+        # Oldest finished records go first; queued and running ones are kept
+        excess = len(self._records) - self.max_results
+        for ticket_id in list(self._records):
+            if excess <= 0:
+                break
+            if self._records[ticket_id]["status"] not in ("queued", "running"):
+                del self._records[ticket_id]
+                self._done.pop(ticket_id, None)
+                excess -= 1
+
+    # ----------------------------
+    # Workers
+    # ----------------------------
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            ticket_id = job["ticket_id"]
+            self._update(ticket_id, status="running", started_at=time.time())
+            with self._lock:
+                self._running += 1
+            try:
+                if job["kind"] == "run":
+                    state, error = self.agent.run_ticket(job["ticket"])
+                else:
+                    try:
+                        state, error = self.agent.resume(ticket_id, job["answer"]), None
+                    except Exception as e:
+                        state, error = None, str(e)
+                result = outcome(self.agent, 0, ticket_id, state, error)
+            except Exception as e:
+                error_log("❌ Worker failed on %s: %s", ticket_id, e)
+                result = {"status": "error", "error": str(e)}
+            finally:
+                with self._lock:
+                    self._running -= 1
+            event_sink.clear(ticket_id)
+            result.pop("line", None)
+            result.pop("ticket_id", None)
+            self._update(ticket_id, finished_at=time.time(), **result)
+            done = self._done.get(ticket_id)
+            if done is not None:
+                done.set()
+
+    def _update(self, ticket_id: str, **fields: Any):
+        with self._lock:
+            record = self._records.get(ticket_id)
+            if record is not None:
+                record.update(fields)
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+    def status(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._records.get(ticket_id)
+            return dict(record) if record is not None else None
+
+    def wait(self, ticket_ids: List[str], timeout: float) -> List[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        for ticket_id in ticket_ids:
+            done = self._done.get(ticket_id)
+            if done is not None:
+                done.wait(max(0.0, deadline - time.monotonic()))
+        return [self.status(ticket_id) or {"ticket_id": ticket_id, "status": "unknown"} for ticket_id in ticket_ids]
+
+    def gauges(self) -> str:
+        return (
+            "# HELP support_agent_queue_depth Tickets waiting for a worker\n"
+            "# TYPE support_agent_queue_depth gauge\n"
+            f"support_agent_queue_depth {len(self.queue)}\n"
+            "# HELP support_agent_tickets_in_flight Tickets being processed by a worker\n"
+            "# TYPE support_agent_tickets_in_flight gauge\n"
+            f"support_agent_tickets_in_flight {self._running}\n"
+        ) + self.queue.gauges()
+
+    def drain(self, timeout: float = 30.0):
+        """Stop admitting, let queued tickets finish (up to `timeout`), stop the workers."""
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        while (len(self.queue) or self._running) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.queue.close()
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+
+# ----------------------------
+# HTTP
+# ----------------------------
+def parse_wait(values: Optional[List[str]], max_wait_seconds: float) -> Optional[float]:
+    """Seconds a POST's ``?wait=`` asks for, clamped to ``max_wait_seconds``;
+    None without one. Raises ValueError unless it is a finite number >= 0."""
+    if not values:
+        return None
+    try:
+        wait = float(values[-1])
+    except ValueError:
+        raise ValueError(f"wait must be a number of seconds, got {values[-1]!r}") from None
+    if not math.isfinite(wait) or wait < 0:
+        raise ValueError(f"wait must be a finite number of seconds >= 0, got {values[-1]!r}")
+    return min(wait, max_wait_seconds)
+
+def make_handler(service: TicketService, max_body_bytes: int = 10 * 1024 * 1024,
+                 retry_after: int = 1, max_wait_seconds: float = 60.0) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send_json(self, status: int, body: Any, headers: Tuple[Tuple[str, str], ...] = ()):
+            data = json.dumps(body, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def read_json(self) -> Any:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > max_body_bytes:
+                raise OverflowError(f"body over {max_body_bytes} bytes")
+            return json.loads(self.rfile.read(length) or b"null")
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            if url.path == "/healthz":
+                self.send_json(200, {"status": "ok"})
+            elif url.path == "/readyz":
+                ready = service.ready
+                self.send_json(200 if ready else 503, {"ready": ready, "queued": len(service.queue),
+                                                       "capacity": service.queue.capacity,
+                                                       "draining": service.draining})
+            elif url.path == "/queue":
+                self.send_json(200, service.queue.stats())
+            elif url.path == "/metrics":
+                body = (metrics_registry.render_prometheus() + service.gauges()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            elif len(parts) == 2 and parts[0] == "tickets":
+                record = service.status(parts[1])
+                if record is None:
+                    self.send_json(404, {"error": f"Unknown ticket {parts[1]}"})
+                else:
+                    self.send_json(200, record)
+            else:
+                self.send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            try:
+                wait = parse_wait(parse_qs(url.query).get("wait"), max_wait_seconds)
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            try:
+                body = self.read_json()
+            except OverflowError as e:
+                self.send_json(413, {"error": str(e)})
+                return
+            except ValueError as e:
+                self.send_json(400, {"error": f"Invalid JSON: {e}"})
+                return
+            try:
+                if parts == ["tickets"]:
+                    tickets = body.get("tickets") if isinstance(body, dict) and "tickets" in body else body
+                    tickets = tickets if isinstance(tickets, list) else [tickets]
+                    if not tickets or not all(isinstance(t, dict) for t in tickets):
+                        self.send_json(400, {"error": "Expected a ticket object or a list of them"})
+                        return
+                    records = service.submit(tickets)
+                elif len(parts) == 3 and parts[0] == "tickets" and parts[2] == "answer":
+                    if not isinstance(body, dict) or not isinstance(body.get("answer"), str):
+                        self.send_json(400, {"error": 'Expected {"answer": "..."}'})
+                        return
+                    records = [service.answer(parts[1], body["answer"])]
+                else:
+                    self.send_json(404, {"error": "Not found"})
+                    return
+            except QueueFull as e:
+                self.send_json(503 if service.draining else 429, {"error": str(e)},
+                               (("Retry-After", str(retry_after)),))
+                return
+            except ValueError as e:
+                self.send_json(409, {"error": str(e)})
+                return
+
+            if wait is not None:
+                records = service.wait([r["ticket_id"] for r in records], wait)
+                self.send_json(200, {"tickets": records})
+            else:
+                self.send_json(202, {"tickets": records})
+
+        def log_message(self, format: str, *args: Any):
+            pass
+
+    return Handler
+
+def serve(settings: Dict[str, Any], config_path: str = DEFAULT_CONFIG_PATH) -> Tuple[ThreadingHTTPServer, TicketService]:
+    """Build the agent and workers and start serving from a daemon thread."""
+    agent = graph_registry.get_agent(config_path)
+    service = TicketService(
+        agent,
+        workers=settings.get("workers", 8),
+        queue_size=settings.get("queue_size", 1024),
+        max_results=settings.get("max_results", 100000),
+        scheduler=load_scheduler(agent.config.get("scheduling"), settings.get("queue_size", 1024)),
+    ).start()
+    server = ThreadingHTTPServer(
+        (settings.get("host", "127.0.0.1"), settings.get("port", 8080)),
+        make_handler(service, settings.get("max_body_bytes", 10 * 1024 * 1024), settings.get("retry_after", 1),
+                     settings.get("max_wait_seconds", 60.0)),
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="service-http", daemon=True).start()
+    return server, service
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH)
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--queue-size", type=int)
+    parser.add_argument("--log-events", action="store_true", help="keep per-ticket event logs (off by default)")
+    args = parser.parse_args(argv)
+
+    settings = dict(get_workflow_spec(args.config).config.get("service") or {})
+    for key in ("host", "port", "workers", "queue_size"):
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+    if not args.log_events:
+        event_sink.configure(enabled=False, console=False)
+
+    server, service = serve(settings, args.config)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    host, port = server.server_address[:2]
+    print(f"Ticket service listening on http://{host}:{port} ({len(service._workers)} workers)", file=sys.stderr)
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    service.drain(settings.get("drain_seconds", 30.0))
+    server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
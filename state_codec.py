@@ -0,0 +1,117 @@
+"""Compact binary encoding of SupportState / SupportStateTyped.
+
+    encode_state(state) -> bytes
+    decode_state(data) -> SupportStateTyped dict
+    decode_state(data, SupportState) -> SupportState, built with
+        model_construct, i.e. without re-running pydantic validation
+
+An encoded state is a two-byte header (MAGIC, SCHEMA_VERSION) followed by a
+MessagePack array: a bitmap of the fields that differ from their defaults,
+then those fields' values in FIELDS order. Field names are never written,
+Priority is written as its index in PRIORITIES and stage names as their
+index in STAGES (completed_stages as one byte per stage), so a state costs
+little more than its free-text and nested values.
+
+FIELDS, PRIORITIES and STAGES are part of the format: changing any of them
+needs a new SCHEMA_VERSION, with the old tables kept for decoding. Stage
+names outside STAGES (a config that adds stages) are written as strings.
+"""
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+import ormsgpack
+
+from state_schema import Priority, SupportStateTyped, _TYPED_DEFAULTS
+
+MAGIC = 0xC5
+SCHEMA_VERSION = 1
+
+FIELDS: Tuple[str, ...] = (
+    "customer_name", "email", "query", "priority", "ticket_id",
+    "structured_data", "extracted_entities", "normalized_fields", "enriched_data", "flags",
+    "clarification_answer", "kb_results", "solution_score", "escalation_required", "response_draft",
+    "final_payload", "clarification_requests", "current_stage", "completed_stages",
+    "needs_clarification", "is_complete",
+)
+PRIORITIES: Tuple[Priority, ...] = (Priority.LOW, Priority.MEDIUM, Priority.HIGH, Priority.CRITICAL)
+STAGES: Tuple[str, ...] = (
+    "INIT", "INTAKE", "UNDERSTAND", "PREPARE", "ASK", "WAIT", "RETRIEVE",
+    "DECIDE", "UPDATE", "CREATE", "DO", "COMPLETE",
+)
+
+if set(FIELDS) != set(SupportStateTyped.__annotations__):
+    raise RuntimeError("SupportStateTyped fields changed: update state_codec.FIELDS and bump SCHEMA_VERSION")
+
+_PRIORITY_INDEX = {p.value: i for i, p in enumerate(PRIORITIES)}
+_STAGE_INDEX = {name: i for i, name in enumerate(STAGES)}
+_PRIORITY, _CURRENT_STAGE, _COMPLETED_STAGES = (FIELDS.index(f) for f in ("priority", "current_stage", "completed_stages"))
+_DEFAULTS = [_TYPED_DEFAULTS[f]() if f in _TYPED_DEFAULTS else None for f in FIELDS]
+# The input fields have no default and are always written
+_REQUIRED = {i for i, f in enumerate(FIELDS) if f not in _TYPED_DEFAULTS}
+
+class StateCodecError(ValueError):
+    """Data is not an encoded state this version can read."""
+
+def _encode_stages(stages: List[str]) -> Union[bytes, List[Any]]:
+    indexes = [_STAGE_INDEX.get(s) for s in stages]
+    if None not in indexes:
+        return bytes(indexes)
+    return [s if i is None else i for s, i in zip(stages, indexes)]
+
+def _decode_stages(value: Union[bytes, List[Any]]) -> List[str]:
+    return [STAGES[v] if isinstance(v, int) else v for v in value]
+
+def encode_state(state: Any) -> bytes:
+    """Encode a SupportState, a StateView or a SupportStateTyped dict."""
+    if isinstance(state, dict):
+        get = state.get
+        values = [get(f, _DEFAULTS[i]) for i, f in enumerate(FIELDS)]
+    else:
+        values = [getattr(state, f) for f in FIELDS]
+
+    bitmap = 0
+    body: List[Any] = [0]
+    for i, value in enumerate(values):
+        if i not in _REQUIRED and value == _DEFAULTS[i]:
+            continue
+        bitmap |= 1 << i
+        if i == _PRIORITY:
+            value = _PRIORITY_INDEX[value.value if isinstance(value, Priority) else value]
+        elif i == _CURRENT_STAGE:
+            value = _STAGE_INDEX.get(value, value)
+        elif i == _COMPLETED_STAGES:
+            value = _encode_stages(value)
+        body.append(value)
+    body[0] = bitmap
+    return bytes((MAGIC, SCHEMA_VERSION)) + ormsgpack.packb(body, default=str)
+
+def decode_fields(data: bytes) -> Dict[str, Any]:
+    """Every SupportStateTyped field of an encoded state, defaults filled in."""
+    if len(data) < 2 or data[0] != MAGIC:
+        raise StateCodecError("not an encoded SupportState")
+    if data[1] != SCHEMA_VERSION:
+        raise StateCodecError(f"unsupported state schema version {data[1]} (expected {SCHEMA_VERSION})")
+    try:
+        body = ormsgpack.unpackb(memoryview(data)[2:])
+    except ormsgpack.MsgpackDecodeError as e:
+        raise StateCodecError(f"corrupt encoded state: {e}") from e
+    bitmap, values = body[0], iter(body[1:])
+    fields: Dict[str, Any] = {}
+    for i, name in enumerate(FIELDS):
+        if not bitmap >> i & 1:
+            # Fresh default so decoded states never share a mutable value
+            fields[name] = _TYPED_DEFAULTS[name]() if name in _TYPED_DEFAULTS else None
+            continue
+        value = next(values)
+        if i == _PRIORITY:
+            value = PRIORITIES[value]
+        elif i == _CURRENT_STAGE:
+            value = STAGES[value] if isinstance(value, int) else value
+        elif i == _COMPLETED_STAGES:
+            value = _decode_stages(value)
+        fields[name] = value
+    return fields
+
+def decode_state(data: bytes, model: Optional[Type[Any]] = None) -> Any:
+    """Decode to a SupportStateTyped dict, or to `model` (a pydantic state
+    class such as agent.SupportState) without validating it again."""
+    fields = decode_fields(data)
+    return fields if model is None else model.model_construct(**fields)
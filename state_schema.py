@@ -1,7 +1,9 @@
-
-from typing import TypedDict, Optional, List, Dict, Any
+from typing import TypedDict, Optional, List, Dict, Any, Annotated
 from pydantic import BaseModel, Field
 from enum import Enum
+import operator
+
+from workflow_spec import WorkflowSpec, get_workflow_spec, on_reload
 
 class Priority(str, Enum):
     LOW = "low"
@@ -9,6 +11,41 @@ class Priority(str, Enum):
     HIGH = "high"
     CRITICAL = "critical"
 
+# Stage name -> position in config order, for the control-field reducers
+_stage_rank: Optional[Dict[str, int]] = None
+
+def _configure_stage_rank(spec: WorkflowSpec):
+    global _stage_rank
+    _stage_rank = spec.stage_rank
+
+on_reload(_configure_stage_rank)
+
+def stage_rank(stage: str) -> int:
+    if _stage_rank is None:
+        _configure_stage_rank(get_workflow_spec())
+    return _stage_rank.get(stage, -1)
+
+def latest_stage(current: str, update: str) -> str:
+    """current_stage reducer: the later of the two stages in config order.
+
+    Parallel branches write current_stage in the same step and LangGraph
+    applies their writes in node-name order, so the last write is not the
+    furthest stage.
+    """
+    return update if stage_rank(update) >= stage_rank(current) else current
+
+def in_stage_order(current: List[str], update: List[str]) -> List[str]:
+    """completed_stages reducer: append, keeping the list in config order
+    whichever order parallel branches finished in."""
+    return sorted(current + update, key=stage_rank)
+
+def validate_state_fields(ticket_id: str, current_stage: str):
+    """Validate state integrity (shared by SupportState and StateView)."""
+    if not ticket_id.startswith("TKT-"):
+        raise ValueError(f"Invalid ticket_id format: {ticket_id}")
+    if current_stage not in get_workflow_spec().valid_stages:
+        raise ValueError(f"Invalid current_stage: {current_stage}")
+
 class SupportStateTyped(TypedDict):
     customer_name: str
     email: str
@@ -26,8 +63,58 @@ class SupportStateTyped(TypedDict):
     escalation_required: Optional[bool]
     response_draft: Optional[str]
     final_payload: Optional[Dict[str, Any]]
-    clarification_requests: Optional[List[str]]
-    current_stage: str
-    completed_stages: List[str]
+    clarification_requests: Annotated[List[str], operator.add]
+    current_stage: Annotated[str, latest_stage]
+    completed_stages: Annotated[List[str], in_stage_order]
     needs_clarification: bool
-    is_complete: bool
\ No newline at end of file
+    is_complete: bool
+
+# Defaults for keys a SupportStateTyped dict may not carry yet
+_TYPED_DEFAULTS = {
+    "structured_data": dict,
+    "extracted_entities": dict,
+    "normalized_fields": dict,
+    "enriched_data": dict,
+    "flags": dict,
+    "clarification_answer": lambda: None,
+    "kb_results": list,
+    "solution_score": lambda: None,
+    "escalation_required": lambda: False,
+    "response_draft": lambda: None,
+    "final_payload": dict,
+    "clarification_requests": list,
+    "current_stage": lambda: "INIT",
+    "completed_stages": list,
+    "needs_clarification": lambda: False,
+    "is_complete": lambda: False,
+}
+
+class StateView:
+    """Read-only attribute view over a SupportStateTyped dict.
+
+    Lets the stage implementations read a lightweight dict state with the
+    same `state.field` access they use on SupportState, without copying or
+    re-validating it.
+    """
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Dict[str, Any]):
+        self._data = data
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._data[name]
+        except KeyError:
+            if name in _TYPED_DEFAULTS:
+                return _TYPED_DEFAULTS[name]()
+            raise AttributeError(name) from None
+
+    @property
+    def priority(self) -> Priority:
+        return Priority(self._data["priority"])
+
+    def validate_state(self):
+        validate_state_fields(self.ticket_id, self.current_stage)
+
+    def model_dump(self) -> Dict[str, Any]:
+        return {**{k: default() for k, default in _TYPED_DEFAULTS.items()}, **self._data}
@@ -0,0 +1,12 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(autouse=True)
+def repo_cwd(monkeypatch):
+    # The MCP servers read config.yaml relative to the working directory
+    monkeypatch.chdir(ROOT)
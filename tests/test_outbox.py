@@ -0,0 +1,70 @@
+import os
+import sqlite3
+
+import pytest
+import yaml
+
+from outbox import Outbox
+
+TICKET = {
+    "customer_name": "Bob Johnson",
+    "email": "bob.j@example.com",
+    "query": "How to reset my password for the main product account?",
+    "priority": "medium",
+    "ticket_id": "TKT-20001",
+}
+
+def outbox_config(tmp_path, checkpointing: bool) -> str:
+    with open("config.yaml", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    config["outbox"].update(enabled=True, path=str(tmp_path / "outbox.db"))
+    config["checkpointing"].update(enabled=checkpointing, path=str(tmp_path / "checkpoints.db"))
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(config, sort_keys=False), encoding="utf-8")
+    return str(path)
+
+def delivered_runs(path: str):
+    db = sqlite3.connect(path)
+    try:
+        rows = db.execute(
+            "SELECT run_key, action FROM outbox WHERE ticket_id = ? AND status = 'done'", (TICKET["ticket_id"],)
+        ).fetchall()
+    finally:
+        db.close()
+    runs = {}
+    for run_key, action in rows:
+        runs.setdefault(run_key, set()).add(action)
+    return runs
+
+@pytest.mark.parametrize("checkpointing", [False, True])
+def test_same_ticket_id_run_twice_delivers_both_runs(tmp_path, checkpointing):
+    from agent import LangGraphCustomerSupportAgent
+
+    agent = LangGraphCustomerSupportAgent(outbox_config(tmp_path, checkpointing))
+    for _ in range(2):
+        assert agent.run(dict(TICKET)).is_complete
+        assert agent.outbox().drain()
+
+    runs = delivered_runs(os.path.join(tmp_path, "outbox.db"))
+    assert len(runs) == 2
+    for actions in runs.values():
+        assert "execute_api_calls" in actions
+
+def test_enqueue_deduplicates_within_a_run_only(tmp_path):
+    sent = []
+
+    def send_many(ability, payloads):
+        sent.extend((ability, p["n"]) for p in payloads)
+        return [True] * len(payloads)
+
+    outbox = Outbox(str(tmp_path / "outbox.db"), send_many)
+    try:
+        outbox.enqueue("TKT-1", "close_ticket", {"n": 1}, run_key="run-a")
+        outbox.enqueue("TKT-1", "close_ticket", {"n": 2}, run_key="run-a")  # pending: payload replaced
+        assert outbox.drain()
+        outbox.enqueue("TKT-1", "close_ticket", {"n": 3}, run_key="run-a")  # delivered: ignored
+        outbox.enqueue("TKT-1", "close_ticket", {"n": 4}, run_key="run-b")
+        assert outbox.drain()
+    finally:
+        outbox.close()
+    assert sent == [("close_ticket", 2), ("close_ticket", 4)]
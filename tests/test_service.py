@@ -0,0 +1,16 @@
+import pytest
+
+from service import parse_wait
+
+def test_wait_is_optional():
+    assert parse_wait(None, 60) is None
+    assert parse_wait([], 60) is None
+
+@pytest.mark.parametrize("value, expected", [("0", 0.0), ("2.5", 2.5), ("60", 60.0), ("3600", 60.0), ("1e9", 60.0)])
+def test_wait_is_clamped(value, expected):
+    assert parse_wait([value], 60) == expected
+
+@pytest.mark.parametrize("value", ["-1", "nan", "inf", "-inf", "", "soon"])
+def test_bad_wait_is_refused(value):
+    with pytest.raises(ValueError):
+        parse_wait([value], 60)
@@ -0,0 +1,67 @@
+import pytest
+
+from agent import SupportState
+from state_codec import (
+    FIELDS, MAGIC, SCHEMA_VERSION, STAGES, StateCodecError, _DEFAULTS, decode_state, encode_state,
+)
+from state_schema import Priority
+
+MINIMAL = {"customer_name": "", "email": "", "query": "", "priority": "low", "ticket_id": "TKT-0"}
+FULL = {
+    "customer_name": "Ada", "email": "ada@example.com", "query": "Cannot login to my account",
+    "priority": Priority.CRITICAL, "ticket_id": "TKT-000001",
+    "structured_data": {"text": "cannot login", "key_phrases": ["login"], "sentiment_score": -0.42},
+    "extracted_entities": {"products": ["main product"], "accounts": ["1"]},
+    "normalized_fields": {"priority": "critical"}, "enriched_data": {"sla_days": 3, "history": ["TKT-000000"]},
+    "flags": {"sla_risk": True}, "clarification_answer": "On my phone",
+    "kb_results": [{"title": "How to reset password", "relevance": 0.95}], "solution_score": 87,
+    "escalation_required": True, "response_draft": "Dear Ada,\n\nWe have addressed your query.",
+    "final_payload": {"ticket_id": "TKT-000001", "status": "resolved"},
+    "clarification_requests": ["Which account?"], "current_stage": "COMPLETE",
+    "completed_stages": list(STAGES[1:]), "needs_clarification": True, "is_complete": True,
+}
+
+CASES = {
+    "defaults only": MINIMAL,
+    "every field": FULL,
+    "priority member": {**MINIMAL, "priority": Priority.HIGH},
+    "stages outside STAGES": {**MINIMAL, "current_stage": "TRIAGE", "completed_stages": ["INTAKE", "TRIAGE", "DO"]},
+    "falsy but not default": {**MINIMAL, "query": "Ünïcödé ✓ 日本語", "clarification_answer": "", "solution_score": 0,
+                              "escalation_required": None, "clarification_requests": ["?", ""]},
+    "explicit defaults": {**MINIMAL, "escalation_required": False, "solution_score": None},
+}
+
+def expected_fields(case):
+    expected = {f: case[f] if f in case else _DEFAULTS[i] for i, f in enumerate(FIELDS)}
+    expected["priority"] = Priority(expected["priority"])
+    return expected
+
+@pytest.mark.parametrize("case", CASES.values(), ids=CASES.keys())
+def test_typed_round_trip(case):
+    decoded = decode_state(encode_state(case))
+    assert decoded == expected_fields(case)
+    assert isinstance(decoded["priority"], Priority)
+
+@pytest.mark.parametrize("case", CASES.values(), ids=CASES.keys())
+def test_pydantic_round_trip(case):
+    state = SupportState.model_construct(**expected_fields(case))
+    decoded = decode_state(encode_state(state), SupportState)
+    assert isinstance(decoded, SupportState)
+    assert decoded.model_dump() == state.model_dump()
+
+def test_validated_state_round_trip():
+    state = SupportState(**{**FULL, "priority": "critical"})
+    assert decode_state(encode_state(state), SupportState) == state
+
+def test_unknown_keys_are_dropped():
+    assert decode_state(encode_state({**MINIMAL, "not_a_field": 1})) == expected_fields(MINIMAL)
+
+def test_decoded_defaults_are_not_shared():
+    first, second = (decode_state(encode_state(MINIMAL)) for _ in range(2))
+    first["kb_results"].append({"title": "x"})
+    assert second["kb_results"] == []
+
+@pytest.mark.parametrize("data", [b"", b"{}", bytes((MAGIC, 99)) + b"\x90", bytes((MAGIC, SCHEMA_VERSION)) + b"\xc1"])
+def test_rejects_corrupt_data(data):
+    with pytest.raises(StateCodecError):
+        decode_state(data)
@@ -0,0 +1,128 @@
+from typing import Callable, Dict, Any, List, FrozenSet, Tuple
+import hashlib
+import os
+import threading
+import yaml
+
+DEFAULT_CONFIG_PATH = "config.yaml"
+REQUIRED_FIELDS = ["version", "name", "description", "input_schema", "stages"]
+
+# ----------------------------
+# Compiled workflow spec
+# ----------------------------
+class WorkflowSpec:
+    """Immutable, pre-digested view of config.yaml shared by every agent."""
+
+    def __init__(self, config: Dict[str, Any], content_hash: str, mtime: float):
+        self.config = config
+        self.content_hash = content_hash
+        self.mtime = mtime
+        self.stages: List[Dict[str, Any]] = config["stages"]
+        self.stage_names: FrozenSet[str] = frozenset(stage["name"] for stage in self.stages)
+        self.valid_stages: FrozenSet[str] = self.stage_names | {"INIT"}
+        # Config order is a topological order of the stage DAG
+        self.stage_rank: Dict[str, int] = {"INIT": 0, **{stage["name"]: i + 1 for i, stage in enumerate(self.stages)}}
+        self.stage_modes: Dict[str, str] = {stage["name"]: stage.get("mode", "deterministic") for stage in self.stages}
+        self.stage_abilities: Dict[str, Dict[str, str]] = {
+            stage["name"]: dict(stage.get("abilities") or {}) for stage in self.stages
+        }
+        self.ability_servers: Dict[str, str] = {}
+        self.ability_stages: Dict[str, str] = {}
+        for name, abilities in self.stage_abilities.items():
+            for ability, server in abilities.items():
+                self.ability_servers[ability] = server
+                self.ability_stages[ability] = name
+        self.dependencies: Dict[str, List[str]] = stage_dependencies(self.stages)
+
+    @classmethod
+    def from_text(cls, text: str, mtime: float = 0.0) -> "WorkflowSpec":
+        config = yaml.safe_load(text)
+        if not isinstance(config, dict) or not all(field in config for field in REQUIRED_FIELDS):
+            raise ValueError(f"Config missing required fields: {REQUIRED_FIELDS}")
+        return cls(config, hashlib.sha256(text.encode("utf-8")).hexdigest(), mtime)
+
+def stage_dependencies(stages: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Direct (transitively reduced) parents of each stage, in config order.
+
+    A stage depends on the latest earlier stage that writes a field it reads,
+    or that reads/writes a field it writes; reading `completed_stages`
+    depends on every earlier stage. Stages without a data dependency depend
+    on the first stage.
+    """
+    deps: Dict[str, set] = {}
+    for i, stage in enumerate(stages):
+        reads = set(stage.get("reads", []))
+        writes = set(stage.get("writes", []))
+        parents = set()
+        for earlier in reversed(stages[:i]):
+            name = earlier["name"]
+            if "completed_stages" in reads:
+                parents.add(name)
+                continue
+            earlier_writes = set(earlier.get("writes", []))
+            earlier_reads = set(earlier.get("reads", []))
+            hits = (reads | writes) & earlier_writes | writes & earlier_reads
+            if hits:
+                parents.add(name)
+                reads -= earlier_writes
+                writes -= earlier_writes | earlier_reads
+        if i > 0 and not parents:
+            parents.add(stages[0]["name"])
+        deps[stage["name"]] = parents
+
+    ancestors: Dict[str, set] = {}
+    for stage in stages:
+        name = stage["name"]
+        ancestors[name] = set(deps[name])
+        for parent in deps[name]:
+            ancestors[name] |= ancestors[parent]
+
+    order = [stage["name"] for stage in stages]
+    reduced = {}
+    for name, parents in deps.items():
+        implied = set()
+        for parent in parents:
+            implied |= ancestors[parent]
+        reduced[name] = [p for p in order if p in parents - implied]
+    return reduced
+
+# ----------------------------
+# Process-wide cache (reloaded when the file's mtime changes)
+# ----------------------------
+_specs: Dict[str, WorkflowSpec] = {}
+_lock = threading.Lock()
+_listeners: Dict[str, List[Callable[[WorkflowSpec], None]]] = {}
+
+def get_workflow_spec(config_path: str = DEFAULT_CONFIG_PATH) -> WorkflowSpec:
+    path = os.path.abspath(config_path)
+    mtime = os.stat(path).st_mtime
+    spec = _specs.get(path)
+    if spec is not None and spec.mtime == mtime:
+        return spec
+    with _lock:
+        spec = _specs.get(path)
+        if spec is not None and spec.mtime == mtime:
+            return spec
+        with open(path, "r") as f:
+            spec = WorkflowSpec.from_text(f.read(), mtime)
+        _specs[path] = spec
+    for listener in _listeners.get(path, ()):
+        listener(spec)
+    return spec
+
+def on_reload(listener: Callable[[WorkflowSpec], None], config_path: str = DEFAULT_CONFIG_PATH):
+    """Call `listener(spec)` whenever `config_path` is (re)loaded.
+
+    Per-call code (MCP servers, routing, the ability cache) resolves what it
+    needs from the spec once and keeps it, instead of calling
+    get_workflow_spec (an os.stat) on every call; the listener tells it to
+    resolve again after the file changed.
+    """
+    _listeners.setdefault(os.path.abspath(config_path), []).append(listener)
+
+def clear_workflow_specs() -> Tuple[str, ...]:
+    """Drop every cached spec; returns the paths that were cached."""
+    with _lock:
+        paths = tuple(_specs)
+        _specs.clear()
+    return paths